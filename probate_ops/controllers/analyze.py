@@ -1,22 +1,52 @@
+import asyncio, json, os, shutil, tempfile
+from collections import Counter
+from typing import Iterator
 from fastapi import APIRouter, UploadFile, File
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+import numpy as np
 import pandas as pd
-from ..utils.normalize import read_table, normalize
-from ..tools.llm_score_tool import score_llm
+from ..core.llm_metrics import collect
+from ..core.settings import settings
+from ..utils.normalize import holdings_key, iter_table, normalize, read_table
+from ..tools.llm_score_tool import scorer
+from ..tools.rule_score_tool import needs_llm, score_rules, score_with_rules
 
 router = APIRouter()
 
+KEEP = [
+    "county",
+    "source_url",
+    "case_no",
+    "owner_name",
+    "property_address",
+    "city",
+    "state",
+    "zip",
+    "party",
+    "mailing_address",
+    "petition_type",
+    "petition_date",
+    "death_date",
+    "absentee_flag",
+    "days_since_petition",
+    "days_since_death",
+    "holdings_in_file",
+    "score",
+    "tier",
+    "rationale",
+]
+
 
 @router.post("/analyze")
 async def analyze(file: UploadFile = File(...), max_records: int = 200):
     content = await file.read()
     df = normalize(read_table(content, file.filename)).head(max_records)
-    scored = []
-    for _, row in df.iterrows():
-        rec = row.to_dict()
-        rec.update(score_llm(rec))
-        scored.append(rec)
-    out = pd.DataFrame(scored)
+    records = df.to_dict(orient="records")
+    with collect() as llm:
+        verdicts, scoring = await score_with_rules(records, scorer)
+    for rec, verdict in zip(records, verdicts):
+        rec.update(verdict)
+    out = pd.DataFrame(records)
 
     # charts
     tiers = out["tier"].value_counts().to_dict()
@@ -50,28 +80,7 @@ async def analyze(file: UploadFile = File(...), max_records: int = 200):
         ),
     }
 
-    keep = [
-        "county",
-        "source_url",
-        "case_no",
-        "owner_name",
-        "property_address",
-        "city",
-        "state",
-        "zip",
-        "party",
-        "mailing_address",
-        "petition_type",
-        "petition_date",
-        "death_date",
-        "absentee_flag",
-        "days_since_petition",
-        "days_since_death",
-        "holdings_in_file",
-        "score",
-        "tier",
-        "rationale",
-    ]
+    keep = KEEP
     for k in keep:
         if k not in out.columns:
             out[k] = ""
@@ -86,5 +95,196 @@ async def analyze(file: UploadFile = File(...), max_records: int = 200):
             "records": out[keep].fillna("").to_dict(orient="records"),
             "charts": charts,
             "sample_size": len(out),
+            "scoring": scoring,
+            "llm": llm.as_dict(),
         }
     )
+
+
+class ChartAccumulator:
+    """The /analyze charts, updated one record at a time."""
+
+    def __init__(self):
+        self.n = 0
+        self.absentee = 0
+        self.tiers: Counter = Counter()
+        self.counties: Counter = Counter()
+        self.petition_types: Counter = Counter()
+        self.months: Counter = Counter()
+
+    def add(self, rec: dict) -> None:
+        self.n += 1
+        self.absentee += rec.get("absentee_flag") is True
+        self.tiers[rec.get("tier")] += 1
+        for counter, key in (
+            (self.counties, "county"),
+            (self.petition_types, "petition_type"),
+        ):
+            value = rec.get(key)
+            if isinstance(value, str):
+                counter[value or "Unknown"] += 1
+        petition_date = rec.get("petition_date")
+        if isinstance(petition_date, pd.Timestamp):
+            self.months[petition_date.strftime("%Y-%m")] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "tiers": dict(self.tiers),
+            "top_counties": dict(self.counties.most_common(10)),
+            "petition_types": dict(self.petition_types.most_common(8)),
+            "by_month": [
+                {"month": k, "count": v}
+                for k, v in sorted(self.months.items())
+            ],
+            "absentee_rate": self.absentee / self.n if self.n else 0.0,
+        }
+
+
+def _record_out(rec: dict) -> dict:
+    out = {}
+    for k in KEEP:
+        v = rec.get(k, "")
+        if k in ("petition_date", "death_date"):
+            v = pd.to_datetime(v, errors="coerce")
+            v = "" if pd.isna(v) else v.strftime("%Y-%m-%d")
+        elif v is None or (isinstance(v, float) and np.isnan(v)):
+            v = ""
+        out[k] = v
+    return out
+
+
+def _event(kind: str, data) -> bytes:
+    return (
+        json.dumps({"event": kind, "data": data}, default=str) + "\n"
+    ).encode()
+
+
+def _read_chunks(path: str, filename: str, max_records: int):
+    """Normalized upload records, ANALYZE_CHUNK_ROWS at a time.
+
+    A first pass counts holdings over the whole file, as /analyze does, so
+    holdings_in_file does not depend on where the chunks happen to split.
+    """
+    size = settings.ANALYZE_CHUNK_ROWS
+    counts: Counter = Counter()
+    for raw in iter_table(path, filename, size):
+        counts.update(holdings_key(raw).value_counts().to_dict())
+    holdings = pd.Series(counts, dtype=int)
+    for raw in iter_table(path, filename, size, nrows=max_records):
+        yield normalize(raw, holdings).to_dict(orient="records")
+
+
+def _plan(chunks: Iterator[list[dict]]):
+    """Rule-score each chunk: ("rules", records, verdicts) for the decided
+    ones, then ("llm", records, None) per batch of ambiguous ones."""
+    size = settings.LLM_BATCH_MAX_SIZE
+    for records in chunks:
+        if not records:
+            continue
+        rules = score_rules(pd.DataFrame(records))
+        mask = needs_llm(rules["score"])
+        decided = np.flatnonzero(~mask)
+        yield (
+            "rules",
+            [records[i] for i in decided],
+            rules.iloc[decided].to_dict(orient="records"),
+        )
+        ambiguous = [records[i] for i in np.flatnonzero(mask)]
+        for i in range(0, len(ambiguous), size):
+            yield "llm", ambiguous[i : i + size], None
+
+
+async def _stream(path: str, filename: str, max_records: int):
+    try:
+        with collect() as llm:
+            chunks = _read_chunks(path, filename, max_records)
+            async for line in _stream_events(chunks, llm):
+                yield line
+    finally:
+        os.unlink(path)  # an open reader keeps its handle until collected
+
+
+async def _stream_events(chunks: Iterator[list[dict]], llm):
+    """Events for `chunks` of normalized records, read one at a time.
+
+    Only the chunk being rule-scored and the ambiguous batches still at the
+    LLM (at most LLM_CONCURRENCY) are held; records are not kept once
+    emitted, so memory does not grow with the upload.
+    """
+    acc = ChartAccumulator()
+    total = sent = 0
+
+    def emit(recs: list[dict], verdicts: list[dict]):
+        for rec, verdict in zip(recs, verdicts):
+            rec.update(verdict)
+            acc.add(rec)
+            yield _event("record", _record_out(rec))
+        yield _event("charts", acc.snapshot())
+
+    work = _plan(chunks)
+    pending: dict[asyncio.Task, list[dict]] = {}
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < settings.LLM_CONCURRENCY:
+                # parsing and rule scoring run off the event loop
+                item = await asyncio.to_thread(next, work, None)
+                if item is None:
+                    exhausted = True
+                    break
+                kind, recs, verdicts = item
+                total += len(recs)
+                if kind == "rules":
+                    for line in emit(recs, verdicts):
+                        yield line
+                else:
+                    sent += len(recs)
+                    task = asyncio.ensure_future(scorer.score_many(recs))
+                    pending[task] = recs
+                del item, recs, verdicts
+            if not pending:
+                break
+            done, _ = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                for line in emit(pending.pop(task), task.result()):
+                    yield line
+    finally:
+        for task in pending:  # client went away mid-stream
+            task.cancel()
+
+    yield _event(
+        "summary",
+        {
+            "charts": acc.snapshot(),
+            "sample_size": acc.n,
+            "scoring": {
+                "records": total,
+                "llm_records": sent,
+                "llm_avoided": 1 - sent / total if total else 0.0,
+            },
+            "llm": llm.as_dict(),
+        },
+    )
+
+
+def _spool(upload: UploadFile) -> str:
+    suffix = os.path.splitext(upload.filename or "")[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        shutil.copyfileobj(upload.file, f)
+    return f.name
+
+
+@router.post("/analyze/stream")
+async def analyze_stream(file: UploadFile = File(...), max_records: int = 200):
+    """NDJSON stream of `record` and running `charts` events, then `summary`.
+
+    The upload is spooled to disk first: FastAPI closes it as soon as this
+    handler returns, before the response body is produced.
+    """
+    path = await asyncio.to_thread(_spool, file)
+    return StreamingResponse(
+        _stream(path, file.filename, max_records),
+        media_type="application/x-ndjson",
+    )
@@ -1,12 +1,61 @@
 # import the UploadFile class for handling file uploads
-import csv
-from fastapi import UploadFile, APIRouter, WebSocket, File, Form
+import asyncio
+from typing import Optional
+from fastapi import (
+    UploadFile,
+    APIRouter,
+    WebSocket,
+    File,
+    Form,
+    HTTPException,
+)
 from pydantic import BaseModel
-from probate_ops.flows.dataviz import graph
+from probate_ops.core.query_cache import query_cache
+from probate_ops.core.question_cache import question_cache
+from probate_ops.core.sessions import sessions
+from probate_ops.core.settings import settings
+from probate_ops.core.storage import blobstore
+from probate_ops.flows.checkpoint import touch
+from probate_ops.flows.dataviz import DATASET_DIR, graph, new_turn
+from probate_ops.utils.schema import sniff_csv
 
 router = APIRouter()
 
 
+def _ingest(upload: UploadFile) -> dict:
+    """Sniff the schema from the head, then store the file for queries."""
+    schema = sniff_csv(upload.file, settings.ASK_SAMPLE_ROWS)
+    upload.file.seek(0)
+    dataset_hash, _ = blobstore.save_stream(upload.file, DATASET_DIR, ".csv")
+    return {
+        "columns": schema["columns"],
+        "column_types": schema["types"],
+        "dataset_hash": dataset_hash,
+    }
+
+
+async def _has_schema(config: dict) -> bool:
+    if graph.checkpointer is None:
+        return False
+    snapshot = await graph.aget_state(config)
+    return bool(snapshot.values.get("columns"))
+
+
+def _result(state: dict) -> dict:
+    return {
+        "file_schema": state.get("file_schema"),
+        **{
+            k: state.get(k)
+            for k in ("answer", "sql", "rows", "row_count", "cached", "error")
+        },
+    }
+
+
+async def _touch(thread_id: str) -> None:
+    if graph.checkpointer is not None:
+        await touch(graph.checkpointer, thread_id)
+
+
 class AskReq(BaseModel):
     thread_id: str
     question: str
@@ -16,33 +65,58 @@ class AskReq(BaseModel):
 @router.post("/ask")
 async def ask(
     question: str = Form(...),
-    file: UploadFile = File(
-        ...
-    ),  # Uncomment if you want to handle file uploads
+    # Only needed on a thread's first question; follow-ups reuse its schema.
+    file: Optional[UploadFile] = File(None),
     thread_id: str = Form(...),
 ):
     # Minimal heuristic: prefer SQL for counts/group-bys; otherwise DF
 
-    state = {
-        "question": question,
-        "file": csv.DictReader(
-            (await file.read()).decode("utf-8").splitlines()
-        ),
-    }
+    config = {"configurable": {"thread_id": thread_id}}
+    state = new_turn(question)
+    if file is not None:
+        # The schema comes from the header and a few rows; the file itself
+        # is only copied (content-addressed) for the SQL step to query.
+        state.update(await asyncio.to_thread(_ingest, file))
+    elif not await _has_schema(config):
+        raise HTTPException(400, "Upload a file to start this thread_id")
 
-    # Execute the workflow
+    # Execute the workflow; the thread's checkpoint supplies the schema
+    # and earlier parses on follow-up turns.
+    result = await graph.ainvoke(state, config=config)
+    await _touch(thread_id)
+    return _result(result)
 
-    result = await graph.ainvoke(state, config={"thread_id": thread_id})
-    return result["file_schema"]
+
+@router.get("/ask/cache")
+def ask_cache_stats():
+    return {
+        "questions": (
+            question_cache.stats() if question_cache else {"enabled": False}
+        ),
+        "queries": query_cache.stats(),
+    }
 
 
 @router.websocket("/ws/{thread_id}")
 async def websocket_endpoint(websocket: WebSocket, thread_id: str):
     config = {"configurable": {"thread_id": thread_id}}
-    await websocket.accept()
-    while True:
-        data = await websocket.receive_text()
-        async for event in graph.astream(
-            {"file_schema": [data]}, config=config, stream_mode="messages"
+
+    async def answer(question: str):
+        # Every LLM call in the graph is structured output, so its tokens
+        # are JSON, not prose: report each finished step, then the answer.
+        state = new_turn(question)
+        async for update in graph.astream(
+            state, config=config, stream_mode="updates"
         ):
-            await websocket.send_text(event[0].content)
+            for node, values in update.items():
+                state.update(values or {})
+                yield {"type": "step", "node": node}
+        await _touch(thread_id)
+        yield {"type": "result", **_result(state)}
+
+    await sessions.serve(websocket, answer)
+
+
+@router.get("/ws/stats")
+def websocket_stats():
+    return sessions.stats()
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Request
+from ..jobs.enrich_worker import backlog_status
+
+router = APIRouter(prefix="/enrichment", tags=["Enrichment"])
+
+
+@router.get("/status")
+def enrichment_status(request: Request):
+    worker = getattr(request.app.state, "enrich_worker", None)
+    return {
+        **backlog_status(),
+        "local_worker": worker.stats() if worker else None,
+    }
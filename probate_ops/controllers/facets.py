@@ -0,0 +1,78 @@
+from probate_ops.core.cache import TTLCache
+from probate_ops.core.settings import settings
+from probate_ops.models.api import ChartFilters
+from probate_ops.models.database import ProbateRecord
+from probate_ops.utils.database import (
+    _apply_filters,
+    chart_filters_dep,
+    data_version,
+)
+from pydantic import BaseModel
+from fastapi import APIRouter, Depends
+from peewee import fn, Value
+from typing import Dict, List
+from typing_extensions import Annotated
+
+router = APIRouter(tags=["Facets"])
+
+# facet name -> (column, ChartFilters field that filters on it)
+FACETS = {
+    "county": (ProbateRecord.county, "counties"),
+    "petition_type": (ProbateRecord.petition_type, "petition_types"),
+    "tier": (ProbateRecord.tier, "tiers"),
+    "property_class": (ProbateRecord.property_class, "property_class"),
+}
+
+_cache = TTLCache(maxsize=512, ttl=settings.FACETS_CACHE_TTL)
+
+
+class FacetValue(BaseModel):
+    value: str
+    count: int
+
+
+class FacetsResponse(BaseModel):
+    facets: Dict[str, List[FacetValue]]
+
+
+def _facet_select(name: str, f: ChartFilters):
+    column, filter_field = FACETS[name]
+    # A facet never filters itself, so its dropdown keeps every option that
+    # is reachable under the *other* filters.
+    others = f.model_copy(update={filter_field: None})
+    return (
+        _apply_filters(ProbateRecord.select(), others)
+        .select(
+            Value(name).alias("facet"),
+            column.alias("value"),
+            fn.COUNT(Value(1)).alias("count"),
+        )
+        .where(column.is_null(False) & (column != ""))
+        .group_by(column)
+    )
+
+
+def _compute_facets(f: ChartFilters) -> FacetsResponse:
+    selects = [_facet_select(name, f) for name in FACETS]
+    query = selects[0]
+    for s in selects[1:]:
+        query = query + s  # UNION ALL -> a single round trip
+
+    facets: Dict[str, List[FacetValue]] = {name: [] for name in FACETS}
+    for row in query.dicts():
+        facets[row["facet"]].append(
+            FacetValue(value=str(row["value"]), count=row["count"])
+        )
+    for values in facets.values():
+        values.sort(key=lambda v: (-v.count, v.value))
+    return FacetsResponse(facets=facets)
+
+
+@router.get("/facets", response_model=FacetsResponse)
+def get_facets(f: Annotated[ChartFilters, Depends(chart_filters_dep)]):
+    key = (data_version(), f.model_dump_json())
+    cached = _cache.get(key)
+    if cached is None:
+        cached = _compute_facets(f)
+        _cache.set(key, cached)
+    return cached
@@ -1,5 +1,8 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
+from ..core.llm_metrics import collect
+from ..core.score_cache import score_cache
+from ..core.settings import settings
 from ..flows.full_enrich import build_graph
 
 router = APIRouter()
@@ -11,7 +14,20 @@ class FlowReq(BaseModel):
 
 
 @router.post("/flows/score")
-def run_flow(req: FlowReq):
-    state = {"records": req.records, "i": 0}
-    result = graph.invoke(state)
-    return {"records": result["records"], "count": len(result["records"])}
+async def run_flow(req: FlowReq):
+    state = {"records": req.records}
+    with collect() as llm:
+        result = await graph.ainvoke(
+            state, config={"max_concurrency": settings.FLOW_MAX_CONCURRENCY}
+        )
+    return {
+        "records": result["records"],
+        "count": len(result["records"]),
+        "scoring": result["scoring"],
+        "llm": llm.as_dict(),
+    }
+
+
+@router.get("/flows/score/cache")
+def score_cache_stats():
+    return score_cache.stats() if score_cache else {"enabled": False}
@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime
+from fastapi import APIRouter, HTTPException
+from ..models.database import ProbateRecord
+from ..tools.llm_score_tool import FALLBACK, scorer
+from ..utils.normalize import frame_from_rows, normalize
+
+router = APIRouter(prefix="/leads", tags=["Leads"])
+
+# lead id -> task generating its rationale, so concurrent opens of the same
+# lead share one LLM call
+_inflight: dict[int, asyncio.Task] = {}
+
+
+def _load(lead_id: int):
+    return (
+        ProbateRecord.select()
+        .where(ProbateRecord.id == lead_id)
+        .dicts()
+        .first()
+    )
+
+
+def _persist(lead_id: int, changes: dict) -> None:
+    # Only fill an empty slot: a rescore that landed meanwhile wins.
+    ProbateRecord.update(**changes).where(
+        (ProbateRecord.id == lead_id) & ProbateRecord.rationale.is_null()
+    ).execute()
+
+
+async def _generate(row: dict) -> dict:
+    record = normalize(frame_from_rows([row])).to_dict(orient="records")[0]
+    changes = {}
+    if row["score"] is None:
+        verdict = await scorer.score(record)
+        if verdict != FALLBACK:
+            changes = {**verdict, "scored_at": datetime.utcnow()}
+    else:
+        verdict = {"score": row["score"], "tier": row["tier"]}
+    rationale = await scorer.rationale(record, verdict)
+    if rationale is None:
+        raise HTTPException(503, "Rationale could not be generated")
+    changes["rationale"] = rationale
+    await asyncio.to_thread(_persist, row["id"], changes)
+    return {**verdict, "rationale": rationale, "cached": False}
+
+
+@router.get("/{lead_id}/rationale")
+async def lead_rationale(lead_id: int):
+    """Rationale for one lead, generated by the LLM the first time it is asked for."""
+    row = await asyncio.to_thread(_load, lead_id)
+    if row is None:
+        raise HTTPException(404, "Lead not found")
+    if row["rationale"]:
+        return {
+            "id": lead_id,
+            "score": row["score"],
+            "tier": row["tier"],
+            "rationale": row["rationale"],
+            "cached": True,
+        }
+    task = _inflight.get(lead_id)
+    if task is None:
+        task = _inflight[lead_id] = asyncio.create_task(_generate(row))
+        task.add_done_callback(lambda _: _inflight.pop(lead_id, None))
+    return {"id": lead_id, **await asyncio.shield(task)}
@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..core.llm_metrics import llm_metrics
+from ..core.registry import registry
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape target for LLM call and tool metrics."""
+    return llm_metrics.prometheus() + registry.prometheus()
+
+
+@router.get("/metrics/llm")
+def llm_metrics_json():
+    """The same counters as JSON, one entry per (model, call site)."""
+    return {"series": llm_metrics.snapshot()}
+
+
+@router.get("/metrics/tools")
+def tool_metrics_json():
+    """Per-tool call, error, timeout and memo counters from the registry."""
+    return {"tools": registry.stats()}
@@ -0,0 +1,202 @@
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from .settings import settings
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implied.
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+COUNTERS = (
+    "calls",
+    "errors",
+    "retries",
+    "fallbacks",
+    "cache_hits",
+    "cache_misses",
+    "prompt_tokens",
+    "completion_tokens",
+)
+
+
+def cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD for one call, from the LLM_PRICES table."""
+    prompt_price, completion_price = settings.LLM_PRICES.get(model, (0, 0))
+    return (
+        prompt_tokens * prompt_price + completion_tokens * completion_price
+    ) / 1_000_000
+
+
+class _Series:
+    def __init__(self):
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.cost = 0.0
+        self.latency_sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def snapshot(self) -> dict:
+        calls = self.counts["calls"]
+        return {
+            **self.counts,
+            "cost_usd": round(self.cost, 6),
+            "latency_sum": round(self.latency_sum, 4),
+            "latency_avg": self.latency_sum / calls if calls else 0.0,
+        }
+
+
+class LLMMetrics:
+    """Counters and latency histograms for LLM calls, per (model, site).
+
+    `site` names the call site (score, score_batch, rationale, ...). Every
+    event also lands in the summary opened by `collect()` for the current
+    request, if any, so endpoints can report what their own request cost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, str], _Series] = {}
+
+    def _get(self, model: str, site: str) -> _Series:
+        key = (model, site)
+        if key not in self._series:
+            self._series[key] = _Series()
+        return self._series[key]
+
+    def _count(self, model: str, site: str, **counts) -> None:
+        with self._lock:
+            series = self._get(model, site)
+            for name, n in counts.items():
+                series.counts[name] += n
+        if (summary := _current.get()) is not None:
+            summary.add(counts)
+
+    def call(
+        self,
+        model: str,
+        site: str,
+        latency: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        error: bool = False,
+    ) -> None:
+        spent = cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            series = self._get(model, site)
+            series.cost += spent
+            series.latency_sum += latency
+            series.buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self._count(
+            model,
+            site,
+            calls=1,
+            errors=int(error),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+        )
+        if (summary := _current.get()) is not None:
+            summary.add({"cost_usd": spent, "latency_sum": latency})
+
+    def retry(self, model: str, site: str) -> None:
+        self._count(model, site, retries=1)
+
+    def fallback(self, model: str, site: str, n: int = 1) -> None:
+        self._count(model, site, fallbacks=n)
+
+    def cache(self, model: str, site: str, hits: int, misses: int) -> None:
+        self._count(model, site, cache_hits=hits, cache_misses=misses)
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return [
+                {"model": model, "site": site, **s.snapshot()}
+                for (model, site), s in sorted(self._series.items())
+            ]
+
+    def prometheus(self) -> str:
+        """Text exposition format for a Prometheus scrape."""
+        lines = []
+        with self._lock:
+            items = sorted(self._series.items())
+            for name in COUNTERS:
+                metric = f"llm_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (model, site), s in items:
+                    lines.append(
+                        f'{metric}{{model="{model}",site="{site}"}} '
+                        f"{s.counts[name]}"
+                    )
+            lines.append("# TYPE llm_cost_usd_total counter")
+            for (model, site), s in items:
+                lines.append(
+                    f'llm_cost_usd_total{{model="{model}",site="{site}"}} '
+                    f"{s.cost:.6f}"
+                )
+            lines.append("# TYPE llm_latency_seconds histogram")
+            for (model, site), s in items:
+                labels = f'model="{model}",site="{site}"'
+                running = 0
+                for bound, n in zip((*LATENCY_BUCKETS, "+Inf"), s.buckets):
+                    running += n
+                    lines.append(
+                        f'llm_latency_seconds_bucket{{{labels},le="{bound}"}} '
+                        f"{running}"
+                    )
+                lines.append(
+                    f"llm_latency_seconds_sum{{{labels}}} {s.latency_sum:.4f}"
+                )
+                lines.append(
+                    f"llm_latency_seconds_count{{{labels}}} "
+                    f"{s.counts['calls']}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class RequestSummary:
+    """LLM usage of one API request, across every task it spawned."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals = {
+            **dict.fromkeys(COUNTERS, 0),
+            "cost_usd": 0.0,
+            "latency_sum": 0.0,
+        }
+
+    def add(self, counts: dict) -> None:
+        with self._lock:
+            for name, n in counts.items():
+                self.totals[name] += n
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            out = dict(self.totals)
+        out["cost_usd"] = round(out["cost_usd"], 6)
+        out["latency_sum"] = round(out["latency_sum"], 4)
+        return out
+
+
+_current: ContextVar[Optional[RequestSummary]] = ContextVar(
+    "llm_request_summary", default=None
+)
+
+
+@contextmanager
+def collect():
+    """Gather LLM usage for the enclosed work into a RequestSummary.
+
+    Context variables are copied into asyncio tasks and to_thread calls,
+    so calls made from fan-out branches are counted too.
+    """
+    summary = RequestSummary()
+    token = _current.set(summary)
+    try:
+        yield summary
+    finally:
+        _current.reset(token)
+
+
+llm_metrics = LLMMetrics()
@@ -0,0 +1,102 @@
+import hashlib, json, os, sqlite3, threading, time
+from typing import Optional
+from .settings import settings
+
+
+def query_key(normalized_sql: str, dataset_hash: str) -> str:
+    return hashlib.sha256(
+        f"{dataset_hash}|{normalized_sql}".encode()
+    ).hexdigest()
+
+
+class QueryCache:
+    """Answers to /ask SQL queries, keyed by normalized SQL + dataset hash.
+
+    Same SQLite layout and LRU/TTL policy as ScoreCache. A dataset is
+    content-addressed, so a changed file simply misses.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.QUERY_CACHE_PATH,
+        ttl: float = settings.QUERY_CACHE_TTL,
+        max_entries: int = settings.QUERY_CACHE_MAX_ENTRIES,
+    ):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.con = sqlite3.connect(path, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS queries (
+                key TEXT PRIMARY KEY,
+                dataset_hash TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS queries_accessed
+                ON queries (accessed_at);
+            """
+        )
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self.con.execute(
+                "SELECT result FROM queries WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.con.execute(
+                "UPDATE queries SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.con.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, dataset_hash: str, sql: str, result: dict) -> None:
+        now = time.time()
+        with self._lock:
+            self.con.execute(
+                "INSERT OR REPLACE INTO queries VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    dataset_hash,
+                    sql,
+                    json.dumps(result, default=str),
+                    now,
+                    now,
+                ),
+            )
+            self.con.execute(
+                "DELETE FROM queries WHERE created_at < ? OR key IN ("
+                "SELECT key FROM queries ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (now - self.ttl, self.max_entries),
+            )
+            self.con.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (size,) = self.con.execute(
+                "SELECT COUNT(*) FROM queries"
+            ).fetchone()
+        total = self.hits + self.misses
+        return {
+            "entries": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+query_cache = QueryCache()
@@ -0,0 +1,185 @@
+import hashlib, re, threading, time
+from collections import OrderedDict
+from typing import Any, Optional
+import numpy as np
+from .settings import settings
+
+STOPWORDS = frozenset("""
+    a an the of for to in on at by per with from and or is are was were be
+    been do does did what which who whom how many much show me give list
+    tell please all each every there their this that these those it its
+    i we you my our your can could would should will have has had as into
+    over than then so just about
+    """.split())
+_PRIME = (1 << 31) - 1  # Mersenne; a * x below it never overflows uint64
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercased content words; numbers become '#', plurals lose their 's'.
+
+    "Show me the leads by county" and "leads per county?" both become
+    "lead county"; "top 5 counties" and "top 10 county" share "top # county".
+    """
+    words = []
+    for token in _TOKEN.findall(question.lower()):
+        if token in STOPWORDS:
+            continue
+        if token.isdigit():
+            token = "#"
+        elif token.endswith("ies") and len(token) > 4:
+            token = token[:-3] + "y"
+        elif (
+            token.endswith("s") and not token.endswith("ss") and len(token) > 3
+        ):
+            token = token[:-1]
+        words.append(token)
+    return " ".join(words)
+
+
+def _shingles(text: str, k: int) -> set[str]:
+    text = f" {text} "
+    return {text[i : i + k] for i in range(max(len(text) - k + 1, 1))}
+
+
+class MinHash:
+    """Random hash functions (a * x + b) mod p over 31-bit shingle hashes."""
+
+    def __init__(self, num_perm: int, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, shingles: set[str]) -> np.ndarray:
+        x = np.array(
+            [
+                int.from_bytes(
+                    hashlib.blake2b(s.encode(), digest_size=4).digest(), "big"
+                )
+                for s in shingles
+            ],
+            dtype=np.uint64,
+        ) % np.uint64(_PRIME)
+        hashed = (np.outer(x, self.a) + self.b) % np.uint64(_PRIME)
+        return hashed.min(axis=0)
+
+
+class QuestionCache:
+    """Parsed-question results shared by every /ask thread.
+
+    Lookups are exact on (schema fingerprint, normalized question) first,
+    then near-duplicate via MinHash LSH over character shingles: questions
+    sharing a band are candidates, and the best one whose estimated Jaccard
+    similarity reaches `threshold` is a hit. Entries are LRU-evicted past
+    `max_entries` and expire after `ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        threshold: float = settings.QUESTION_CACHE_THRESHOLD,
+        max_entries: int = settings.QUESTION_CACHE_MAX_ENTRIES,
+        ttl: float = settings.QUESTION_CACHE_TTL,
+        num_perm: int = settings.QUESTION_CACHE_NUM_PERM,
+        bands: int = settings.QUESTION_CACHE_BANDS,
+        shingle_size: int = 3,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.minhash = MinHash(num_perm)
+        # (fingerprint, normalized) -> (created, signature, value)
+        self._entries: OrderedDict[tuple, tuple] = OrderedDict()
+        # (fingerprint, band no, band bytes) -> keys of entries in that bucket
+        self._buckets: dict[tuple, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def _bands(self, fingerprint: str, sig: np.ndarray):
+        for i in range(self.bands):
+            band = sig[i * self.rows : (i + 1) * self.rows].tobytes()
+            yield (fingerprint, i, band)
+
+    def _drop(self, key: tuple) -> None:
+        _, sig, _ = self._entries.pop(key)
+        for bucket in self._bands(key[0], sig):
+            members = self._buckets.get(bucket)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._buckets[bucket]
+
+    def _live(self, key: tuple, now: float) -> bool:
+        created = self._entries[key][0]
+        if now - created < self.ttl:
+            return True
+        self._drop(key)
+        return False
+
+    def get(self, question: str, fingerprint: str) -> Optional[Any]:
+        normalized = normalize_question(question)
+        key = (fingerprint, normalized)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries and self._live(key, now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][2]
+            sig = self.minhash.signature(
+                _shingles(normalized, self.shingle_size)
+            )
+            candidates = set()
+            for bucket in self._bands(fingerprint, sig):
+                candidates |= self._buckets.get(bucket, set())
+            best, best_sim = None, self.threshold
+            for cand in candidates:
+                if not self._live(cand, now):
+                    continue
+                sim = float(np.mean(self._entries[cand][1] == sig))
+                if sim >= best_sim:
+                    best, best_sim = cand, sim
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.near_hits += 1
+            return self._entries[best][2]
+
+    def put(self, question: str, fingerprint: str, value: Any) -> None:
+        normalized = normalize_question(question)
+        key = (fingerprint, normalized)
+        sig = self.minhash.signature(_shingles(normalized, self.shingle_size))
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic(), sig, value)
+            for bucket in self._bands(fingerprint, sig):
+                self._buckets.setdefault(bucket, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.near_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.near_hits) / total if total else 0.0,
+        }
+
+
+question_cache: Optional[QuestionCache] = (
+    QuestionCache() if settings.QUESTION_CACHE_ENABLED else None
+)
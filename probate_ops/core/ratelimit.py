@@ -0,0 +1,166 @@
+import asyncio, re, threading, time
+from typing import Mapping, Optional
+from .settings import settings
+
+INTERACTIVE, BULK = 0, 1
+DEFAULT_OUTPUT_TOKENS = 256  # assumed completion size when max_tokens unset
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1  # ~4 chars per token for English/JSON
+
+
+def estimate_request_tokens(request: dict) -> int:
+    """Prompt + expected completion tokens for a chat.completions request."""
+    prompt = sum(
+        estimate_tokens(str(m.get("content", "")))
+        for m in request.get("messages", [])
+    )
+    return prompt + (request.get("max_tokens") or DEFAULT_OUTPUT_TOKENS)
+
+
+def _duration(value: str) -> float:
+    """Seconds in an OpenAI reset header such as '1s', '6m0s' or '20ms'."""
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(
+        float(n) * units[u]
+        for n, u in re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value or "")
+    )
+
+
+class _Bucket:
+    def __init__(self, capacity: float, window: float = 60.0):
+        self.capacity = float(capacity)
+        self.level = float(capacity)
+        self.window = window
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.window
+
+    def refill(self, now: float) -> None:
+        self.level = min(
+            self.capacity, self.level + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def wait_for(self, amount: float, floor: float) -> float:
+        """Seconds until `amount` can be taken while leaving `floor` behind."""
+        amount = min(amount, self.capacity - floor)  # oversize never starves
+        deficit = amount + floor - self.level
+        return 0.0 if deficit <= 0 else deficit / self.rate
+
+
+class RateLimiter:
+    """Token-bucket admission for OpenAI requests-per-minute and tokens.
+
+    Every LLM call site acquires here first with an estimate of its tokens.
+    Bulk work may only use the buckets above `interactive_reserve` of their
+    capacity and yields while interactive callers are waiting, so `/ask`
+    keeps flowing during a scoring run. `x-ratelimit-*` response headers
+    resize the buckets to what the server reports, and a 429 pauses
+    admission for its Retry-After.
+    """
+
+    def __init__(
+        self,
+        rpm: int = settings.OPENAI_RPM,
+        tpm: int = settings.OPENAI_TPM,
+        interactive_reserve: float = settings.RATE_LIMIT_INTERACTIVE_RESERVE,
+    ):
+        self.requests = _Bucket(rpm)
+        self.tokens = _Bucket(tpm)
+        self.reserve = interactive_reserve
+        self._lock = threading.Lock()
+        self._interactive_waiting = 0
+        self._paused_until = 0.0
+
+    def _admit(self, tokens: int, priority: int) -> float:
+        """Take capacity and return 0, or return how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if priority == BULK and self._interactive_waiting:
+                return 0.05
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            share = self.reserve if priority == BULK else 0.0
+            wait = max(
+                self.requests.wait_for(1, share * self.requests.capacity),
+                self.tokens.wait_for(tokens, share * self.tokens.capacity),
+            )
+            if wait <= 0:
+                self.requests.level -= 1
+                self.tokens.level -= tokens
+            return wait
+
+    def _waiting(self, priority: int, delta: int) -> None:
+        if priority == INTERACTIVE:
+            with self._lock:
+                self._interactive_waiting += delta
+
+    async def acquire(self, tokens: int, priority: int = BULK) -> None:
+        self._waiting(priority, +1)
+        try:
+            while (wait := self._admit(tokens, priority)) > 0:
+                await asyncio.sleep(min(wait, 1.0))
+        finally:
+            self._waiting(priority, -1)
+
+    def acquire_sync(self, tokens: int, priority: int = BULK) -> None:
+        self._waiting(priority, +1)
+        try:
+            while (wait := self._admit(tokens, priority)) > 0:
+                time.sleep(min(wait, 1.0))
+        finally:
+            self._waiting(priority, -1)
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Refund (or charge) the gap between estimated and real usage."""
+        if actual is None:
+            return
+        with self._lock:
+            self.tokens.level = min(
+                self.tokens.capacity, self.tokens.level + estimated - actual
+            )
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        with self._lock:
+            for bucket, kind in (
+                (self.requests, "requests"),
+                (self.tokens, "tokens"),
+            ):
+                limit = headers.get(f"x-ratelimit-limit-{kind}")
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if limit and limit.isdigit():
+                    bucket.capacity = float(limit)
+                if remaining and remaining.isdigit():
+                    bucket.level = min(bucket.level, float(remaining))
+                    if float(remaining) == 0:
+                        reset = _duration(
+                            headers.get(f"x-ratelimit-reset-{kind}", "")
+                        )
+                        self._pause(reset)
+
+    def _pause(self, seconds: float) -> None:
+        self._paused_until = max(
+            self._paused_until, time.monotonic() + seconds
+        )
+
+    def penalize(self, headers: Optional[Mapping[str, str]]) -> None:
+        """Back off everyone after a 429, honouring Retry-After if given."""
+        headers = headers or {}
+        if "retry-after-ms" in headers:
+            seconds = float(headers["retry-after-ms"]) / 1000
+        else:
+            try:
+                seconds = float(headers.get("retry-after", 1))
+            except ValueError:
+                seconds = 1.0
+        with self._lock:
+            self._pause(seconds)
+
+
+limiter = RateLimiter()
@@ -1,17 +1,203 @@
-from typing import Callable, Any
+import asyncio, contextvars, functools, inspect, json, threading, time, weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Any, Optional
+from .settings import settings
+
+
+class Tool:
+    """A registered callable plus its limits, memo table and counters."""
+
+    def __init__(
+        self,
+        fn: Callable[..., Any],
+        timeout: Optional[float],
+        concurrency: Optional[int],
+        memoize: int,
+    ):
+        self.fn = fn
+        self.is_async = inspect.iscoroutinefunction(fn)
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.memoize = memoize
+        self.memo: OrderedDict[str, Any] = OrderedDict()
+        self.lock = threading.Lock()
+        # sync tools share one limit whether reached via call() or acall()
+        self.slots = threading.BoundedSemaphore(concurrency or 1 << 30)
+        # async limits: semaphores bind to one loop, so keep one per loop
+        self._aslots: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.counts = {
+            "calls": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "memo_hits": 0,
+            "latency_sum": 0.0,
+            "latency_max": 0.0,
+        }
+
+    def aslots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            sem = self._aslots.get(loop)
+            if sem is None:
+                sem = self._aslots[loop] = asyncio.Semaphore(
+                    self.concurrency or 1 << 30
+                )
+        return sem
+
+    def key(self, kwargs: dict) -> Optional[str]:
+        """Memo key, or None when disabled or the arguments are not JSON."""
+        if not self.memoize:
+            return None
+        try:
+            return json.dumps(kwargs, sort_keys=True)
+        except TypeError:
+            return None
+
+    def lookup(self, key: Optional[str]):
+        if key is None:
+            return False, None
+        with self.lock:
+            if key not in self.memo:
+                return False, None
+            self.memo.move_to_end(key)
+            self.counts["memo_hits"] += 1
+            return True, self.memo[key]
+
+    def remember(self, key: Optional[str], value: Any) -> None:
+        if key is None:
+            return
+        with self.lock:
+            self.memo[key] = value
+            while len(self.memo) > self.memoize:
+                self.memo.popitem(last=False)
+
+    def record(self, latency: float, error: bool, timeout: bool) -> None:
+        with self.lock:
+            c = self.counts
+            c["calls"] += 1
+            c["errors"] += int(error)
+            c["timeouts"] += int(timeout)
+            c["latency_sum"] += latency
+            c["latency_max"] = max(c["latency_max"], latency)
+
+    def run_sync(self, kwargs: dict):
+        with self.slots:
+            return self.fn(**kwargs)
 
 
 class ToolRegistry:
-    def __init__(self):
-        self._tools: dict[str, Callable[..., Any]] = {}
+    """Named tools callable from flows, sync (`call`) or async (`acall`).
 
-    def register(self, name: str, fn: Callable[..., Any]):
-        self._tools[name] = fn
+    `acall` awaits async tools directly and runs sync ones on the
+    registry's thread pool, so a blocking tool never stalls the event
+    loop. Each tool may carry a timeout, a concurrency limit and an LRU
+    memo of `memoize` entries (for pure tools with JSON arguments). A
+    timed-out sync tool keeps its worker thread until it returns; only
+    the caller stops waiting.
+    """
 
-    def call(self, name: str, **kwargs):
+    def __init__(self, max_workers: int = settings.TOOL_MAX_WORKERS):
+        self._tools: dict[str, Tool] = {}
+        self._max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def register(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        timeout: Optional[float] = settings.TOOL_TIMEOUT,
+        concurrency: Optional[int] = None,
+        memoize: int = 0,
+    ):
+        self._tools[name] = Tool(fn, timeout, concurrency, memoize)
+
+    def _get(self, name: str) -> Tool:
         if name not in self._tools:
             raise KeyError(f"tool '{name}' not found")
-        return self._tools[name](**kwargs)
+        return self._tools[name]
+
+    def call(self, name: str, **kwargs):
+        """Run a sync tool on the calling thread (no timeout applies)."""
+        tool = self._get(name)
+        if tool.is_async:
+            raise TypeError(f"tool '{name}' is async; use acall")
+        key = tool.key(kwargs)
+        hit, value = tool.lookup(key)
+        if hit:
+            return value
+        started, failed = time.perf_counter(), True
+        try:
+            value = tool.run_sync(kwargs)
+            failed = False
+        finally:
+            tool.record(time.perf_counter() - started, failed, False)
+        tool.remember(key, value)
+        return value
+
+    async def acall(self, name: str, **kwargs):
+        tool = self._get(name)
+        key = tool.key(kwargs)
+        hit, value = tool.lookup(key)
+        if hit:
+            return value
+        started, failed, timed_out = time.perf_counter(), True, False
+        try:
+            if tool.is_async:
+                async with tool.aslots():
+                    value = await asyncio.wait_for(
+                        tool.fn(**kwargs), tool.timeout
+                    )
+            else:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        self._max_workers, thread_name_prefix="tool"
+                    )
+                # carry context vars (e.g. the LLM request summary) along
+                ctx = contextvars.copy_context()
+                job = asyncio.get_running_loop().run_in_executor(
+                    self._pool,
+                    functools.partial(ctx.run, tool.run_sync, kwargs),
+                )
+                value = await asyncio.wait_for(job, tool.timeout)
+            failed = False
+        except asyncio.TimeoutError:
+            timed_out = True
+            raise TimeoutError(
+                f"tool '{name}' exceeded {tool.timeout}s"
+            ) from None
+        finally:
+            tool.record(time.perf_counter() - started, failed, timed_out)
+        tool.remember(key, value)
+        return value
+
+    def stats(self) -> dict:
+        out = {}
+        for name, tool in sorted(self._tools.items()):
+            with tool.lock:
+                counts = dict(tool.counts)
+            calls = counts["calls"]
+            counts["latency_avg"] = (
+                counts["latency_sum"] / calls if calls else 0.0
+            )
+            out[name] = {**counts, "memo_entries": len(tool.memo)}
+        return out
+
+    def prometheus(self) -> str:
+        lines = []
+        stats = self.stats()
+        for name in ("calls", "errors", "timeouts", "memo_hits"):
+            metric = f"tool_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for tool, s in stats.items():
+                lines.append(f'{metric}{{tool="{tool}"}} {s[name]}')
+        lines.append("# TYPE tool_latency_seconds_sum counter")
+        for tool, s in stats.items():
+            lines.append(
+                f'tool_latency_seconds_sum{{tool="{tool}"}} '
+                f"{s['latency_sum']:.4f}"
+            )
+        return "\n".join(lines) + "\n"
 
 
 registry = ToolRegistry()
@@ -0,0 +1,158 @@
+import hashlib, json, os, sqlite3, threading, time
+from typing import Iterable, Optional
+from .settings import settings
+
+EVICT_EVERY = 1000  # writes between eviction sweeps
+
+
+def fingerprint(minimal: dict, model: str, prompt_version: str) -> str:
+    """Cache key for one scoring call: record + model + prompt version."""
+    payload = json.dumps(minimal, sort_keys=True, default=str)
+    return hashlib.sha256(
+        f"{prompt_version}|{model}|{payload}".encode()
+    ).hexdigest()
+
+
+class ScoreCache:
+    """Durable lead-score cache in a local SQLite file.
+
+    Entries expire after `ttl` seconds and the table is trimmed to
+    `max_entries` by last access (LRU). Keys embed the prompt version, so a
+    new prompt simply misses; `invalidate()` drops a retired version. The
+    file is opened on first use, so importing the module writes nothing.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.SCORE_CACHE_PATH,
+        ttl: float = settings.SCORE_CACHE_TTL,
+        max_entries: int = settings.SCORE_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._con: Optional[sqlite3.Connection] = None
+
+    @property
+    def con(self) -> sqlite3.Connection:
+        # callers hold self._lock
+        if self._con is None:
+            self._con = self._connect()
+        return self._con
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        con = sqlite3.connect(self.path, check_same_thread=False)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS scores (
+                key TEXT PRIMARY KEY,
+                prompt_version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                verdict TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS scores_accessed ON scores (accessed_at);
+            CREATE INDEX IF NOT EXISTS scores_version ON scores (prompt_version);
+            """
+        )
+        return con
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, dict]:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found: dict[str, dict] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):  # SQLite variable limit
+                chunk = keys[i : i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self.con.execute(
+                    f"SELECT key, verdict FROM scores WHERE key IN ({marks}) "
+                    "AND created_at >= ?",
+                    (*chunk, now - self.ttl),
+                ).fetchall()
+                found.update((k, json.loads(v)) for k, v in rows)
+            if found:
+                self.con.executemany(
+                    "UPDATE scores SET accessed_at = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+                self.con.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(
+        self, verdicts: dict[str, dict], model: str, prompt_version: str
+    ) -> None:
+        if not verdicts:
+            return
+        now = time.time()
+        with self._lock:
+            self.con.executemany(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (k, prompt_version, model, json.dumps(v), now, now)
+                    for k, v in verdicts.items()
+                ],
+            )
+            self.con.commit()
+            self._writes += len(verdicts)
+            if self._writes >= EVICT_EVERY:
+                self._writes = 0
+                self._evict()
+
+    def _evict(self) -> int:
+        cur = self.con.execute(
+            "DELETE FROM scores WHERE created_at < ?",
+            (time.time() - self.ttl,),
+        )
+        removed = cur.rowcount
+        cur = self.con.execute(
+            "DELETE FROM scores WHERE key IN (SELECT key FROM scores "
+            "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self.con.commit()
+        return removed + cur.rowcount
+
+    def evict(self) -> int:
+        with self._lock:
+            return self._evict()
+
+    def invalidate(self, prompt_version: str) -> int:
+        with self._lock:
+            cur = self.con.execute(
+                "DELETE FROM scores WHERE prompt_version = ?",
+                (prompt_version,),
+            )
+            self.con.commit()
+            return cur.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            size, versions = self.con.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT prompt_version) FROM scores"
+            ).fetchone()
+        total = self.hits + self.misses
+        return {
+            "entries": size,
+            "prompt_versions": versions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+score_cache: Optional[ScoreCache] = (
+    ScoreCache() if settings.SCORE_CACHE_ENABLED else None
+)
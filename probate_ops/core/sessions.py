@@ -0,0 +1,133 @@
+import asyncio, json, logging
+from typing import AsyncIterator, Callable, Union
+from fastapi import WebSocket, WebSocketDisconnect
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+TRY_AGAIN_LATER = 1013  # websocket close code for "server overloaded"
+DONE = {"type": "done"}  # last frame of every answer that finished
+
+
+class SessionManager:
+    """Runs websocket conversations with bounded resources.
+
+    Each connection gets a bounded queue between the graph run and the
+    socket, so a slow client pauses its own run instead of buffering
+    without limit. Every frame is a JSON object with a `type`: text
+    chunks queued within `flush_ms` are coalesced into one "token"
+    frame, dicts from the stream are sent as frames of their own, and
+    each answer ends with a "done" frame, or an "error" frame if the
+    run failed. A new message cancels the run still in flight, a client
+    silent for `idle_timeout` with nothing running is closed, and
+    disconnecting cancels the run. Past `max_sessions` new connections
+    are refused with close code 1013.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = settings.WS_MAX_SESSIONS,
+        queue_size: int = settings.WS_SEND_QUEUE,
+        flush_ms: float = settings.WS_FLUSH_MS,
+        idle_timeout: float = settings.WS_IDLE_TIMEOUT,
+    ):
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        self.flush = flush_ms / 1000
+        self.idle_timeout = idle_timeout
+        self.active = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.frames = 0
+        self.chunks = 0
+
+    async def serve(
+        self,
+        websocket: WebSocket,
+        stream: Callable[[str], AsyncIterator[Union[str, dict]]],
+    ) -> None:
+        """Answer every message on `websocket` with `stream(message)`."""
+        await websocket.accept()
+        if self.active >= self.max_sessions:
+            self.rejected += 1
+            await websocket.close(TRY_AGAIN_LATER)
+            return
+        self.active += 1
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        writer = asyncio.create_task(self._write(websocket, queue))
+        run = None
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        websocket.receive_text(), self.idle_timeout
+                    )
+                except asyncio.TimeoutError:
+                    if run is None or run.done():
+                        await websocket.close()
+                        return
+                    continue
+                if run is not None and not run.done():
+                    run.cancel()
+                    self.cancelled += 1
+                    while not queue.empty():  # drop the stale answer
+                        queue.get_nowait()
+                run = asyncio.create_task(self._run(stream, message, queue))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.active -= 1
+            if run is not None and not run.done():
+                run.cancel()
+                self.cancelled += 1
+            writer.cancel()
+            await asyncio.gather(
+                *(t for t in (run, writer) if t), return_exceptions=True
+            )
+
+    async def _run(self, stream, message: str, queue: asyncio.Queue) -> None:
+        try:
+            async for chunk in stream(message):
+                if chunk:
+                    await queue.put(chunk)  # blocks while the client lags
+        except Exception:
+            logger.exception("websocket run failed")
+            await queue.put({"type": "error", "message": "answer failed"})
+            return
+        await queue.put(DONE)
+
+    async def _write(self, websocket: WebSocket, queue: asyncio.Queue) -> None:
+        held = None  # typed frame that ended the previous token run
+        while True:
+            item = held if held is not None else await queue.get()
+            held = None
+            if isinstance(item, str):
+                # let the window fill, then send the queued text as one frame
+                await asyncio.sleep(self.flush)
+                parts = [item]
+                while not queue.empty():
+                    item = queue.get_nowait()
+                    if not isinstance(item, str):
+                        held = item
+                        break
+                    parts.append(item)
+                self.chunks += len(parts)
+                self.frames += 1
+                item = {"type": "token", "text": "".join(parts)}
+            try:
+                await websocket.send_text(json.dumps(item, default=str))
+            except (WebSocketDisconnect, RuntimeError):
+                return
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "max_sessions": self.max_sessions,
+            "rejected": self.rejected,
+            "cancelled_runs": self.cancelled,
+            "frames": self.frames,
+            "chunks": self.chunks,
+        }
+
+
+sessions = SessionManager()
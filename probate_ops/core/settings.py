@@ -1,4 +1,5 @@
 import os
+from typing import Literal, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -7,8 +8,81 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str
     POSTGRES_PASSWORD: str
     OPENAI_MODEL: str = "gpt-4o-mini"
+    OPENAI_BASE_URL: Optional[str] = None  # OpenAI-compatible endpoint
+    LLM_CONCURRENCY: int = 8  # in-flight scoring calls per process
+    LLM_TIMEOUT: float = 30.0  # seconds per call
+    LLM_MAX_RETRIES: int = 3
+    LLM_BACKOFF_BASE: float = 0.5  # seconds
+    LLM_BACKOFF_MAX: float = 8.0
+    # USD per 1M (prompt, completion) tokens, for the cost estimate in
+    # LLM metrics; unknown models count as free.
+    LLM_PRICES: dict[str, tuple[float, float]] = {
+        "gpt-4o-mini": (0.15, 0.60),
+        "gpt-4o": (2.50, 10.00),
+        "gpt-4.1-mini": (0.40, 1.60),
+        "gpt-4.1": (2.00, 8.00),
+    }
+    OPENAI_RPM: int = 500  # starting limits; x-ratelimit-* headers adjust
+    OPENAI_TPM: int = 200_000
+    RATE_LIMIT_INTERACTIVE_RESERVE: float = 0.2  # kept free for /ask
+    LLM_BATCH_SCORING: bool = True  # several records per scoring prompt
+    LLM_BATCH_TOKEN_BUDGET: int = 4000  # prompt + expected output tokens
+    LLM_BATCH_MAX_SIZE: int = 25
+    ANALYZE_CHUNK_ROWS: int = 1000  # upload rows read per step when streaming
+    # Rule scores inside [LOW, HIGH] are ambiguous and go to the LLM;
+    # 0/100 sends everything, HIGH < LOW sends nothing.
+    RULE_BAND_LOW: int = 35
+    RULE_BAND_HIGH: int = 75
+    FLOW_CHUNK_SIZE: int = 100  # records per fan-out branch in /flows/score
+    FLOW_MAX_CONCURRENCY: int = 16  # branches running at once
+    TOOL_TIMEOUT: float = 120.0  # default per-call limit for registry.acall
+    TOOL_MAX_WORKERS: int = 8  # threads running sync tools for acall
+    ENRICH_WORKER_ENABLED: bool = False  # run the worker inside the API
+    ENRICH_BATCH_SIZE: int = 200  # rows claimed per round
+    ENRICH_LEASE_SECONDS: int = 600  # claim expiry if a worker dies
+    ENRICH_IDLE_SLEEP: float = 30.0  # seconds between empty polls
+    SCORE_STALE_DAYS: int = 30  # re-score stored leads older than this
+    BATCH_SCORE_MAX_ROWS: int = 50_000  # OpenAI Batch API request cap
+    BATCH_POLL_INTERVAL: float = 60.0  # seconds
+    SCORE_CACHE_ENABLED: bool = True
+    SCORE_CACHE_PATH: str = "./_cache/scores.sqlite"
+    SCORE_CACHE_TTL: int = 7 * 24 * 3600  # seconds
+    SCORE_CACHE_MAX_ENTRIES: int = 200_000
     DB_URL: str = "duckdb:///probate_ops/data/duckdb.db"
+    DUCKDB_THREADS: int = 4
+    DUCKDB_MEMORY_LIMIT: str = "2GB"
+    DUCKDB_TEMP_DIR: str = "./_cache/duckdb_tmp"  # spill space for big sorts
+    DUCKDB_MAX_TEMP_SIZE: str = "10GB"  # spill cap, on top of memory_limit
+    # run_sql governance: wall-clock cap, pre-flight plan size, query log
+    SQL_TIMEOUT: float = 30.0  # seconds
+    SQL_MAX_ESTIMATED_ROWS: int = 100_000_000  # per plan operator
+    SQL_QUERY_LOG: bool = True
     BLOB_DIR: str = "./_blobs"
+    # write_df(parquet=True) copies into BLOB_DIR/parquet/<table>, hive-style
+    PARQUET_PARTITION_BY: list[str] = ["county", "month"]
+    PARQUET_MONTH_COLUMN: str = "petition_date"  # source of the month key
+    FACETS_CACHE_TTL: int = 300  # seconds
+    ASK_SAMPLE_ROWS: int = 50  # rows read from an upload for type inference
+    ASK_RESULT_ROWS: int = 20  # result rows shown to the summarizing LLM
+    DF_ENGINE: Literal["duckdb", "pandas"] = "duckdb"  # run_df backend
+    # Parsed /ask questions shared across threads; near-duplicates match by
+    # MinHash estimate of Jaccard similarity over character shingles.
+    QUESTION_CACHE_ENABLED: bool = True
+    QUESTION_CACHE_THRESHOLD: float = 0.8
+    QUESTION_CACHE_MAX_ENTRIES: int = 5000
+    QUESTION_CACHE_TTL: int = 7 * 24 * 3600  # seconds
+    QUESTION_CACHE_NUM_PERM: int = 64
+    QUESTION_CACHE_BANDS: int = 16  # LSH bands; must divide NUM_PERM
+    QUERY_CACHE_PATH: str = "./_cache/queries.sqlite"
+    QUERY_CACHE_TTL: int = 24 * 3600  # seconds
+    QUERY_CACHE_MAX_ENTRIES: int = 10_000
+    WS_MAX_SESSIONS: int = 500  # concurrent /ws connections per process
+    WS_SEND_QUEUE: int = 256  # chunks buffered per connection
+    WS_FLUSH_MS: float = 50.0  # chunks are coalesced into one frame per window
+    WS_IDLE_TIMEOUT: float = 300.0  # seconds without a message or a run
+    CHECKPOINT_PATH: str = "./_cache/checkpoints.sqlite"  # /ask threads
+    CHECKPOINT_TTL: int = 7 * 24 * 3600  # idle threads are deleted after
+    CHECKPOINT_PRUNE_INTERVAL: float = 3600.0  # seconds
 
 
 settings = Settings()
@@ -1,6 +1,10 @@
-import os, uuid, duckdb, pandas as pd
+import hashlib, json, logging, math, os, re, threading, time, uuid
+import duckdb, pandas as pd, pyarrow as pa
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, Union
 from .settings import settings
 
+logger = logging.getLogger(__name__)
+
 os.makedirs(settings.BLOB_DIR, exist_ok=True)
 
 
@@ -12,24 +16,424 @@ class BlobStore:
             f.write(bytes_)
         return path
 
+    def save_as(self, bytes_: bytes, name: str) -> str:
+        """Write to a stable, caller-chosen name (e.g. 'models/x/v1.npz')."""
+        path = os.path.join(settings.BLOB_DIR, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(bytes_)
+        return path
+
+    def save_stream(
+        self, stream: BinaryIO, folder: str, suffix: str
+    ) -> tuple[str, str]:
+        """Content-addressed copy of a stream: returns (sha256, path).
+
+        Identical uploads land on the same file, so the digest doubles as
+        a dataset version for caches.
+        """
+        os.makedirs(os.path.join(settings.BLOB_DIR, folder), exist_ok=True)
+        tmp = os.path.join(settings.BLOB_DIR, folder, f".{uuid.uuid4().hex}")
+        digest = hashlib.sha256()
+        with open(tmp, "wb") as f:
+            while chunk := stream.read(1024 * 1024):
+                digest.update(chunk)
+                f.write(chunk)
+        path = os.path.join(
+            settings.BLOB_DIR, folder, f"{digest.hexdigest()}{suffix}"
+        )
+        os.replace(tmp, path)
+        return digest.hexdigest(), path
+
+    def path(self, name: str) -> str:
+        return os.path.join(settings.BLOB_DIR, name)
+
+    def read(self, path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
 
 blobstore = BlobStore()
 
 
-class SQLStore:
-    def __init__(self):
-        self.con = duckdb.connect(
-            settings.DB_URL.replace("duckdb:///", "")
-        )  # dev default
-        self.con.execute("PRAGMA threads=4")
-
-    def write_df(self, df: pd.DataFrame, table: str):
-        self.con.execute(
-            f"CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM df LIMIT 0"
+Frame = Union[
+    pd.DataFrame, pa.Table, pa.RecordBatchReader, Iterable[pa.RecordBatch]
+]
+
+
+def _ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _chunks(data: Frame) -> Iterator[Union[pd.DataFrame, pa.Table]]:
+    """Scannable pieces of `data`; record batches are wrapped, not copied."""
+    if isinstance(data, (pd.DataFrame, pa.Table)):
+        yield data
+        return
+    for batch in data:
+        yield pa.Table.from_batches([batch])
+
+
+class QueryRejected(ValueError):
+    """The pre-flight plan estimate exceeds SQL_MAX_ESTIMATED_ROWS."""
+
+
+def plan_estimates(plan: list) -> tuple[int, int]:
+    """(largest operator cardinality, rows scanned) from an EXPLAIN JSON plan.
+
+    Both are planner estimates; a filtered scan reports rows after the
+    pushed-down filter. Operators without an estimate inherit their
+    largest child's, except a cross product, which is the product of its
+    children.
+    """
+    peak = scanned = 0
+
+    def walk(node: dict) -> int:
+        nonlocal peak, scanned
+        kids = [walk(child) for child in node.get("children", [])]
+        info = node.get("extra_info")
+        est = (
+            info.get("Estimated Cardinality")
+            if isinstance(info, dict)
+            else None
         )
-        self.con.register("df", df)
-        self.con.execute(f"INSERT INTO {table} SELECT * FROM df")
-        self.con.unregister("df")
+        name = node.get("name", "")
+        if est is not None:
+            rows = int(re.sub(r"\D", "", str(est)) or 0)
+        elif "CROSS_PRODUCT" in name:
+            rows = math.prod(kids) if kids else 0
+        else:
+            rows = max(kids, default=0)
+        if "SCAN" in name:
+            scanned += rows
+        peak = max(peak, rows)
+        return rows
+
+    for node in plan:
+        walk(node)
+    return peak, scanned
+
+
+class SQLStore:
+    """Process-wide DuckDB database with one cursor per thread.
+
+    DuckDB allows a single read-write handle per file and process, so the
+    database is opened once, lazily, and every thread gets its own cursor
+    on it. `query()` runs inside a READ ONLY transaction; `write_df()`
+    appends Arrow data or DataFrames behind one writer lock, widening the
+    table when the incoming schema drifts. Threads, memory limit and spill
+    directory come from Settings.
+
+    `preview()` and `stream()` serve agent-written SQL and are governed:
+    an EXPLAIN pre-flight rejects plans whose estimated cardinality
+    exceeds SQL_MAX_ESTIMATED_ROWS, execution is interrupted after
+    SQL_TIMEOUT seconds, and every run lands in the `query_log` table.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.DB_URL.replace("duckdb:///", "")
+        self._db: Optional[duckdb.DuckDBPyConnection] = None
+        self._open_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._schemas: dict[str, dict[str, str]] = {}  # table -> column types
+
+    def _database(self) -> duckdb.DuckDBPyConnection:
+        if self._db is None:
+            with self._open_lock:
+                if self._db is None:
+                    if self.path != ":memory:":
+                        os.makedirs(
+                            os.path.dirname(self.path) or ".", exist_ok=True
+                        )
+                    os.makedirs(settings.DUCKDB_TEMP_DIR, exist_ok=True)
+                    self._db = duckdb.connect(
+                        self.path,
+                        config={
+                            "threads": settings.DUCKDB_THREADS,
+                            "memory_limit": settings.DUCKDB_MEMORY_LIMIT,
+                            "temp_directory": settings.DUCKDB_TEMP_DIR,
+                            "max_temp_directory_size": settings.DUCKDB_MAX_TEMP_SIZE,
+                        },
+                    )
+                    self._db.execute(
+                        "CREATE TABLE IF NOT EXISTS query_log ("
+                        "started_at TIMESTAMP, sql VARCHAR, status VARCHAR, "
+                        "elapsed_ms DOUBLE, rows_scanned BIGINT, "
+                        "estimated_rows BIGINT, row_count BIGINT, "
+                        "error VARCHAR)"
+                    )
+        return self._db
+
+    def cursor(self) -> duckdb.DuckDBPyConnection:
+        """This thread's cursor; cursors must not cross threads."""
+        cur = getattr(self._local, "cursor", None)
+        if cur is None or getattr(self._local, "db", None) is not self._db:
+            db = self._database()
+            with self._open_lock:
+                cur = self._local.cursor = db.cursor()
+            self._local.db = db
+        return cur
+
+    @property
+    def con(self) -> duckdb.DuckDBPyConnection:
+        return self.cursor()
+
+    def _schema(
+        self, con: duckdb.DuckDBPyConnection, table: str
+    ) -> dict[str, str]:
+        if table not in self._schemas:
+            rows = con.execute(
+                "SELECT column_name, data_type FROM information_schema.columns"
+                " WHERE table_name = ? ORDER BY ordinal_position",
+                [table],
+            ).fetchall()
+            if not rows:
+                return {}
+            self._schemas[table] = dict(rows)
+        return self._schemas[table]
+
+    def _widen(self, con: duckdb.DuckDBPyConnection, table: str) -> None:
+        """Add columns `_src` brings and widen those whose type changed."""
+        current = self._schema(con, table)
+        incoming = con.execute("DESCRIBE SELECT * FROM _src").fetchall()
+        for name, kind, *_ in incoming:
+            if name not in current:
+                con.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {_ident(name)} {kind}"
+                )
+                current[name] = kind
+            elif current[name] != kind:
+                try:
+                    (wider,) = con.execute(
+                        f"SELECT typeof(coalesce(NULL::{current[name]}, "
+                        f"NULL::{kind}))"
+                    ).fetchone()
+                except duckdb.BinderException:  # e.g. INTEGER vs VARCHAR
+                    wider = "VARCHAR"
+                if wider != current[name]:
+                    con.execute(
+                        f"ALTER TABLE {table} ALTER COLUMN {_ident(name)} "
+                        f"TYPE {wider}"
+                    )
+                    current[name] = wider
+
+    def _to_parquet(self, con: duckdb.DuckDBPyConnection, table: str) -> str:
+        """Append `_src` to BLOB_DIR/parquet/<table>, partitioned by Settings."""
+        path = os.path.join(settings.BLOB_DIR, "parquet", table)
+        os.makedirs(path, exist_ok=True)
+        columns = {
+            row[0]
+            for row in con.execute("DESCRIBE SELECT * FROM _src").fetchall()
+        }
+        select = "SELECT *"
+        month = settings.PARQUET_MONTH_COLUMN
+        if "month" not in columns and month in columns:
+            select += f", strftime(TRY_CAST({_ident(month)} AS DATE), '%Y-%m') AS month"
+            columns.add("month")
+        keys = [c for c in settings.PARQUET_PARTITION_BY if c in columns]
+        quoted = path.replace("'", "''")
+        if keys:
+            con.execute(
+                f"COPY ({select} FROM _src) TO '{quoted}' (FORMAT PARQUET, "
+                f"PARTITION_BY ({', '.join(map(_ident, keys))}), APPEND)"
+            )
+        else:
+            con.execute(
+                f"COPY ({select} FROM _src) TO "
+                f"'{quoted}/{uuid.uuid4().hex}.parquet' (FORMAT PARQUET)"
+            )
+        return path
+
+    def write_df(self, data: Frame, table: str, parquet: bool = False) -> int:
+        """Append `data` to `table`, creating it on first write.
+
+        Accepts a DataFrame, an Arrow table, or a RecordBatchReader /
+        iterable of record batches, which is consumed batch by batch.
+        Arrow data is scanned in place. Columns are matched by name: new
+        ones are added and changed types widened to a common supertype
+        (VARCHAR when there is none). With `parquet`, each chunk is also
+        appended to partitioned Parquet under BLOB_DIR. Returns rows
+        written.
+        """
+        written = 0
+        with self._write_lock:
+            con = self.cursor()
+            for chunk in _chunks(data):
+                con.register("_src", chunk)
+                try:
+                    if not self._schema(con, table):
+                        con.execute(
+                            f"CREATE TABLE {table} AS SELECT * FROM _src"
+                        )
+                        self._schemas.pop(table, None)
+                    else:
+                        self._widen(con, table)
+                        con.execute(
+                            f"INSERT INTO {table} BY NAME SELECT * FROM _src"
+                        )
+                    if parquet:
+                        self._to_parquet(con, table)
+                finally:
+                    con.unregister("_src")
+                written += len(chunk)
+        return written
 
     def query(self, sql: str) -> pd.DataFrame:
-        return self.con.execute(sql).df()
+        con = self.cursor()
+        con.execute("BEGIN TRANSACTION READ ONLY")
+        try:
+            return con.execute(sql).df()
+        finally:
+            con.execute("ROLLBACK")
+
+    def _check(
+        self, con: duckdb.DuckDBPyConnection, sql: str, entry: dict
+    ) -> None:
+        """Plan `sql` and refuse it if any operator is estimated too large."""
+        ((_, plan),) = con.execute(f"EXPLAIN (FORMAT JSON) {sql}").fetchall()
+        peak, scanned = plan_estimates(json.loads(plan))
+        entry.update(estimated_rows=peak, rows_scanned=scanned)
+        if peak > settings.SQL_MAX_ESTIMATED_ROWS:
+            raise QueryRejected(
+                f"query plan estimates {peak:,} rows "
+                f"(limit {settings.SQL_MAX_ESTIMATED_ROWS:,})"
+            )
+
+    @staticmethod
+    def _timed(con: duckdb.DuckDBPyConnection, fn: Callable, timeout: float):
+        """Run `fn`, interrupting whatever `con` executes after `timeout`s."""
+        timer = threading.Timer(timeout, con.interrupt)
+        timer.daemon = True
+        timer.start()
+        try:
+            return fn()
+        except duckdb.InterruptException as e:
+            raise TimeoutError(f"query exceeded {timeout}s") from e
+        finally:
+            timer.cancel()
+
+    def _log(self, sql: str, started: float, entry: dict) -> None:
+        if not settings.SQL_QUERY_LOG:
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        try:
+            with self._write_lock:
+                self.cursor().execute(
+                    "INSERT INTO query_log VALUES "
+                    "(now(), ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        sql,
+                        entry.get("status", "ok"),
+                        elapsed,
+                        entry.get("rows_scanned"),
+                        entry.get("estimated_rows"),
+                        entry.get("row_count"),
+                        entry.get("error"),
+                    ],
+                )
+        except duckdb.Error:
+            logger.exception("could not write query_log")
+
+    def preview(
+        self,
+        sql: str,
+        limit: int,
+        timeout: Optional[float] = None,
+        con: Optional[duckdb.DuckDBPyConnection] = None,
+    ) -> tuple[list[dict], int]:
+        """First `limit` rows of a query plus its total row count.
+
+        The query is wrapped rather than materialized: LIMIT is pushed
+        into the plan and the count runs as its own COUNT(*), both in one
+        read-only transaction. Rows come back through Arrow, not pandas.
+        `con` runs the query on another connection (e.g. a sandbox over
+        an upload) under the same guards; the log entry still lands here.
+        """
+        inner = sql.strip().rstrip(";")
+        timeout = settings.SQL_TIMEOUT if timeout is None else timeout
+        con = con or self.cursor()
+        entry: dict = {}
+        started = time.perf_counter()
+        con.execute("BEGIN TRANSACTION READ ONLY")
+        try:
+            self._check(con, inner, entry)
+
+            def run():
+                rows = (
+                    con.execute(
+                        f"SELECT * FROM ({inner}) AS q LIMIT {int(limit)}"
+                    )
+                    .fetch_arrow_table()
+                    .to_pylist()
+                )
+                (count,) = con.execute(
+                    f"SELECT COUNT(*) FROM ({inner}) AS q"
+                ).fetchone()
+                return rows, count
+
+            rows, count = self._timed(con, run, timeout)
+            entry["row_count"] = count
+        except Exception as e:
+            entry.update(status=type(e).__name__, error=str(e))
+            raise
+        finally:
+            con.execute("ROLLBACK")
+            self._log(inner, started, entry)
+        return rows, count
+
+    def stream(
+        self, sql: str, batch_rows: int, timeout: Optional[float] = None
+    ) -> Iterator[list[dict]]:
+        """Full result as lists of records, `batch_rows` at a time.
+
+        Uses a cursor of its own, so other queries on this thread do not
+        disturb a stream that is still being consumed. The timeout covers
+        producing the result, not the time the consumer spends on it.
+        """
+        timeout = settings.SQL_TIMEOUT if timeout is None else timeout
+        db = self._database()
+        with self._open_lock:
+            con = db.cursor()
+        entry: dict = {}
+        started = time.perf_counter()
+        produced = 0
+        try:
+            con.execute("BEGIN TRANSACTION READ ONLY")
+            self._check(con, sql, entry)
+            deadline = time.monotonic() + timeout
+            reader = self._timed(
+                con,
+                lambda: con.execute(sql).fetch_record_batch(batch_rows),
+                timeout,
+            )
+            while True:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise TimeoutError(f"query exceeded {timeout}s")
+                try:
+                    batch = self._timed(con, reader.read_next_batch, left)
+                except StopIteration:
+                    break
+                produced += batch.num_rows
+                yield batch.to_pylist()
+            entry["row_count"] = produced
+        except GeneratorExit:
+            entry.update(status="closed", row_count=produced)
+            raise
+        except Exception as e:
+            entry.update(status=type(e).__name__, error=str(e))
+            raise
+        finally:
+            con.close()
+            self._log(sql, started, entry)
+
+    def close(self) -> None:
+        with self._open_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            self._schemas.clear()
+
+
+sqlstore = SQLStore()
@@ -0,0 +1,74 @@
+"""Durable LangGraph checkpoints for conversational graphs (/ask, /ws).
+
+Checkpoints live in a local SQLite file. LangGraph's tables carry no
+timestamps, so a side table records each thread's last activity and
+`prune()` deletes threads idle for longer than the TTL.
+"""
+
+import asyncio, logging, os, time
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from ..core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def open_checkpointer(
+    path: str = settings.CHECKPOINT_PATH,
+) -> AsyncSqliteSaver:
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = await aiosqlite.connect(path)
+    await conn.execute("PRAGMA journal_mode=WAL")
+    saver = AsyncSqliteSaver(conn)
+    await saver.setup()
+    await conn.execute(
+        "CREATE TABLE IF NOT EXISTS thread_activity ("
+        "thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)"
+    )
+    await conn.commit()
+    return saver
+
+
+async def touch(saver: AsyncSqliteSaver, thread_id: str) -> None:
+    await saver.conn.execute(
+        "INSERT INTO thread_activity VALUES (?, ?) "
+        "ON CONFLICT (thread_id) DO UPDATE SET updated_at = excluded.updated_at",
+        (thread_id, time.time()),
+    )
+    await saver.conn.commit()
+
+
+async def prune(
+    saver: AsyncSqliteSaver, ttl: float = settings.CHECKPOINT_TTL
+) -> int:
+    """Delete every thread idle for more than `ttl` seconds."""
+    async with saver.conn.execute(
+        "SELECT thread_id FROM thread_activity WHERE updated_at < ?",
+        (time.time() - ttl,),
+    ) as cur:
+        expired = [row[0] for row in await cur.fetchall()]
+    for thread_id in expired:
+        await saver.adelete_thread(thread_id)
+        await saver.conn.execute(
+            "DELETE FROM thread_activity WHERE thread_id = ?", (thread_id,)
+        )
+    await saver.conn.commit()
+    return len(expired)
+
+
+async def prune_forever(
+    saver: AsyncSqliteSaver,
+    stop: asyncio.Event,
+    interval: float = settings.CHECKPOINT_PRUNE_INTERVAL,
+) -> None:
+    while not stop.is_set():
+        try:
+            if removed := await prune(saver):
+                logger.info("pruned %d idle conversation threads", removed)
+        except Exception:
+            logger.exception("checkpoint pruning failed")
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
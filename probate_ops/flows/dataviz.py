@@ -1,12 +1,23 @@
-import csv
-from typing import TypedDict, List
+import csv, hashlib, json, logging, re, time
+from typing import Annotated, Dict, Optional, TypedDict, List
 from pydantic import BaseModel
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
+from openai import RateLimitError
+from probate_ops.core.llm_metrics import llm_metrics
+from probate_ops.core.query_cache import query_cache, query_key
+from probate_ops.core.question_cache import question_cache
+from probate_ops.core.ratelimit import INTERACTIVE, estimate_tokens, limiter
 from probate_ops.core.registry import registry, ToolRegistry
 from probate_ops.core.settings import settings
+from probate_ops.core.storage import blobstore
+from probate_ops.tools.llm_score_tool import _backoff, _retryable
+from probate_ops.tools.sql_tool import _safe, normalize_sql, run_sql_file
 
+logger = logging.getLogger(__name__)
+
+DATASET_DIR = "datasets"  # /ask uploads, by content hash, under BLOB_DIR
 
 # ─────────────────── Models & State ───────────────────
 
@@ -16,10 +27,83 @@ class QuestionParserResponse(BaseModel):
     relevant_fields: List[str] = []
 
 
-class State(TypedDict):
+class SQLResponse(BaseModel):
+    sql: str
+
+
+class AnswerResponse(BaseModel):
+    answer: str
+
+
+MAX_REMEMBERED = 100  # parsed questions kept per thread
+
+
+def _remember(old: dict, new: dict) -> dict:
+    merged = {**(old or {}), **(new or {})}
+    return dict(list(merged.items())[-MAX_REMEMBERED:])
+
+
+def _schema_fingerprint(state: "State") -> str:
+    schema = json.dumps(
+        [state.get("columns") or [], state.get("column_types") or {}],
+        sort_keys=True,
+    )
+    return hashlib.sha256(schema.encode()).hexdigest()[:12]
+
+
+def _parse_key(state: "State") -> str:
+    """Question + schema fingerprint under which a parse is remembered."""
+    question = re.sub(r"\s+", " ", state["question"].strip().lower())
+    return f"{_schema_fingerprint(state)}|{question.rstrip('?.! ')}"
+
+
+def _schema_text(state: "State") -> str:
+    # Prefer explicit schema if present; otherwise try to read from DictReader
+    schema = (
+        state.get("columns")
+        or state.get("file_schema")
+        or getattr(state.get("file"), "fieldnames", None)
+        or []
+    )
+    types = state.get("column_types") or {}
+    return ", ".join(f"{c} ({types[c]})" if c in types else c for c in schema)
+
+
+def dataset_path(dataset_hash: str) -> str:
+    return blobstore.path(f"{DATASET_DIR}/{dataset_hash}.csv")
+
+
+def new_turn(question: str, **state) -> dict:
+    """Graph input for one question; clears the previous turn's answer."""
+    return {
+        "question": question,
+        "sql": None,
+        "rows": [],
+        "row_count": 0,
+        "answer": None,
+        "error": None,
+        "cached": False,
+        **state,
+    }
+
+
+class State(TypedDict, total=False):
     question: str
     file: csv.DictReader
-    file_schema: List[str]
+    # full schema of the thread's file; checkpointed, so follow-ups omit it
+    columns: List[str]
+    column_types: Dict[str, str]  # column -> integer/number/date/...
+    dataset_hash: str  # content hash of the uploaded CSV (see dataset_path)
+    file_schema: List[str]  # fields relevant to the current question
+    # parse key -> {fields, relevant, sql} for questions already handled
+    parsed: Annotated[Dict[str, dict], _remember]
+    # answer to the current question
+    sql: Optional[str]
+    rows: List[dict]
+    row_count: int
+    answer: Optional[str]
+    error: Optional[str]
+    cached: bool
 
 
 # ─────────────────── Agent ───────────────────
@@ -29,9 +113,68 @@ class DataVizAgent:
     def __init__(self):
         self.tool_registry = ToolRegistry()
         self.llm = ChatOpenAI(
-            api_key=settings.OPENAI_API_KEY, model="gpt-4o-mini", temperature=0
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            model="gpt-4o-mini",
+            temperature=0,
+            include_response_headers=True,
+            max_retries=0,  # _call retries through the limiter
         )
 
+    def _call(self, system_prompt: str, human: str, schema, inputs, site):
+        """One structured LLM call through the limiter, with metrics.
+
+        Retries 429s, 5xx and connection errors like score_llm does: each
+        attempt waits on the limiter again, and a 429 pauses it.
+        """
+        prompt = ChatPromptTemplate.from_messages(
+            [("system", system_prompt), ("human", human)]
+        )
+        chain = prompt | self.llm.with_structured_output(
+            schema, include_raw=True
+        )
+        # /ask is interactive: it jumps ahead of bulk scoring in the limiter
+        tokens = estimate_tokens(system_prompt + str(inputs)) + 256
+        model, site = self.llm.model_name, f"dataviz.{site}"
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            limiter.acquire_sync(tokens, INTERACTIVE)
+            started = time.perf_counter()
+            try:
+                out = chain.invoke(inputs)
+                break
+            except Exception as e:
+                llm_metrics.call(
+                    model, site, time.perf_counter() - started, error=True
+                )
+                if isinstance(e, RateLimitError):
+                    limiter.penalize(e.response.headers)
+                if not _retryable(e) or attempt == settings.LLM_MAX_RETRIES:
+                    raise
+                llm_metrics.retry(model, site)
+                delay = _backoff(attempt)
+                logger.warning(
+                    "LLM call failed (%s), retry %d in %.2fs",
+                    type(e).__name__,
+                    attempt + 1,
+                    delay,
+                )
+                time.sleep(delay)
+        raw = out["raw"]
+        usage = raw.usage_metadata or {}
+        llm_metrics.call(
+            model,
+            site,
+            time.perf_counter() - started,
+            usage.get("input_tokens", 0),
+            usage.get("output_tokens", 0),
+        )
+        limiter.update_from_headers(raw.response_metadata.get("headers", {}))
+        limiter.settle(tokens, usage.get("total_tokens"))
+        if out["parsing_error"]:
+            llm_metrics.fallback(model, site)
+            raise out["parsing_error"]
+        return out["parsed"]
+
     def parse_question(self, state: "State"):
         """Parse the user's question to extract relevant data (returns partial state)."""
         system_prompt = (
@@ -41,41 +184,160 @@ class DataVizAgent:
             "is_relevant to False."
         )
 
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", system_prompt),
-                ("human", "CSV schema: {file_schema}\nQuestion: {question}"),
-            ]
+        # Other threads may have asked (nearly) the same thing of this schema
+        fingerprint = _schema_fingerprint(state)
+        entry = (
+            question_cache.get(state["question"], fingerprint)
+            if question_cache
+            else None
         )
+        if question_cache:
+            llm_metrics.cache(
+                self.llm.model_name,
+                "dataviz.parse_question",
+                int(entry is not None),
+                int(entry is None),
+            )
+        if entry is None:
+            inputs = {
+                "file_schema": _schema_text(state),
+                "question": state["question"],
+            }
+            response: QuestionParserResponse = self._call(
+                system_prompt,
+                "CSV schema: {file_schema}\nQuestion: {question}",
+                QuestionParserResponse,
+                inputs,
+                "parse_question",
+            )
+            entry = {
+                "fields": response.relevant_fields,
+                "relevant": response.is_relevant,
+            }
+            if question_cache:
+                question_cache.put(state["question"], fingerprint, entry)
 
-        chain = prompt | self.llm.with_structured_output(
-            QuestionParserResponse
-        )
+        # Return ONLY the updates to state
+        fields = entry["fields"]
+        return {
+            "file_schema": fields,
+            "parsed": {_parse_key(state): dict(entry)},
+        }
 
-        # Prefer explicit schema if present; otherwise try to read from DictReader
-        schema = (
-            state.get("file_schema")
-            or getattr(state["file"], "fieldnames", None)
-            or []
+    def reuse_parse(self, state: "State"):
+        """Answer a question this thread has already parsed, without the LLM."""
+        return {"file_schema": state["parsed"][_parse_key(state)]["fields"]}
+
+    def generate_sql(self, state: "State"):
+        """Write one DuckDB SELECT over the `data` view for the question."""
+        system_prompt = (
+            "You write DuckDB SQL. The user's CSV is a view named data. Answer the "
+            "question with exactly one SELECT statement (CTEs allowed) that uses only "
+            "the listed columns; quote column names with double quotes. Never modify data."
+        )
+        inputs = {
+            "file_schema": _schema_text(state),
+            "fields": ", ".join(state.get("file_schema") or []),
+            "question": state["question"],
+        }
+        response: SQLResponse = self._call(
+            system_prompt,
+            "Columns: {file_schema}\nRelevant: {fields}\nQuestion: {question}",
+            SQLResponse,
+            inputs,
+            "generate_sql",
         )
+        key = _parse_key(state)
+        entry = {**state["parsed"][key], "sql": response.sql}
+        return {"sql": response.sql, "parsed": {key: entry}}
 
-        response: QuestionParserResponse = chain.invoke(
-            {
-                "file_schema": ", ".join(schema),
-                "question": state["question"],
-            }
+    def run_query(self, state: "State"):
+        """Execute the SQL on the thread's dataset, or serve it from cache."""
+        sql = state.get("sql") or state["parsed"][_parse_key(state)]["sql"]
+        try:
+            key = query_key(normalize_sql(_safe(sql)), state["dataset_hash"])
+        except ValueError as e:
+            return {"sql": sql, "error": str(e)}
+        cached = query_cache.get(key)
+        if cached is not None:
+            return {"sql": sql, **cached, "cached": True}
+        try:
+            result = run_sql_file(sql, dataset_path(state["dataset_hash"]))
+        except Exception as e:  # bad generated SQL is an answer, not a 500
+            return {"sql": sql, "error": str(e)}
+        return {"sql": sql, **result, "cached": False}
+
+    def summarize(self, state: "State"):
+        """Turn the query result into a short answer and cache both."""
+        system_prompt = (
+            "You are a data analyst. Answer the user's question in one to three "
+            "sentences using only the SQL result provided. Mention concrete numbers."
+        )
+        rows = state.get("rows") or []
+        inputs = {
+            "question": state["question"],
+            "sql": state["sql"],
+            "row_count": state.get("row_count", len(rows)),
+            "rows": json.dumps(rows[: settings.ASK_RESULT_ROWS], default=str),
+        }
+        response: AnswerResponse = self._call(
+            system_prompt,
+            "Question: {question}\nSQL: {sql}\n"
+            "Result ({row_count} rows, first shown): {rows}",
+            AnswerResponse,
+            inputs,
+            "summarize",
+        )
+        result = {
+            "rows": rows,
+            "row_count": inputs["row_count"],
+            "answer": response.answer,
+        }
+        query_cache.put(
+            query_key(normalize_sql(state["sql"]), state["dataset_hash"]),
+            state["dataset_hash"],
+            state["sql"],
+            result,
         )
+        return {"answer": response.answer}
 
-        # Return ONLY the updates to state
-        return {"file_schema": response.relevant_fields}
+    def route(self, state: "State") -> str:
+        if _parse_key(state) in (state.get("parsed") or {}):
+            return "reuse_parse"
+        return "parse_question"
+
+    def route_answer(self, state: "State") -> str:
+        entry = state["parsed"][_parse_key(state)]
+        if not entry["relevant"] or not state.get("dataset_hash"):
+            return END
+        return "run_query" if entry.get("sql") else "generate_sql"
+
+    def route_summary(self, state: "State") -> str:
+        if state.get("error") or state.get("answer"):
+            return END
+        return "summarize"
 
-    def create_workflow(self):
+    def create_workflow(self, checkpointer=None):
         """Create a workflow for data visualization tasks."""
         workflow = StateGraph(State)
         workflow.add_node("parse_question", self.parse_question)
-        workflow.set_entry_point("parse_question")
-        workflow.add_edge("parse_question", END)
-        return workflow.compile()
+        workflow.add_node("reuse_parse", self.reuse_parse)
+        workflow.add_node("generate_sql", self.generate_sql)
+        workflow.add_node("run_query", self.run_query)
+        workflow.add_node("summarize", self.summarize)
+        workflow.add_conditional_edges(
+            START, self.route, ["parse_question", "reuse_parse"]
+        )
+        for node in ("parse_question", "reuse_parse"):
+            workflow.add_conditional_edges(
+                node, self.route_answer, ["generate_sql", "run_query", END]
+            )
+        workflow.add_edge("generate_sql", "run_query")
+        workflow.add_conditional_edges(
+            "run_query", self.route_summary, ["summarize", END]
+        )
+        workflow.add_edge("summarize", END)
+        return workflow.compile(checkpointer=checkpointer)
 
 
 graph = DataVizAgent().create_workflow()
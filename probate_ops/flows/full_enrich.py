@@ -1,28 +1,72 @@
-from typing import TypedDict, List
-from langgraph.graph import StateGraph, END
+import operator
+from typing import Annotated, TypedDict, List
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
 from ..core.registry import registry
+from ..core.settings import settings
+from ..tools.llm_score_tool import scorer
+
+
+def _add_counts(a: dict, b: dict) -> dict:
+    return {k: a.get(k, 0) + b.get(k, 0) for k in {**a, **b}}
 
 
 class State(TypedDict):
     records: List[dict]
-    i: int
+    # (offset, scored chunk) pairs, appended by parallel score_chunk runs
+    chunks: Annotated[List[tuple], operator.add]
+    counts: Annotated[dict, _add_counts]
+    scoring: dict
 
 
-def score_node(state: State):
-    i = state["i"]
-    rec = state["records"][i]
-    verdict = registry.call("score_llm", record=rec)
-    rec.update(verdict)
-    state["i"] = i + 1
-    return state
+class ChunkState(TypedDict):
+    offset: int
+    records: List[dict]
+
+
+def fan_out(state: State):
+    records, size = state["records"], settings.FLOW_CHUNK_SIZE
+    if not records:
+        return "merge"
+    return [
+        Send("score_chunk", {"offset": i, "records": records[i : i + size]})
+        for i in range(0, len(records), size)
+    ]
+
+
+async def score_chunk(state: ChunkState):
+    verdicts, stats = await registry.acall(
+        "score_records", records=state["records"], scorer=scorer
+    )
+    scored = [{**rec, **v} for rec, v in zip(state["records"], verdicts)]
+    return {
+        "chunks": [(state["offset"], scored)],
+        "counts": {k: stats[k] for k in ("records", "llm_records")},
+    }
+
+
+def merge(state: State):
+    records = [
+        rec
+        for _, chunk in sorted(state.get("chunks", []), key=lambda c: c[0])
+        for rec in chunk
+    ]
+    scoring = _add_counts(
+        {"records": 0, "llm_records": 0}, state.get("counts", {})
+    )
+    scoring["llm_avoided"] = (
+        1 - scoring["llm_records"] / scoring["records"]
+        if scoring["records"]
+        else 0.0
+    )
+    return {"records": records, "scoring": scoring}
 
 
 def build_graph():
     g = StateGraph(State)
-    g.add_node("score_one", score_node)
-    g.set_entry_point("score_one")
-    g.add_conditional_edges(
-        "score_one",
-        lambda s: END if s["i"] >= len(s["records"]) else "score_one",
-    )
+    g.add_node("score_chunk", score_chunk)
+    g.add_node("merge", merge)
+    g.add_conditional_edges(START, fan_out, ["score_chunk", "merge"])
+    g.add_edge("score_chunk", "merge")
+    g.add_edge("merge", END)
     return g.compile()
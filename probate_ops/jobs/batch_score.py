@@ -0,0 +1,188 @@
+"""Nightly re-scoring of ProbateRecord through the OpenAI Batch API.
+
+    python -m probate_ops.jobs.batch_score [--once]
+
+Each run advances a ScoringJob through
+
+    prepared -> submitted -> downloaded -> applied
+                          \\-> failed (batch failed, or every request did)
+
+and every transition is committed, so a crashed or interrupted run picks up
+where it stopped: an in-flight batch is polled, not resubmitted.
+"""
+
+import argparse, json, logging, time
+from datetime import datetime, timedelta
+from typing import Optional
+from ..core.storage import blobstore
+from ..core.settings import settings
+from ..models.database import ProbateRecord, ScoringJob
+from ..tools.llm_score_tool import (
+    PROMPT_VERSION,
+    _minimal,
+    _request,
+    _valid,
+    client as default_client,
+)
+from ..utils.database import bulk_update_scores, table_holdings
+from ..utils.normalize import frame_from_rows, normalize
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = ("prepared", "submitted", "downloaded")
+BATCH_DONE = ("completed",)
+BATCH_FAILED = ("failed", "expired", "cancelled")
+ENDPOINT = "/v1/chat/completions"
+
+
+def select_rows(limit: int = settings.BATCH_SCORE_MAX_ROWS) -> list[dict]:
+    """Unscored rows first, then rows scored before the staleness cutoff."""
+    cutoff = datetime.utcnow() - timedelta(days=settings.SCORE_STALE_DAYS)
+    return list(
+        ProbateRecord.select()
+        .where(
+            ProbateRecord.score.is_null()
+            | ProbateRecord.scored_at.is_null()
+            | (ProbateRecord.scored_at < cutoff)
+        )
+        .order_by(ProbateRecord.scored_at.asc(nulls="first"))
+        .limit(limit)
+        .dicts()
+    )
+
+
+def build_requests(rows: list[dict]) -> bytes:
+    """One JSONL line per record, custom_id = ProbateRecord.id."""
+    df = normalize(frame_from_rows(rows), table_holdings(rows))
+    lines = []
+    for rec in df.to_dict(orient="records"):
+        body = _request(_minimal(rec))
+        lines.append(
+            json.dumps(
+                {
+                    "custom_id": str(rec["id"]),
+                    "method": "POST",
+                    "url": ENDPOINT,
+                    "body": body,
+                },
+                default=str,
+            )
+        )
+    return ("\n".join(lines) + "\n").encode()
+
+
+def parse_results(data: bytes) -> dict[int, dict]:
+    """Valid verdicts by record id; bad lines are left for the next run."""
+    out = {}
+    for line in data.decode().splitlines():
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            body = item["response"]["body"]
+            content = body["choices"][0]["message"]["content"]
+            verdict = _valid(json.loads(content))
+        except Exception:
+            verdict = None
+        if verdict:
+            out[int(item["custom_id"])] = verdict
+    return out
+
+
+def batch_error(client, batch) -> str:
+    """Why a completed batch produced no output, from its error file."""
+    reason = "no output file"
+    if batch.error_file_id:
+        data = client.files.content(batch.error_file_id).content
+        lines = [x for x in data.decode().splitlines() if x.strip()]
+        try:
+            item = json.loads(lines[0])
+            error = item.get("error") or item["response"]["body"]["error"]
+            reason = f"{len(lines)} requests failed, e.g. {error['message']}"
+        except Exception:
+            reason = f"{len(lines)} requests failed"
+    return f"batch completed with {reason}"
+
+
+def prepare() -> Optional[ScoringJob]:
+    rows = select_rows()
+    if not rows:
+        return None
+    path = blobstore.save(build_requests(rows), ".jsonl")
+    job = ScoringJob.create(
+        input_path=path,
+        record_count=len(rows),
+        prompt_version=PROMPT_VERSION,
+    )
+    logger.info("job %s: prepared %d records", job.id, len(rows))
+    return job
+
+
+def advance(job: ScoringJob, client) -> ScoringJob:
+    """Move a job one step forward (polling counts as a step)."""
+    if job.status == "prepared":
+        upload = client.files.create(
+            file=(
+                f"scoring-job-{job.id}.jsonl",
+                blobstore.read(job.input_path),
+            ),
+            purpose="batch",
+        )
+        batch = client.batches.create(
+            input_file_id=upload.id,
+            endpoint=ENDPOINT,
+            completion_window="24h",
+            metadata={"scoring_job": str(job.id)},
+        )
+        job.touch(status="submitted", batch_id=batch.id)
+    elif job.status == "submitted":
+        batch = client.batches.retrieve(job.batch_id)
+        if batch.status in BATCH_DONE and batch.output_file_id:
+            data = client.files.content(batch.output_file_id).content
+            job.touch(
+                status="downloaded",
+                output_path=blobstore.save(data, ".jsonl"),
+            )
+        elif batch.status in BATCH_DONE:
+            # every request failed; there is only an error file
+            job.touch(status="failed", error=batch_error(client, batch))
+        elif batch.status in BATCH_FAILED:
+            job.touch(status="failed", error=f"batch {batch.status}")
+    elif job.status == "downloaded":
+        verdicts = parse_results(blobstore.read(job.output_path))
+        job.touch(status="applied", applied_count=bulk_update_scores(verdicts))
+    logger.info("job %s: %s", job.id, job.status)
+    return job
+
+
+def run(
+    client=default_client,
+    poll_interval: float = settings.BATCH_POLL_INTERVAL,
+    once: bool = False,
+) -> Optional[ScoringJob]:
+    """Resume the active job (or start one) and drive it to a final state."""
+    job = (
+        ScoringJob.select()
+        .where(ScoringJob.status.in_(ACTIVE))
+        .order_by(ScoringJob.id)
+        .first()
+    ) or prepare()
+    while job and job.status in ACTIVE:
+        before = job.status
+        advance(job, client)
+        if once:
+            break
+        if job.status == before == "submitted":
+            time.sleep(poll_interval)
+    return job
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--once", action="store_true", help="advance one step and exit"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    job = run(once=args.once)
+    print(f"job {job.id}: {job.status}" if job else "nothing to score")
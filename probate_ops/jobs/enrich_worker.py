@@ -0,0 +1,155 @@
+"""Scores unscored ProbateRecord rows and writes the results back.
+
+    python -m probate_ops.jobs.enrich_worker [--once] [--batch-size N]
+
+Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED and stamped with a
+lease (claimed_at/claimed_by), so any number of workers on any number of
+nodes split the backlog without overlap; a worker that dies simply lets its
+lease expire.
+"""
+
+import argparse, asyncio, logging, os, socket, time, uuid
+from datetime import datetime, timedelta
+from ..core.settings import settings
+from ..models.database import ProbateRecord
+from ..tools.llm_score_tool import FALLBACK, scorer
+from ..tools.rule_score_tool import score_with_rules
+from ..utils.database import bulk_update_scores, table_holdings
+from ..utils.normalize import frame_from_rows, normalize
+
+logger = logging.getLogger(__name__)
+
+
+class EnrichWorker:
+    def __init__(
+        self,
+        batch_size: int = settings.ENRICH_BATCH_SIZE,
+        lease_seconds: int = settings.ENRICH_LEASE_SECONDS,
+        idle_sleep: float = settings.ENRICH_IDLE_SLEEP,
+    ):
+        self.batch_size = batch_size
+        self.lease = timedelta(seconds=lease_seconds)
+        self.idle_sleep = idle_sleep
+        self.worker_id = (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        )
+        self.started_at = time.time()
+        self.scored = 0
+        self.rounds = 0
+        self.errors = 0
+
+    def claim(self) -> list[dict]:
+        now = datetime.utcnow()
+        db = ProbateRecord._meta.database
+        with db.atomic():
+            rows = list(
+                ProbateRecord.select()
+                .where(
+                    ProbateRecord.score.is_null()
+                    & (
+                        ProbateRecord.claimed_at.is_null()
+                        | (ProbateRecord.claimed_at < now - self.lease)
+                    )
+                )
+                .order_by(ProbateRecord.id)
+                .limit(self.batch_size)
+                .for_update("FOR UPDATE SKIP LOCKED")
+                .dicts()
+            )
+            if rows:
+                ProbateRecord.update(
+                    claimed_at=now, claimed_by=self.worker_id
+                ).where(
+                    ProbateRecord.id.in_([r["id"] for r in rows])
+                ).execute()
+        return rows
+
+    async def run_once(self) -> int:
+        """Claim, score and write back one batch; returns rows written."""
+        rows = await asyncio.to_thread(self.claim)
+        if not rows:
+            return 0
+        holdings = await asyncio.to_thread(table_holdings, rows)
+        records = normalize(frame_from_rows(rows), holdings).to_dict(
+            orient="records"
+        )
+        verdicts, _ = await score_with_rules(records, scorer)
+        # Fallback verdicts stay unscored and are retried once the lease
+        # runs out, rather than being persisted as real scores.
+        good = {
+            rec["id"]: v for rec, v in zip(records, verdicts) if v != FALLBACK
+        }
+        written = await asyncio.to_thread(bulk_update_scores, good)
+        self.rounds += 1
+        self.scored += written
+        logger.info(
+            "%s: scored %d/%d rows", self.worker_id, written, len(rows)
+        )
+        return written
+
+    async def run_forever(self, stop: asyncio.Event = None) -> None:
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                written = await self.run_once()
+            except Exception:
+                self.errors += 1
+                logger.exception("%s: enrichment round failed", self.worker_id)
+                written = 0
+            if not written:
+                try:
+                    await asyncio.wait_for(stop.wait(), self.idle_sleep)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stats(self) -> dict:
+        elapsed = time.time() - self.started_at
+        return {
+            "worker_id": self.worker_id,
+            "scored": self.scored,
+            "rounds": self.rounds,
+            "errors": self.errors,
+            "uptime_seconds": round(elapsed),
+            "rows_per_minute": self.scored / elapsed * 60 if elapsed else 0.0,
+        }
+
+
+def backlog_status(window: timedelta = timedelta(hours=1)) -> dict:
+    """Table-wide view, across every worker: backlog and recent throughput."""
+    now = datetime.utcnow()
+    unscored = ProbateRecord.score.is_null()
+    recent = ProbateRecord.select().where(
+        ProbateRecord.scored_at >= now - window
+    )
+    scored_recently = recent.count()
+    return {
+        "backlog": ProbateRecord.select().where(unscored).count(),
+        "claimed": ProbateRecord.select()
+        .where(
+            unscored
+            & (
+                ProbateRecord.claimed_at
+                >= now - timedelta(seconds=settings.ENRICH_LEASE_SECONDS)
+            )
+        )
+        .count(),
+        "scored_last_hour": scored_recently,
+        "rows_per_minute": scored_recently / (window.total_seconds() / 60),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--once", action="store_true", help="process one batch and exit"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.ENRICH_BATCH_SIZE
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    worker = EnrichWorker(batch_size=args.batch_size)
+    if args.once:
+        print(f"scored {asyncio.run(worker.run_once())} rows")
+    else:
+        asyncio.run(worker.run_forever())
@@ -1,12 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .core.registry import registry
+from .core.settings import settings
+from .flows import dataviz
+from .flows.checkpoint import open_checkpointer, prune_forever
+from .jobs.enrich_worker import EnrichWorker
 from .tools.sql_tool import run_sql
 from .tools.df_tool import run_df
 from .tools.llm_score_tool import score_llm
-from .controllers import ingest, analyze, ask, flows, chart, shortlist
+from .tools.local_score_tool import score_local
+from .tools.rule_score_tool import score_with_rules
+from .controllers import (
+    ingest,
+    analyze,
+    ask,
+    flows,
+    chart,
+    shortlist,
+    facets,
+    enrichment,
+    leads,
+    metrics,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks, stop = [], asyncio.Event()
+    saver = await open_checkpointer()
+    dataviz.graph.checkpointer = saver  # /ask and /ws threads persist
+    tasks.append(asyncio.create_task(prune_forever(saver, stop)))
+    if settings.ENRICH_WORKER_ENABLED:
+        app.state.enrich_worker = EnrichWorker()
+        tasks.append(
+            asyncio.create_task(app.state.enrich_worker.run_forever(stop))
+        )
+    yield
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await saver.conn.close()
 
-app = FastAPI(title="ProbateOps API", version="1.0.0")
+
+app = FastAPI(title="ProbateOps API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware to allow requests from the frontend
 app.add_middleware(
@@ -18,9 +55,20 @@ app.add_middleware(
 )
 
 # register tools
-registry.register("run_sql", run_sql)
-registry.register("run_df", run_df)
-registry.register("score_llm", score_llm)
+registry.register(
+    "run_sql", run_sql, timeout=None, concurrency=settings.DUCKDB_THREADS
+)  # run_sql enforces SQL_TIMEOUT itself
+registry.register("run_df", run_df, concurrency=settings.DUCKDB_THREADS)
+registry.register("score_llm", score_llm, timeout=60)
+registry.register("score_local", score_local)
+# no timeout: a chunk waits on the LLM semaphore and rate limiter, and
+# failing it would discard every chunk the flow has already scored
+registry.register(
+    "score_records",
+    score_with_rules,
+    timeout=None,
+    concurrency=settings.FLOW_MAX_CONCURRENCY,
+)
 
 app.include_router(ingest.router)
 app.include_router(analyze.router)
@@ -28,6 +76,10 @@ app.include_router(ask.router)
 app.include_router(flows.router)
 app.include_router(chart.router)
 app.include_router(shortlist.router)
+app.include_router(facets.router)
+app.include_router(enrichment.router)
+app.include_router(leads.router)
+app.include_router(metrics.router)
 
 
 @app.get("/health")
@@ -20,3 +20,5 @@ class ChartFilters(BaseModel):
     days_death_to_petition_min: Optional[int] = Query(None)
     days_death_to_petition_max: Optional[int] = Query(None)
     has_value: Optional[bool] = Query(None)
+    near_zip: Optional[str] = Query(None)
+    radius_miles: Optional[float] = Query(None)
@@ -1,9 +1,12 @@
+from datetime import datetime
 from probate_ops.core.database import postgres_db
+from probate_ops.utils.geo import zip_centroid
 from peewee import (
     Model,
     CharField,
     TextField,
     DateField,
+    DateTimeField,
     IntegerField,
     BooleanField,
     FloatField,
@@ -22,6 +25,8 @@ class ProbateRecord(Model):
     city = CharField()
     state = CharField()
     zip = CharField()
+    latitude = FloatField(null=True)  # ZIP centroid, filled at ingest
+    longitude = FloatField(null=True)
     party = CharField()  # Petitioner
     party_address = TextField()  # Full mailing address of petitioner
     party_city = CharField(null=True)
@@ -44,14 +49,22 @@ class ProbateRecord(Model):
     score = FloatField(null=True)
     tier = CharField(null=True)  # "high" | "medium" | "
     rationale = TextField(null=True)
+    scored_at = DateTimeField(null=True)
+    claimed_at = DateTimeField(null=True)  # enrichment worker lease
+    claimed_by = CharField(null=True)
 
     class Meta:
         database = postgres_db
         # Add unique constraint on (case_no, state)
-        indexes = ((("case_no", "state"), True),)
+        indexes = (
+            (("case_no", "state"), True),
+            # Bounding-box prefilter for the ZIP-radius filter
+            (("latitude", "longitude"), False),
+        )
 
     @classmethod
     def from_dict(cls, data: dict):
+        centroid = zip_centroid(data.get("Zip Code"))
         return {
             "county": data.get(
                 "County"
@@ -63,6 +76,8 @@ class ProbateRecord(Model):
             "city": data.get("City"),
             "state": data.get("State"),
             "zip": str(data.get("Zip Code")),
+            "latitude": centroid[0] if centroid else None,
+            "longitude": centroid[1] if centroid else None,
             "party": data.get("Party"),
             "party_address": data.get("Party Street Address"),
             "party_city": data.get("Party City"),
@@ -100,8 +115,77 @@ class ProbateRecord(Model):
         }
 
 
+class ScoringJob(Model):
+    """One OpenAI Batch API run over ProbateRecord; rows drive resumption."""
+
+    id = AutoField(primary_key=True)
+    status = CharField(default="prepared")  # see jobs.batch_score.advance
+    batch_id = CharField(null=True)
+    input_path = TextField(null=True)  # JSONL request file in BlobStore
+    output_path = TextField(null=True)  # JSONL result file in BlobStore
+    record_count = IntegerField(default=0)
+    applied_count = IntegerField(default=0)
+    prompt_version = CharField(null=True)
+    error = TextField(null=True)
+    created_at = DateTimeField(default=datetime.utcnow)
+    updated_at = DateTimeField(default=datetime.utcnow)
+
+    class Meta:
+        database = postgres_db
+
+    def touch(self, **changes):
+        for k, v in changes.items():
+            setattr(self, k, v)
+        self.updated_at = datetime.utcnow()
+        self.save()
+
+
+def add_missing_columns(model):
+    """Add model fields that an existing table predates (no-op otherwise)."""
+    from playhouse.migrate import PostgresqlMigrator, migrate
+
+    db = model._meta.database
+    table = model._meta.table_name
+    existing = {c.name for c in db.get_columns(table)}
+    migrator = PostgresqlMigrator(db)
+    ops = [
+        migrator.add_column(table, field.column_name, field)
+        for field in model._meta.sorted_fields
+        if field.column_name not in existing
+    ]
+    if ops:
+        migrate(*ops)
+    db.create_tables([model])  # creates any missing indexes
+    return [op.args[1] for op in ops]
+
+
+def backfill_coordinates(batch_size: int = 1000) -> int:
+    """Fill latitude/longitude from the ZIP centroid table where missing."""
+    updated = 0
+    rows = (
+        ProbateRecord.select(ProbateRecord.id, ProbateRecord.zip)
+        .where(ProbateRecord.latitude.is_null())
+        .tuples()
+    )
+    by_zip: dict = {}
+    for rid, z in rows:
+        centroid = zip_centroid(z)
+        if centroid:
+            by_zip.setdefault(centroid, []).append(rid)
+    for (lat, lon), ids in by_zip.items():
+        for i in range(0, len(ids), batch_size):
+            updated += (
+                ProbateRecord.update(latitude=lat, longitude=lon)
+                .where(ProbateRecord.id.in_(ids[i : i + batch_size]))
+                .execute()
+            )
+    return updated
+
+
 if __name__ == "__main__":
     postgres_db.connect()
-    postgres_db.create_tables([ProbateRecord])
+    postgres_db.create_tables([ProbateRecord, ScoringJob])
     print("Tables created successfully.")
+    print("Added columns:", add_missing_columns(ProbateRecord))
+    print("Backfilled coordinates:", backfill_coordinates())
     postgres_db.close()
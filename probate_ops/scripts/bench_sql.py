@@ -0,0 +1,77 @@
+"""Concurrent run_sql throughput: per-call connections vs the shared store.
+
+    python -m probate_ops.scripts.bench_sql [--rows N] [--calls N] [--workers N]
+
+Builds a throwaway DuckDB file, then fires the same aggregate query from a
+thread pool, first the way run_sql used to (a connection per call) and
+then through run_sql itself on one SQLStore with per-thread cursors, so
+the second figure includes the plan guard, timeout and query log.
+"""
+
+import argparse, os, tempfile, time
+from concurrent.futures import ThreadPoolExecutor
+import duckdb
+from ..core.storage import SQLStore
+from ..tools import sql_tool
+from ..tools.sql_tool import run_sql
+
+QUERY = "SELECT county, COUNT(*) AS n, AVG(score) AS s FROM leads GROUP BY 1"
+
+
+def _seed(path: str, rows: int) -> None:
+    con = duckdb.connect(path)
+    con.execute(
+        "CREATE TABLE leads AS SELECT i AS id, "
+        "'county_' || (i % 50) AS county, (i * 37) % 100 AS score "
+        f"FROM range({rows}) t(i)"
+    )
+    con.close()
+
+
+def _per_call(path: str):
+    def run():
+        con = duckdb.connect(path)
+        con.execute("PRAGMA threads=4")
+        try:
+            df = con.execute(QUERY).df()
+        finally:
+            con.close()
+        preview = df.head(sql_tool.PREVIEW_ROWS).to_dict(orient="records")
+        return {"rows": preview, "row_count": len(df)}
+
+    return run
+
+
+def _bench(fn, calls: int, workers: int) -> dict:
+    errors = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        for f in [pool.submit(fn) for _ in range(calls)]:
+            try:
+                f.result()
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - started
+    return {"qps": round(calls / elapsed, 1), "errors": errors}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.duckdb")
+        _seed(path, args.rows)
+        before = _bench(_per_call(path), args.calls, args.workers)
+        store = sql_tool.sqlstore = SQLStore(path)
+        after = _bench(lambda: run_sql(QUERY), args.calls, args.workers)
+        store.close()
+    print(f"per-call connect: {before}")
+    print(f"run_sql:          {after}")
+
+
+if __name__ == "__main__":
+    main()
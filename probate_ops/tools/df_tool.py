@@ -1,27 +1,193 @@
+import duckdb
 import pandas as pd
-from typing import Literal
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, model_validator
+from probate_ops.core.settings import settings
+
+Bucket = Literal["day", "week", "month", "quarter", "year"]
+_PERIODS = {"day": "D", "week": "W", "month": "M", "quarter": "Q", "year": "Y"}
+
+
+class Agg(BaseModel):
+    fn: Literal[
+        "count", "sum", "mean", "median", "min", "max", "quantile", "nunique"
+    ]
+    col: Optional[str] = None  # None only for count, which then counts rows
+    q: Optional[float] = Field(None, ge=0, le=1)  # for quantile
+    name: Optional[str] = None  # output column; defaults to fn_col
+
+    @model_validator(mode="after")
+    def _check(self):
+        if self.col is None and self.fn != "count":
+            raise ValueError(f"{self.fn} needs a column")
+        if self.fn == "quantile" and self.q is None:
+            raise ValueError("quantile needs q")
+        return self
+
+    @property
+    def alias(self) -> str:
+        if self.name:
+            return self.name
+        if self.col is None:
+            return "count"
+        if self.fn == "quantile":
+            return f"p{self.q * 100:g}_{self.col}"
+        return f"{self.fn}_{self.col}"
+
+
+class AggSpec(BaseModel):
+    """Group-by aggregation over one DataFrame.
+
+    `bucket` truncates date columns listed in `by` (e.g. {"petition_date":
+    "month"}). Results are sorted by `order_by` (default: the first
+    aggregate); with `top_k`, only the first k rows within each group of
+    `per` are kept.
+    """
+
+    by: list[str] = []
+    aggs: list[Agg] = Field(min_length=1)
+    bucket: dict[str, Bucket] = {}
+    order_by: Optional[str] = None
+    descending: bool = True
+    top_k: Optional[int] = Field(None, ge=1)
+    per: list[str] = []
+    limit: int = Field(100, ge=1)
+
+    @model_validator(mode="after")
+    def _check(self):
+        if set(self.bucket) - set(self.by):
+            raise ValueError("bucketed columns must be grouped by")
+        if set(self.per) - set(self.by):
+            raise ValueError("per must be a subset of by")
+        outputs = self.by + [a.alias for a in self.aggs]
+        if self.order_by is not None and self.order_by not in outputs:
+            raise ValueError(f"cannot order by '{self.order_by}'")
+        return self
+
+    @property
+    def order(self) -> str:
+        return self.order_by or self.aggs[0].alias
+
+    def columns(self) -> set[str]:
+        return set(self.by) | {a.col for a in self.aggs if a.col}
+
+
+def _ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_agg(agg: Agg) -> str:
+    col = _ident(agg.col) if agg.col else None
+    expr = {
+        "count": f"COUNT({col or '*'})",
+        "sum": f"SUM({col})",
+        "mean": f"AVG({col})",
+        "median": f"MEDIAN({col})",
+        "min": f"MIN({col})",
+        "max": f"MAX({col})",
+        "quantile": f"QUANTILE_CONT({col}, {agg.q})",
+        "nunique": f"COUNT(DISTINCT {col})",
+    }[agg.fn]
+    return f"{expr} AS {_ident(agg.alias)}"
+
+
+def compile_spec(spec: AggSpec, table: str = "df") -> str:
+    """DuckDB SQL computing `spec` over `table`."""
+    keys = [
+        (
+            f"date_trunc('{spec.bucket[c]}', TRY_CAST({_ident(c)} AS TIMESTAMP))"
+            f" AS {_ident(c)}"
+            if c in spec.bucket
+            else _ident(c)
+        )
+        for c in spec.by
+    ]
+    sql = f"SELECT {', '.join(keys + [_sql_agg(a) for a in spec.aggs])} "
+    sql += f"FROM {table}"
+    if spec.by:
+        positions = ", ".join(str(i + 1) for i in range(len(spec.by)))
+        sql += f" GROUP BY {positions}"
+    direction = "DESC" if spec.descending else "ASC"
+    ranked = f"{_ident(spec.order)} {direction}"
+    if spec.top_k:
+        window = f"ORDER BY {ranked}"
+        if spec.per:
+            window = (
+                f"PARTITION BY {', '.join(map(_ident, spec.per))} {window}"
+            )
+        sql += f" QUALIFY row_number() OVER ({window}) <= {spec.top_k}"
+    rest = [c for c in spec.by if c not in spec.per and c != spec.order]
+    order = (
+        [_ident(c) for c in spec.per] + [ranked] + [_ident(c) for c in rest]
+    )
+    return f"{sql} ORDER BY {', '.join(order)} LIMIT {spec.limit}"
+
+
+def _run_duckdb(df: pd.DataFrame, spec: AggSpec) -> pd.DataFrame:
+    con = duckdb.connect(config={"threads": settings.DUCKDB_THREADS})
+    try:
+        con.register("df", df)
+        return con.execute(compile_spec(spec)).df()
+    finally:
+        con.close()
+
+
+def _run_pandas(df: pd.DataFrame, spec: AggSpec) -> pd.DataFrame:
+    """Reference implementation of `spec`; slower, kept for checking."""
+    frame = df[sorted(spec.columns())].assign(_rows=1)
+    for c, unit in spec.bucket.items():
+        stamps = pd.to_datetime(frame[c], errors="coerce")
+        frame[c] = stamps.dt.to_period(_PERIODS[unit]).dt.start_time
+    named = {}
+    for a in spec.aggs:
+        if a.col is None:
+            named[a.alias] = ("_rows", "size")
+        elif a.fn == "quantile":
+            named[a.alias] = (a.col, lambda s, q=a.q: s.quantile(q))
+        else:
+            named[a.alias] = (a.col, a.fn)
+    groups = frame.groupby(spec.by or (lambda _: 0), dropna=False)
+    out = groups.agg(**named).reset_index(drop=not spec.by)
+    rest = [c for c in spec.by if c not in spec.per and c != spec.order]
+    out = out.sort_values(
+        spec.per + [spec.order] + rest,
+        ascending=[True] * len(spec.per)
+        + [not spec.descending]
+        + [True] * len(rest),
+        kind="stable",
+    )
+    if spec.top_k:
+        if spec.per:
+            out = out.groupby(spec.per, dropna=False).head(spec.top_k)
+        else:
+            out = out.head(spec.top_k)
+    return out.head(spec.limit)
 
 
 def run_df(
     df: pd.DataFrame,
-    op: Literal["count_by", "sum_by"],
-    by: str,
+    op: Optional[Literal["count_by", "sum_by"]] = None,
+    by: str | None = None,
     col: str | None = None,
+    spec: AggSpec | dict | None = None,
+    engine: Literal["duckdb", "pandas"] = settings.DF_ENGINE,
 ) -> dict:
-    if op == "count_by":
-        out = (
-            df.groupby(by)
-            .size()
-            .reset_index(name="count")
-            .sort_values("count", ascending=False)
-        )
-    elif op == "sum_by" and col:
-        out = (
-            df.groupby(by)[col]
-            .sum(numeric_only=True)
-            .reset_index()
-            .sort_values(col, ascending=False)
-        )
-    else:
-        raise ValueError("unsupported op")
-    return {"rows": out.head(100).to_dict(orient="records")}
+    """Aggregate `df` by `spec`; `op`/`by`/`col` are the old shorthand.
+
+    The DuckDB engine compiles the spec to SQL over the registered
+    DataFrame and runs it multi-threaded without copying the frame.
+    """
+    if spec is None:
+        if op == "count_by" and by:
+            spec = AggSpec(by=[by], aggs=[Agg(fn="count")])
+        elif op == "sum_by" and by and col:
+            spec = AggSpec(by=[by], aggs=[Agg(fn="sum", col=col, name=col)])
+        else:
+            raise ValueError("unsupported op")
+    elif isinstance(spec, dict):
+        spec = AggSpec.model_validate(spec)
+    missing = spec.columns() - set(df.columns)
+    if missing:
+        raise ValueError(f"unknown columns: {sorted(missing)}")
+    run = _run_duckdb if engine == "duckdb" else _run_pandas
+    return {"rows": run(df, spec).to_dict(orient="records")}
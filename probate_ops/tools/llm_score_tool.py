@@ -1,18 +1,63 @@
-import os, json
-from openai import OpenAI
+import os, json, asyncio, hashlib, logging, random, time
+from typing import Optional
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    APIConnectionError,
+    APIStatusError,
+    RateLimitError,
+)
+from ..core.ratelimit import (
+    BULK,
+    INTERACTIVE,
+    estimate_request_tokens,
+    estimate_tokens,
+    limiter,
+)
+from ..core.llm_metrics import llm_metrics
+from ..core.score_cache import ScoreCache, fingerprint, score_cache
 from ..core.settings import settings
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
 
+client = OpenAI(
+    api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL
+)
+
+# Scoring prompts ask for numbers only; rationales are generated lazily,
+# per lead, by `rationale()` when someone actually opens the lead.
 SYSTEM = (
     "Score probate leads for real estate acquisitions. "
-    "Return STRICT JSON: {score:0-100, tier:'high'|'medium'|'low', rationale:string}. "
+    "Return STRICT JSON: {score:0-100, tier:'high'|'medium'|'low'}. "
     "Prefer absentee owners, older petitions, multiple holdings; penalize missing address."
 )
+BATCH_SYSTEM = (
+    "Score probate leads for real estate acquisitions. "
+    "You get a JSON list of records, each with an 'id'. Return STRICT JSON: "
+    "{results:[{id:string, score:0-100, tier:'high'|'medium'|'low'}]} "
+    "with exactly one result per input id. "
+    "Prefer absentee owners, older petitions, multiple holdings; penalize missing address."
+)
+RATIONALE_SYSTEM = (
+    "You explain probate lead scores for real estate acquisitions. "
+    "Given a record and its score and tier, answer in at most two sentences "
+    "why it scored that way: absentee owners, older petitions and multiple "
+    "holdings raise a score; a missing address lowers it."
+)
+FALLBACK = {"score": 50, "tier": "medium", "rationale": "Fallback parse."}
+TIERS = ("high", "medium", "low")
+# Bumps whenever the scoring prompts change, so cached verdicts from an
+# older prompt are never served for the new one.
+PROMPT_VERSION = hashlib.sha256(
+    f"{SYSTEM}\n{BATCH_SYSTEM}".encode()
+).hexdigest()[:12]
+OUTPUT_TOKENS_PER_RECORD = 20  # rough size of one {id, score, tier}
+SCORE_MAX_TOKENS = 30
+RATIONALE_MAX_TOKENS = 120
 
 
-def score_llm(record: dict) -> dict:
-    minimal = {
+def _minimal(record: dict) -> dict:
+    return {
         "owner_name": record.get("owner_name"),
         "property_address": record.get("property_address"),
         "city": record.get("city"),
@@ -25,16 +70,384 @@ def score_llm(record: dict) -> dict:
         "holdings_in_file": int(record.get("holdings_in_file")),
         "county": record.get("county"),
     }
-    resp = client.chat.completions.create(
+
+
+def _request(minimal: dict) -> dict:
+    return dict(
         model=settings.OPENAI_MODEL,
         response_format={"type": "json_object"},
         temperature=0.2,
+        max_tokens=SCORE_MAX_TOKENS,
         messages=[
             {"role": "system", "content": SYSTEM},
             {"role": "user", "content": f"Record: {minimal}"},
         ],
     )
+
+
+def _parse(resp, site: str = "score") -> dict:
     try:
-        return json.loads(resp.choices[0].message.content)
+        verdict = _valid(json.loads(resp.choices[0].message.content))
     except Exception:
-        return {"score": 50, "tier": "medium", "rationale": "Fallback parse."}
+        verdict = None
+    if verdict is None:
+        logger.warning("unparseable LLM verdict, using fallback")
+        llm_metrics.fallback(settings.OPENAI_MODEL, site)
+        return dict(FALLBACK)
+    return verdict
+
+
+def _usage(resp) -> tuple[int, int]:
+    usage = getattr(resp, "usage", None)
+    if not usage:
+        return 0, 0
+    return usage.prompt_tokens or 0, usage.completion_tokens or 0
+
+
+def _rationale_request(minimal: dict, verdict: dict) -> dict:
+    return dict(
+        model=settings.OPENAI_MODEL,
+        temperature=0.2,
+        max_tokens=RATIONALE_MAX_TOKENS,
+        messages=[
+            {"role": "system", "content": RATIONALE_SYSTEM},
+            {
+                "role": "user",
+                "content": f"Record: {minimal}\n"
+                f"Score: {verdict['score']}, tier: {verdict['tier']}",
+            },
+        ],
+    )
+
+
+def _pack(items: list[tuple[str, dict]]) -> list[list[tuple[str, dict]]]:
+    """Greedily pack (id, minimal) pairs into batches under the token budget."""
+    budget = settings.LLM_BATCH_TOKEN_BUDGET - estimate_tokens(BATCH_SYSTEM)
+    batches, current, used = [], [], 0
+    for rid, minimal in items:
+        cost = (
+            estimate_tokens(json.dumps({"id": rid, **minimal}, default=str))
+            + OUTPUT_TOKENS_PER_RECORD
+        )
+        if current and (
+            used + cost > budget or len(current) >= settings.LLM_BATCH_MAX_SIZE
+        ):
+            batches.append(current)
+            current, used = [], 0
+        current.append((rid, minimal))
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _batch_request(batch: list[tuple[str, dict]]) -> dict:
+    records = [{"id": rid, **minimal} for rid, minimal in batch]
+    return dict(
+        model=settings.OPENAI_MODEL,
+        response_format={"type": "json_object"},
+        temperature=0.2,
+        max_tokens=OUTPUT_TOKENS_PER_RECORD * len(batch) * 2,
+        messages=[
+            {"role": "system", "content": BATCH_SYSTEM},
+            {
+                "role": "user",
+                "content": f"Records: {json.dumps(records, default=str)}",
+            },
+        ],
+    )
+
+
+def _valid(item) -> Optional[dict]:
+    """Normalized verdict for one batch element, or None if malformed."""
+    if not isinstance(item, dict):
+        return None
+    score, tier = item.get("score"), item.get("tier")
+    rationale = item.get("rationale")
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
+        return None
+    if not 0 <= score <= 100 or tier not in TIERS:
+        return None
+    if not isinstance(rationale, str) or not rationale:
+        rationale = None  # filled in lazily
+    return {"score": score, "tier": tier, "rationale": rationale}
+
+
+def _parse_batch(resp, ids: set[str]) -> dict[str, dict]:
+    try:
+        items = json.loads(resp.choices[0].message.content)["results"]
+    except Exception:
+        return {}
+    out = {}
+    for item in items if isinstance(items, list) else []:
+        rid = str(item.get("id")) if isinstance(item, dict) else None
+        verdict = _valid(item)
+        if rid in ids and rid not in out and verdict:
+            out[rid] = verdict
+    return out
+
+
+def _cache_key(minimal: dict) -> str:
+    return fingerprint(minimal, settings.OPENAI_MODEL, PROMPT_VERSION)
+
+
+def _cacheable(verdicts: dict[str, dict]) -> dict[str, dict]:
+    return {k: v for k, v in verdicts.items() if v != FALLBACK}
+
+
+def score_llm(record: dict) -> dict:
+    minimal = _minimal(record)
+    key = _cache_key(minimal)
+    model = settings.OPENAI_MODEL
+    if score_cache:
+        hit = score_cache.get_many([key])
+        llm_metrics.cache(model, "score_llm", len(hit), 1 - len(hit))
+        if hit:
+            return hit[key]
+    request = _request(minimal)
+    tokens = estimate_request_tokens(request)
+    # The SDK's own retries would bypass the limiter; retry here instead,
+    # as AsyncScorer._create does. The shared client keeps its retries for
+    # the Files/Batches calls in jobs.batch_score.
+    scoring_client = client.with_options(
+        max_retries=0, timeout=settings.LLM_TIMEOUT
+    )
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        limiter.acquire_sync(tokens, BULK)
+        started = time.perf_counter()
+        try:
+            raw = scoring_client.chat.completions.with_raw_response.create(
+                **request
+            )
+            break
+        except Exception as e:
+            llm_metrics.call(
+                model, "score_llm", time.perf_counter() - started, error=True
+            )
+            if isinstance(e, RateLimitError):
+                limiter.penalize(e.response.headers)
+            if not _retryable(e) or attempt == settings.LLM_MAX_RETRIES:
+                raise
+            llm_metrics.retry(model, "score_llm")
+            delay = _backoff(attempt)
+            logger.warning(
+                "LLM call failed (%s), retry %d in %.2fs",
+                type(e).__name__,
+                attempt + 1,
+                delay,
+            )
+            time.sleep(delay)
+    limiter.update_from_headers(raw.headers)
+    resp = raw.parse()
+    llm_metrics.call(
+        model, "score_llm", time.perf_counter() - started, *_usage(resp)
+    )
+    limiter.settle(tokens, resp.usage.total_tokens if resp.usage else None)
+    verdict = _parse(resp, "score_llm")
+    if score_cache:
+        score_cache.put_many(
+            _cacheable({key: verdict}), settings.OPENAI_MODEL, PROMPT_VERSION
+        )
+    return verdict
+
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff with full jitter, capped at LLM_BACKOFF_MAX."""
+    cap = min(settings.LLM_BACKOFF_MAX, settings.LLM_BACKOFF_BASE * 2**attempt)
+    return random.uniform(0, cap)
+
+
+def _retryable(exc: Exception) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, APIConnectionError)):
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+class AsyncScorer:
+    """Concurrent scorer: bounded parallelism, per-call timeout, retries.
+
+    Retries use exponential backoff with full jitter so a burst of failures
+    does not come back as a synchronized burst of retries.
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        cache: Optional[ScoreCache] = score_cache,
+        priority: int = BULK,
+    ):
+        self.client = client or AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            max_retries=0,  # retries are handled here, with jitter
+        )
+        self.concurrency = concurrency or settings.LLM_CONCURRENCY
+        self.timeout = timeout or settings.LLM_TIMEOUT
+        self.max_retries = (
+            settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.cache = cache
+        self.priority = priority
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._sem_loop = None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Semaphores bind to the loop they are first awaited on.
+        loop = asyncio.get_running_loop()
+        if self._sem is None or self._sem_loop is not loop:
+            self._sem = asyncio.Semaphore(self.concurrency)
+            self._sem_loop = loop
+        return self._sem
+
+    async def _create(
+        self,
+        request: dict,
+        priority: Optional[int] = None,
+        site: str = "score",
+    ):
+        tokens = estimate_request_tokens(request)
+        priority = self.priority if priority is None else priority
+        model = request["model"]
+        for attempt in range(self.max_retries + 1):
+            started = None
+            try:
+                async with self._semaphore():
+                    await limiter.acquire(tokens, priority)
+                    started = time.perf_counter()
+                    raw = await asyncio.wait_for(
+                        self.client.chat.completions.with_raw_response.create(
+                            **request
+                        ),
+                        self.timeout,
+                    )
+                limiter.update_from_headers(raw.headers)
+                resp = raw.parse()
+                llm_metrics.call(
+                    model, site, time.perf_counter() - started, *_usage(resp)
+                )
+                limiter.settle(
+                    tokens, resp.usage.total_tokens if resp.usage else None
+                )
+                return resp
+            except Exception as e:
+                if started is not None:
+                    llm_metrics.call(
+                        model, site, time.perf_counter() - started, error=True
+                    )
+                if isinstance(e, RateLimitError):
+                    limiter.penalize(e.response.headers)
+                if not _retryable(e) or attempt == self.max_retries:
+                    raise
+                llm_metrics.retry(model, site)
+                delay = _backoff(attempt)
+                logger.warning(
+                    "LLM call failed (%s), retry %d in %.2fs",
+                    type(e).__name__,
+                    attempt + 1,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+
+    async def _score_one(self, record: dict) -> dict:
+        try:
+            resp = await self._create(_request(_minimal(record)))
+        except Exception as e:
+            logger.error("LLM scoring failed: %s", e)
+            llm_metrics.fallback(settings.OPENAI_MODEL, "score")
+            return dict(FALLBACK)
+        return _parse(resp)
+
+    async def _score_batch(self, batch: list[tuple[str, dict]]) -> dict:
+        try:
+            resp = await self._create(
+                _batch_request(batch), site="score_batch"
+            )
+        except Exception as e:
+            logger.error("LLM batch scoring failed: %s", e)
+            return {}
+        return _parse_batch(resp, {rid for rid, _ in batch})
+
+    async def score_batched(self, records: list[dict]) -> list[dict]:
+        """Score several records per request; re-score failures one by one.
+
+        Records are keyed by their position in `records`, so ids stay stable
+        across the batch and the single-record retry pass.
+        """
+        items = [(str(i), _minimal(r)) for i, r in enumerate(records)]
+        results: dict[str, dict] = {}
+        for part in await asyncio.gather(
+            *(self._score_batch(b) for b in _pack(items))
+        ):
+            results.update(part)
+        missing = [int(rid) for rid, _ in items if rid not in results]
+        if missing:
+            # Not fallbacks yet: _score_one counts the ones that still fail.
+            logger.info("re-scoring %d records individually", len(missing))
+            retried = await asyncio.gather(
+                *(self._score_one(records[i]) for i in missing)
+            )
+            results.update({str(i): v for i, v in zip(missing, retried)})
+        return [results[str(i)] for i in range(len(records))]
+
+    async def rationale(self, record: dict, verdict: dict) -> Optional[str]:
+        """Explain one verdict on demand; None if the LLM call fails."""
+        try:
+            resp = await self._create(
+                _rationale_request(_minimal(record), verdict),
+                INTERACTIVE,
+                site="rationale",
+            )
+        except Exception as e:
+            logger.error("LLM rationale failed: %s", e)
+            llm_metrics.fallback(settings.OPENAI_MODEL, "rationale")
+            return None
+        text = (resp.choices[0].message.content or "").strip()
+        return text or None
+
+    async def score(self, record: dict) -> dict:
+        return (await self.score_many([record], batched=False))[0]
+
+    async def score_many(
+        self, records: list[dict], batched: Optional[bool] = None
+    ) -> list[dict]:
+        """Score records concurrently; results keep the input order.
+
+        Cached verdicts are served first; only the misses reach the LLM.
+        """
+        keys = [_cache_key(_minimal(r)) for r in records]
+        known = self.cache.get_many(keys) if self.cache else {}
+        if self.cache and keys:
+            llm_metrics.cache(
+                settings.OPENAI_MODEL,
+                "score",
+                sum(k in known for k in keys),
+                sum(k not in known for k in keys),
+            )
+        todo: dict[str, int] = {}  # one LLM call per distinct key
+        for i, k in enumerate(keys):
+            if k not in known:
+                todo.setdefault(k, i)
+        pending = [records[i] for i in todo.values()]
+        if not pending:
+            fresh = []
+        elif settings.LLM_BATCH_SCORING if batched is None else batched:
+            fresh = await self.score_batched(pending)
+        else:
+            fresh = await asyncio.gather(
+                *(self._score_one(r) for r in pending)
+            )
+        fresh_by_key = dict(zip(todo, fresh))
+        if self.cache:
+            self.cache.put_many(
+                _cacheable(fresh_by_key), settings.OPENAI_MODEL, PROMPT_VERSION
+            )
+        verdicts = {**known, **fresh_by_key}
+        return [dict(verdicts[k]) for k in keys]
+
+
+scorer = AsyncScorer()
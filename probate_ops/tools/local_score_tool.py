@@ -0,0 +1,220 @@
+"""Local lead scorer distilled from accumulated LLM labels.
+
+    python -m probate_ops.tools.local_score_tool train [--csv labeled.csv]
+
+A ridge regression predicts `score` and a softmax regression predicts
+`tier`, both over the normalize() features. Artifacts are versioned .npz
+files in BlobStore under models/local_score/, with LATEST naming the one
+score_local() serves.
+"""
+
+import argparse, io, json, time
+from typing import Optional
+import numpy as np, pandas as pd
+from ..core.storage import blobstore
+from ..tools.llm_score_tool import TIERS
+from ..utils.normalize import frame_from_rows, normalize, read_table
+
+MODEL_DIR = "models/local_score"
+UNKNOWN_DAYS = 9999
+TOP_PETITION_TYPES = 12
+L2 = 1e-2
+MIN_TRAIN_ROWS = 20  # fewer labels than this cannot fit the design matrix
+
+
+def _features(df: pd.DataFrame, petition_types: list[str]) -> np.ndarray:
+    def days(col: str) -> tuple[np.ndarray, np.ndarray]:
+        d = pd.to_numeric(df[col], errors="coerce").fillna(UNKNOWN_DAYS)
+        d = d.to_numpy(dtype=float)
+        known = d < UNKNOWN_DAYS
+        return known.astype(float), np.where(known, np.minimum(d, 3650), 0)
+
+    petition_known, petition_days = days("days_since_petition")
+    death_known, death_days = days("days_since_death")
+    address = df["property_address"]
+    missing_address = (
+        address.isna() | (address.astype(str).str.strip() == "")
+    ).to_numpy(dtype=float)
+    holdings = pd.to_numeric(df["holdings_in_file"], errors="coerce")
+    ptype = df["petition_type"].fillna("").astype(str).to_numpy()
+    onehot = (ptype[:, None] == np.array(petition_types)[None, :]).astype(
+        float
+    )
+    return np.column_stack(
+        [
+            df["absentee_flag"].fillna(False).to_numpy(dtype=float),
+            petition_known,
+            petition_days / 365,
+            death_known,
+            death_days / 365,
+            np.log1p(holdings.fillna(1).to_numpy(dtype=float)),
+            missing_address,
+            onehot,
+        ]
+    )
+
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+class LocalScoreModel:
+    def __init__(self, arrays: dict, meta: dict):
+        self.mean, self.std = arrays["mean"], arrays["std"]
+        self.score_w, self.tier_w = arrays["score_w"], arrays["tier_w"]
+        self.meta = meta
+
+    def _design(self, df: pd.DataFrame) -> np.ndarray:
+        x = (_features(df, self.meta["petition_types"]) - self.mean) / self.std
+        return np.column_stack([np.ones(len(x)), x])
+
+    def predict(self, df: pd.DataFrame) -> pd.DataFrame:
+        x = self._design(df)
+        score = np.clip(np.rint(x @ self.score_w), 0, 100).astype(int)
+        tier = np.array(TIERS)[(x @ self.tier_w).argmax(axis=1)]
+        return pd.DataFrame({"score": score, "tier": tier}, index=df.index)
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, epochs: int = 300, lr: float = 0.5):
+        labels = df["tier"].map({t: i for i, t in enumerate(TIERS)})
+        ok = (
+            labels.notna()
+            & pd.to_numeric(df["score"], errors="coerce").notna()
+        )
+        df = df[ok]
+        if len(df) < MIN_TRAIN_ROWS:
+            raise ValueError(
+                f"{len(df)} labelled rows; need at least {MIN_TRAIN_ROWS} "
+                "to train the local scorer"
+            )
+        counts = df["petition_type"].fillna("").astype(str).value_counts()
+        petition_types = [t for t in counts.index[:TOP_PETITION_TYPES] if t]
+        raw = _features(df, petition_types)
+        mean, std = raw.mean(axis=0), raw.std(axis=0)
+        std[std == 0] = 1.0
+        x = np.column_stack([np.ones(len(raw)), (raw - mean) / std])
+        reg = L2 * np.eye(x.shape[1])
+        reg[0, 0] = 0  # never shrink the intercept
+
+        # score: closed-form ridge regression
+        y = pd.to_numeric(df["score"]).to_numpy(dtype=float)
+        score_w = np.linalg.solve(x.T @ x + reg * len(x), x.T @ y)
+
+        # tier: softmax regression by full-batch gradient descent
+        onehot = np.eye(len(TIERS))[labels[ok].astype(int).to_numpy()]
+        tier_w = np.zeros((x.shape[1], len(TIERS)))
+        for _ in range(epochs):
+            grad = x.T @ (_softmax(x @ tier_w) - onehot) / len(x)
+            tier_w -= lr * (
+                grad + L2 * np.vstack([0 * tier_w[:1], tier_w[1:]])
+            )
+
+        meta = {"petition_types": petition_types, "n_train": int(len(x))}
+        return cls(
+            {"mean": mean, "std": std, "score_w": score_w, "tier_w": tier_w},
+            meta,
+        )
+
+    def to_bytes(self) -> bytes:
+        buf = io.BytesIO()
+        np.savez(
+            buf,
+            mean=self.mean,
+            std=self.std,
+            score_w=self.score_w,
+            tier_w=self.tier_w,
+            meta=np.array(json.dumps(self.meta)),
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "LocalScoreModel":
+        arrays = dict(np.load(io.BytesIO(data)))
+        return cls(arrays, json.loads(str(arrays.pop("meta"))))
+
+
+def evaluate(model: LocalScoreModel, df: pd.DataFrame) -> dict:
+    pred = model.predict(df)
+    score = pd.to_numeric(df["score"], errors="coerce")
+    return {
+        "n": int(len(df)),
+        "tier_accuracy": float((pred["tier"] == df["tier"]).mean()),
+        "score_mae": float((pred["score"] - score).abs().mean()),
+    }
+
+
+def train(df: pd.DataFrame, holdout: float = 0.2, seed: int = 0) -> str:
+    """Fit on LLM-labelled rows, publish a new version; returns its name."""
+    df = df[df["tier"].isin(TIERS)].sample(frac=1, random_state=seed)
+    cut = int(len(df) * (1 - holdout))
+    model = LocalScoreModel.fit(df.iloc[:cut])
+    model.meta.update(
+        version=time.strftime("v%Y%m%d%H%M%S"),
+        holdout=evaluate(model, df.iloc[cut:]) if cut < len(df) else None,
+    )
+    version = model.meta["version"]
+    blobstore.save_as(model.to_bytes(), f"{MODEL_DIR}/{version}.npz")
+    blobstore.save_as(version.encode(), f"{MODEL_DIR}/LATEST")
+    _models.clear()
+    return version
+
+
+_models: dict[str, LocalScoreModel] = {}
+
+
+def load_model(version: Optional[str] = None) -> LocalScoreModel:
+    version = (
+        version
+        or blobstore.read(blobstore.path(f"{MODEL_DIR}/LATEST"))
+        .decode()
+        .strip()
+    )
+    if version not in _models:
+        _models[version] = LocalScoreModel.from_bytes(
+            blobstore.read(blobstore.path(f"{MODEL_DIR}/{version}.npz"))
+        )
+    return _models[version]
+
+
+def score_local(
+    df: pd.DataFrame, version: Optional[str] = None
+) -> pd.DataFrame:
+    """Vectorized score/tier for a normalize()d frame, no network calls."""
+    return load_model(version).predict(df)
+
+
+def _labelled_rows() -> pd.DataFrame:
+    from ..models.database import ProbateRecord
+
+    # Rule-decided rows carry the rule scorer's verdict, not an LLM label.
+    rows = (
+        ProbateRecord.select()
+        .where(
+            ProbateRecord.score.is_null(False)
+            & ProbateRecord.tier.in_(TIERS)
+            & (
+                ProbateRecord.rationale.is_null()  # rationale now lazy
+                | ~(ProbateRecord.rationale.startswith("Rules:"))
+            )
+        )
+        .dicts()
+    )
+    return normalize(frame_from_rows(list(rows)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["train"])
+    parser.add_argument(
+        "--csv", help="labelled file with score/tier columns instead of the DB"
+    )
+    args = parser.parse_args()
+    if args.csv:
+        with open(args.csv, "rb") as f:
+            data = normalize(read_table(f.read(), args.csv))
+    else:
+        data = _labelled_rows()
+    version = train(data)
+    print(json.dumps(load_model(version).meta, indent=2))
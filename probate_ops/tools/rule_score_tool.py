@@ -0,0 +1,152 @@
+import json, sys
+import numpy as np, pandas as pd
+from ..core.settings import settings
+
+# Same rules the LLM prompt spells out, as points on a 0-100 scale.
+BASE = 30.0
+ABSENTEE = 25.0
+PETITION_AGE = 20.0  # full credit at PETITION_AGE_DAYS
+PETITION_AGE_DAYS = 730
+DEATH_AGE = 10.0  # full credit at DEATH_AGE_DAYS
+DEATH_AGE_DAYS = 1095
+HOLDINGS = 15.0  # full credit at 1 + EXTRA_HOLDINGS holdings
+EXTRA_HOLDINGS = 3
+MISSING_ADDRESS = -30.0
+UNKNOWN_DAYS = 9999  # normalize() fills missing dates with this
+HIGH, MEDIUM = 70, 40
+
+
+def _col(df: pd.DataFrame, name: str, default) -> pd.Series:
+    if name in df.columns:
+        return df[name]
+    return pd.Series(default, index=df.index)
+
+
+def _days(s: pd.Series) -> np.ndarray:
+    d = pd.to_numeric(s, errors="coerce").fillna(UNKNOWN_DAYS).to_numpy()
+    return np.where(d >= UNKNOWN_DAYS, 0, np.clip(d, 0, None))
+
+
+def score_rules(df: pd.DataFrame) -> pd.DataFrame:
+    """Deterministic score/tier/rationale for every row of a normalized frame."""
+    absentee = _col(df, "absentee_flag", False).fillna(False).astype(bool)
+    petition_days = _days(_col(df, "days_since_petition", UNKNOWN_DAYS))
+    death_days = _days(_col(df, "days_since_death", UNKNOWN_DAYS))
+    holdings = (
+        pd.to_numeric(_col(df, "holdings_in_file", 1), errors="coerce")
+        .fillna(1)
+        .to_numpy()
+    )
+    address = _col(df, "property_address", None)
+    missing_address = (
+        address.isna() | (address.astype(str).str.strip() == "")
+    ).to_numpy()
+
+    extra = np.clip(holdings - 1, 0, EXTRA_HOLDINGS)
+    score = (
+        BASE
+        + ABSENTEE * absentee.to_numpy()
+        + PETITION_AGE * np.minimum(petition_days / PETITION_AGE_DAYS, 1)
+        + DEATH_AGE * np.minimum(death_days / DEATH_AGE_DAYS, 1)
+        + HOLDINGS * extra / EXTRA_HOLDINGS
+        + MISSING_ADDRESS * missing_address
+    )
+    score = np.clip(np.round(score), 0, 100).astype(int)
+    tier = np.select(
+        [score >= HIGH, score >= MEDIUM], ["high", "medium"], "low"
+    )
+
+    parts = pd.DataFrame(
+        {
+            "absentee": np.where(absentee, "absentee owner", ""),
+            "petition": np.where(
+                petition_days > 0,
+                "petition "
+                + pd.Series(petition_days, index=df.index)
+                .astype(int)
+                .astype(str)
+                + "d old",
+                "",
+            ),
+            "holdings": np.where(
+                holdings > 1,
+                pd.Series(holdings, index=df.index).astype(int).astype(str)
+                + " holdings",
+                "",
+            ),
+            "address": np.where(missing_address, "missing address", ""),
+        },
+        index=df.index,
+    )
+    joined = (
+        parts["absentee"]
+        .str.cat(
+            [parts["petition"], parts["holdings"], parts["address"]], sep="; "
+        )
+        .str.replace(r"(; )+", "; ", regex=True)
+        .str.strip("; ")
+        .replace("", "no strong signals")
+    )
+    rationale = "Rules: " + joined
+    return pd.DataFrame(
+        {"score": score, "tier": tier, "rationale": rationale},
+        index=df.index,
+    )
+
+
+def needs_llm(scores: pd.Series) -> np.ndarray:
+    """Rows whose rule score falls inside the configured uncertainty band."""
+    s = scores.to_numpy()
+    return (s >= settings.RULE_BAND_LOW) & (s <= settings.RULE_BAND_HIGH)
+
+
+async def score_with_rules(records: list[dict], scorer) -> tuple[list, dict]:
+    """Rule-score every record; send only the ambiguous ones to the LLM.
+
+    `llm_records` in the stats counts records sent to the scorer, which
+    may batch several of them into one request.
+    """
+    if not records:
+        return [], {"records": 0, "llm_records": 0, "llm_avoided": 0.0}
+    rules = score_rules(pd.DataFrame(records))
+    mask = needs_llm(rules["score"])
+    verdicts = rules.to_dict(orient="records")
+    ambiguous = np.flatnonzero(mask)
+    llm = await scorer.score_many([records[i] for i in ambiguous])
+    for i, verdict in zip(ambiguous, llm):
+        verdicts[i] = verdict
+    stats = {
+        "records": len(records),
+        "llm_records": int(mask.sum()),
+        "llm_avoided": float(1 - mask.mean()),
+    }
+    return verdicts, stats
+
+
+def agreement(rules: pd.DataFrame, labels: pd.DataFrame) -> dict:
+    """How closely rule verdicts track LLM labels (score/tier columns)."""
+    score = pd.to_numeric(labels["score"], errors="coerce")
+    ok = score.notna() & labels["tier"].notna()
+    ruled, labelled = rules[ok], labels[ok]
+    if not len(ruled):
+        return {"n": 0}
+    return {
+        "n": int(len(ruled)),
+        "tier_accuracy": float((ruled["tier"] == labelled["tier"]).mean()),
+        "score_mae": float((ruled["score"] - score[ok]).abs().mean()),
+        "score_spearman": float(
+            ruled["score"].rank().corr(score[ok].rank())
+        ),
+        "llm_avoided": float(1 - needs_llm(ruled["score"]).mean()),
+    }
+
+
+if __name__ == "__main__":
+    # python -m probate_ops.tools.rule_score_tool labeled.csv
+    # The file needs the usual lead columns plus LLM `score`/`tier` labels.
+    from ..utils.normalize import read_table, normalize
+
+    path = sys.argv[1]
+    with open(path, "rb") as f:
+        df = normalize(read_table(f.read(), path))
+    print(json.dumps(agreement(score_rules(df), df), indent=2))
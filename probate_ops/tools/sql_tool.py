@@ -1,5 +1,7 @@
-import pandas as pd
-from probate_ops.core.storage import SQLStore
+import datetime, decimal, os, re
+import duckdb
+from probate_ops.core.settings import settings
+from probate_ops.core.storage import sqlstore
 
 SAFE = (
     "select",
@@ -20,10 +22,81 @@ def _safe(sql: str) -> str:
     s = sql.strip().lower()
     if not any(s.startswith(k) for k in ("select", "with")):
         raise ValueError("Only SELECT/CTE queries allowed")
+    if ";" in s.rstrip("; \n\t"):
+        raise ValueError("Only a single statement allowed")
     return sql
 
 
-def run_sql(query: str) -> dict:
-    df: pd.DataFrame = SQLStore().query(_safe(query))
-    preview = df.head(50).to_dict(orient="records")
-    return {"rows": preview, "row_count": len(df)}
+def normalize_sql(sql: str) -> str:
+    """Whitespace/case-insensitive form of a query, for cache keys.
+
+    String literals are left untouched; everything else is lowercased and
+    runs of whitespace collapse to one space.
+    """
+    parts = re.split(r"('(?:[^']|'')*')", sql.strip().rstrip(";").strip())
+    return "".join(
+        p if i % 2 else re.sub(r"\s+", " ", p.lower())
+        for i, p in enumerate(parts)
+    )
+
+
+def _jsonable(row: dict) -> dict:
+    """Arrow values as JSON types: ISO dates, numbers for decimals."""
+    out = {}
+    for k, v in row.items():
+        if isinstance(v, (datetime.date, datetime.time)):
+            v = v.isoformat()
+        elif isinstance(v, decimal.Decimal):
+            v = int(v) if v == v.to_integral_value() else float(v)
+        out[k] = v
+    return out
+
+
+PREVIEW_ROWS = 50
+STREAM_BATCH_ROWS = 10_000
+
+
+def run_sql(
+    query: str, limit: int = PREVIEW_ROWS, stream: bool = False
+) -> dict:
+    """Preview rows and total count; with `stream`, every row lazily.
+
+    In stream mode `rows` is an iterator of record batches (lists of
+    dicts) and no count is taken. Raises QueryRejected for plans over
+    SQL_MAX_ESTIMATED_ROWS and TimeoutError past SQL_TIMEOUT.
+    """
+    if stream:
+        return {"rows": sqlstore.stream(_safe(query), STREAM_BATCH_ROWS)}
+    rows, count = sqlstore.preview(_safe(query), limit)
+    return {"rows": rows, "row_count": count}
+
+
+def run_sql_file(
+    query: str, path: str, table: str = "data", limit: int = PREVIEW_ROWS
+) -> dict:
+    """Run a SELECT against one CSV file, exposed as view `table`.
+
+    Uses a private in-memory DuckDB whose file access is locked to that
+    one CSV, so generated SQL cannot read anything else, including the
+    other uploads stored next to it. The
+    query goes through SQLStore.preview, so it gets the same plan guard,
+    timeout, LIMIT pushdown and query log as run_sql.
+    """
+    path = os.path.abspath(path)
+    con = duckdb.connect(
+        config={
+            "threads": settings.DUCKDB_THREADS,
+            "memory_limit": settings.DUCKDB_MEMORY_LIMIT,
+        }
+    )
+    try:
+        quoted = path.replace("'", "''")
+        con.execute(
+            f"CREATE VIEW {table} AS SELECT * FROM read_csv_auto('{quoted}')"
+        )
+        con.execute(f"SET allowed_paths=['{quoted}']")
+        con.execute("SET enable_external_access=false")
+        rows, count = sqlstore.preview(_safe(query), limit, con=con)
+    finally:
+        con.close()
+    return {"rows": [_jsonable(r) for r in rows], "row_count": count}
@@ -1,11 +1,19 @@
+import math
+import pandas as pd
 import peewee
 from probate_ops.models.database import ProbateRecord
 from probate_ops.models.api import ChartFilters
-from datetime import date
+from probate_ops.utils.normalize import frame_from_rows, holdings_key
+from probate_ops.utils.geo import (
+    EARTH_RADIUS_MILES,
+    bounding_box,
+    zip_centroid,
+)
+from datetime import date, datetime
 from typing import Optional, List
-from fastapi import Query
+from fastapi import HTTPException, Query
 from typing_extensions import Annotated
-from peewee import fn, Value, SQL
+from peewee import fn, Case, Value, SQL, ValuesList
 
 
 def _apply_filters(q, f: ChartFilters) -> peewee.Query:
@@ -94,9 +102,36 @@ def _apply_filters(q, f: ChartFilters) -> peewee.Query:
         )
     if f.has_value:
         q = q.where(ProbateRecord.property_value.is_null(False))
+    if f.near_zip and f.radius_miles:
+        q = q.where(_radius_expr(f.near_zip, f.radius_miles))
     return q
 
 
+def _radius_expr(near_zip: str, radius_miles: float):
+    # Bounding box first so the (latitude, longitude) index does the heavy
+    # lifting; the exact check (geo.haversine, in SQL) only runs on the
+    # survivors. Nothing is near a ZIP the centroid table does not know.
+    centroid = zip_centroid(near_zip)
+    if centroid is None:
+        return SQL("1 = 0")
+    lat, lon = centroid
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_miles)
+    rlat = fn.radians(ProbateRecord.latitude)
+    rlon = fn.radians(ProbateRecord.longitude)
+    half_dlat = fn.sin((rlat - Value(math.radians(lat))) / 2)
+    half_dlon = fn.sin((rlon - Value(math.radians(lon))) / 2)
+    cos_product = fn.cos(rlat) * Value(math.cos(math.radians(lat)))
+    a = half_dlat * half_dlat + cos_product * half_dlon * half_dlon
+    distance = Value(2 * EARTH_RADIUS_MILES) * fn.asin(
+        fn.sqrt(fn.least(a, Value(1.0)))
+    )
+    return (
+        ProbateRecord.latitude.between(min_lat, max_lat)
+        & ProbateRecord.longitude.between(min_lon, max_lon)
+        & (distance <= radius_miles)
+    )
+
+
 def chart_filters_dep(
     counties: Annotated[Optional[List[str]], Query()] = None,
     petition_types: Annotated[Optional[List[str]], Query()] = None,
@@ -113,8 +148,19 @@ def chart_filters_dep(
     days_since_petition_max: Annotated[Optional[int], Query()] = None,
     days_death_to_petition_min: Annotated[Optional[int], Query()] = None,
     days_death_to_petition_max: Annotated[Optional[int], Query()] = None,
-    has_value: Annotated[Optional[bool], Query()] = None
+    has_value: Annotated[Optional[bool], Query()] = None,
+    near_zip: Annotated[Optional[str], Query()] = None,
+    radius_miles: Annotated[Optional[float], Query(gt=0)] = None,
 ) -> ChartFilters:
+    if bool(near_zip) != (radius_miles is not None):
+        raise HTTPException(
+            status_code=422,
+            detail="near_zip and radius_miles must be given together",
+        )
+    if near_zip and zip_centroid(near_zip) is None:
+        raise HTTPException(
+            status_code=422, detail=f"Unknown ZIP code '{near_zip}'"
+        )
     return ChartFilters(
         counties=counties,
         petition_types=petition_types,
@@ -131,10 +177,90 @@ def chart_filters_dep(
         days_since_petition_max=days_since_petition_max,
         days_death_to_petition_min=days_death_to_petition_min,
         days_death_to_petition_max=days_death_to_petition_max,
-        has_value=has_value
+        has_value=has_value,
+        near_zip=near_zip,
+        radius_miles=radius_miles,
     )
 
 
+def bulk_update_scores(verdicts: dict[int, dict], chunk: int = 1000) -> int:
+    """Write {id: {score, tier, rationale}} back with UPDATE ... FROM (VALUES).
+
+    One statement per chunk instead of one per row. A verdict without a
+    rationale keeps the stored one only while score and tier are unchanged;
+    otherwise it would explain the previous verdict. VALUES columns keep
+    their default names (column1..) so the SQL is the same on every backend.
+    """
+    items = [
+        (rid, v["score"], v["tier"], v.get("rationale"))
+        for rid, v in verdicts.items()
+    ]
+    now = datetime.utcnow()
+    updated = 0
+    with ProbateRecord._meta.database.atomic():
+        for i in range(0, len(items), chunk):
+            vl = ValuesList(items[i : i + chunk], alias="v")
+            updated += (
+                ProbateRecord.update(
+                    score=vl.c.column2,
+                    tier=vl.c.column3,
+                    # a None rationale keeps one generated on demand for
+                    # the same verdict, and clears it for a new one
+                    rationale=Case(
+                        None,
+                        [
+                            (
+                                (ProbateRecord.score == vl.c.column2)
+                                & (ProbateRecord.tier == vl.c.column3),
+                                fn.COALESCE(
+                                    vl.c.column4, ProbateRecord.rationale
+                                ),
+                            )
+                        ],
+                        vl.c.column4,
+                    ),
+                    scored_at=now,
+                )
+                .from_(vl)
+                .where(ProbateRecord.id == vl.c.column1)
+                .execute()
+            )
+    return updated
+
+
+def table_holdings(rows: list[dict]) -> pd.Series:
+    """holdings_in_file counts for `rows`, taken over the whole table.
+
+    Counting within a batch would undercount owners whose other holdings
+    fall in a different batch, so every stored row of the same owners is
+    read and keyed as normalize() keys a file.
+    """
+    owners = {(r["owner_name"] or "").lower().strip() for r in rows}
+    peers = (
+        ProbateRecord.select(ProbateRecord.owner_name, ProbateRecord.party_zip)
+        .where(fn.LOWER(fn.TRIM(ProbateRecord.owner_name)).in_(owners))
+        .dicts()
+    )
+    return holdings_key(frame_from_rows(list(peers))).value_counts()
+
+
+def data_version() -> int:
+    """Cheap, approximate write counter for ProbateRecord.
+
+    Postgres tracks inserted/updated/deleted tuples per table, so writes from
+    any worker move this number and cached aggregates key on it. The pg_stat
+    counters are updated asynchronously (at transaction end, flushed by the
+    stats system), so a fresh write may not show yet; the caches' TTL is
+    what bounds staleness.
+    """
+    row = ProbateRecord._meta.database.execute_sql(
+        "SELECT COALESCE(n_tup_ins + n_tup_upd + n_tup_del, 0) "
+        "FROM pg_stat_user_tables WHERE relname = %s",
+        (ProbateRecord._meta.table_name,),
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+
 # 2) Absentee using 5-digit zip compare
 def _five_zip(field):
     cleaned = fn.regexp_replace(field, Value(r"[^0-9]"), Value(""), Value("g"))
@@ -0,0 +1,52 @@
+import csv, gzip, math, os, re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# Bundled ZIP centroid table (zip,lat,lon), generated from the MIT-licensed
+# `zipcodes` dataset. No geocoding service is involved at any point.
+CENTROIDS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "zip_centroids.csv.gz"
+)
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+
+
+@lru_cache(maxsize=1)
+def _centroids() -> dict[str, Tuple[float, float]]:
+    with gzip.open(CENTROIDS_PATH, "rt", newline="") as f:
+        return {
+            row["zip"]: (float(row["lat"]), float(row["lon"]))
+            for row in csv.DictReader(f)
+        }
+
+
+def five_zip(value) -> Optional[str]:
+    if value is None:
+        return None
+    m = re.search(r"\d{5}", str(value))
+    return m.group(0) if m else None
+
+
+def zip_centroid(value) -> Optional[Tuple[float, float]]:
+    """(lat, lon) of a ZIP code, or None when unknown/unparseable."""
+    z = five_zip(value)
+    return _centroids().get(z) if z else None
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in miles between two (lat, lon) points."""
+    rlat1, rlat2 = math.radians(lat1), math.radians(lat2)
+    half_dlat = math.sin((rlat2 - rlat1) / 2)
+    half_dlon = math.sin(math.radians(lon2 - lon1) / 2)
+    a = half_dlat**2 + math.cos(rlat1) * math.cos(rlat2) * half_dlon**2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def bounding_box(
+    lat: float, lon: float, radius_miles: float
+) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) enclosing the radius circle."""
+    dlat = radius_miles / MILES_PER_DEGREE_LAT
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlon = radius_miles / (MILES_PER_DEGREE_LAT * cos_lat)
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
@@ -1,4 +1,5 @@
 import io, os, pandas as pd, re
+from typing import BinaryIO, Iterator, Optional, Union
 
 ALIASES = {
     "county": "county",
@@ -20,6 +21,19 @@ ALIASES = {
 }
 
 
+# ProbateRecord column -> raw column name normalize() understands
+DB_COLUMNS = {
+    "owner_name": "decedent",
+    "property_address": "street_address",
+    "party_address": "party_street_address",
+}
+
+
+def frame_from_rows(rows: list[dict]) -> pd.DataFrame:
+    """DataFrame of ProbateRecord rows, ready to pass through normalize()."""
+    return pd.DataFrame(rows).rename(columns=DB_COLUMNS)
+
+
 def read_table(bytes_: bytes, filename: str) -> pd.DataFrame:
     ext = os.path.splitext(filename or "")[1].lower()
     if ext in [".csv", ".txt"]:
@@ -27,7 +41,27 @@ def read_table(bytes_: bytes, filename: str) -> pd.DataFrame:
     return pd.read_excel(io.BytesIO(bytes_))
 
 
-def normalize(df: pd.DataFrame) -> pd.DataFrame:
+def iter_table(
+    source: Union[str, BinaryIO],
+    filename: str,
+    chunksize: int,
+    nrows: Optional[int] = None,
+) -> Iterator[pd.DataFrame]:
+    """Raw frames of at most `chunksize` rows, first `nrows` rows only.
+
+    CSV is parsed incrementally; Excel has no streaming reader in pandas,
+    so the sheet is read once and sliced.
+    """
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext in [".csv", ".txt"]:
+        yield from pd.read_csv(source, chunksize=chunksize, nrows=nrows)
+        return
+    df = pd.read_excel(source, nrows=nrows)
+    for i in range(0, len(df), chunksize):
+        yield df.iloc[i : i + chunksize]
+
+
+def _canonical(df: pd.DataFrame) -> pd.DataFrame:
     orig = list(df.columns)
     low = [str(c).strip().lower() for c in orig]
     ren = {orig[i]: ALIASES.get(low[i], low[i]) for i in range(len(orig))}
@@ -35,6 +69,29 @@ def normalize(df: pd.DataFrame) -> pd.DataFrame:
     for c in ALIASES.values():
         if c not in df.columns:
             df[c] = None
+    return df
+
+
+def holdings_key(df: pd.DataFrame) -> pd.Series:
+    """Owner + petitioner ZIP; rows sharing it are one holder's holdings."""
+    df = _canonical(df)
+    party_zip = df["party_zip"].astype(str).str.extract(r"(\d{5})")[0]
+    return (
+        df["decedent"].fillna("").str.lower().str.strip()
+        + "|"
+        + party_zip.fillna("")
+    )
+
+
+def normalize(
+    df: pd.DataFrame, holdings: Optional[pd.Series] = None
+) -> pd.DataFrame:
+    """Canonical columns plus features.
+
+    `holdings` maps holdings_key() to a count taken over the whole file,
+    for frames that are only part of it; by default `df` is the file.
+    """
+    df = _canonical(df)
     df["zip"] = df["zip"].astype(str).str.extract(r"(\d{5})")[0]
     df["party_zip"] = df["party_zip"].astype(str).str.extract(r"(\d{5})")[0]
     df["property_address"] = df["street_address"]
@@ -67,10 +124,7 @@ def normalize(df: pd.DataFrame) -> pd.DataFrame:
     df["days_since_petition"] = (
         (td - df["petition_date"]).dt.days.fillna(9999).astype(int)
     )
-    key = (
-        df["owner_name"].fillna("").str.lower().str.strip()
-        + "|"
-        + df["party_zip"].fillna("")
-    )
-    df["holdings_in_file"] = key.map(key.value_counts()).fillna(1).astype(int)
+    key = holdings_key(df)
+    counts = key.value_counts() if holdings is None else holdings
+    df["holdings_in_file"] = key.map(counts).fillna(1).astype(int)
     return df
@@ -0,0 +1,54 @@
+import io, warnings
+from typing import BinaryIO
+import pandas as pd
+
+CHUNK_SIZE = 64 * 1024
+MAX_SNIFF_BYTES = 1024 * 1024  # give up looking for more sample rows here
+
+
+def _head(stream: BinaryIO, rows: int) -> str:
+    """Decoded text of the header plus up to `rows` complete lines."""
+    buf = b""
+    while len(buf) < MAX_SNIFF_BYTES:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            return buf.decode("utf-8-sig", errors="replace")
+        buf += chunk
+        if buf.count(b"\n") > rows:
+            break
+    # drop the trailing partial line; a torn multi-byte char goes with it
+    return buf[: buf.rfind(b"\n") + 1].decode("utf-8-sig", errors="replace")
+
+
+def _kind(s: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(s):
+        return "boolean"
+    if pd.api.types.is_integer_dtype(s):
+        return "integer"
+    if pd.api.types.is_float_dtype(s):
+        return "number"
+    values = s.dropna().astype(str)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # "could not infer format"
+        dates = pd.to_datetime(values, errors="coerce")
+    if len(values) and dates.notna().all():
+        return "date"
+    return "text"
+
+
+def sniff_csv(stream: BinaryIO, sample_rows: int = 50) -> dict:
+    """Column names and inferred types from the head of a CSV stream.
+
+    Reads only as much of the stream as the header and `sample_rows` rows
+    need, so the cost does not grow with the file.
+    """
+    text = _head(stream, sample_rows)
+    if not text.strip():
+        return {"columns": [], "types": {}, "sample_rows": 0}
+    df = pd.read_csv(io.StringIO(text), nrows=sample_rows)
+    columns = [str(c) for c in df.columns]
+    return {
+        "columns": columns,
+        "types": {str(c): _kind(df[c]) for c in df.columns},
+        "sample_rows": len(df),
+    }
@@ -0,0 +1,32 @@
+import os
+
+# Settings() requires these at import time; tests never reach the real services.
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("POSTGRES_PASSWORD", "test-password")
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _private_sqlstore(tmp_path, monkeypatch):
+    """Agent SQL logs to a throwaway DuckDB, not probate_ops/data."""
+    from probate_ops.core.storage import SQLStore
+    from probate_ops.tools import sql_tool
+
+    store = SQLStore(str(tmp_path / "sqlstore.duckdb"))
+    monkeypatch.setattr(sql_tool, "sqlstore", store)
+    yield store
+    store.close()
+
+
+@pytest.fixture(autouse=True)
+def _private_score_cache(monkeypatch):
+    """The shared scorer caches in memory, not in ./_cache."""
+    from probate_ops.core import score_cache
+    from probate_ops.tools import llm_score_tool
+
+    cache = score_cache.ScoreCache(":memory:")
+    monkeypatch.setattr(score_cache, "score_cache", cache)
+    monkeypatch.setattr(llm_score_tool, "score_cache", cache)
+    monkeypatch.setattr(llm_score_tool.scorer, "cache", cache)
+    yield cache
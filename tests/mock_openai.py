@@ -0,0 +1,110 @@
+import json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockOpenAI:
+    """Local OpenAI-compatible chat completions server for tests.
+
+    `reply(body)` returns the assistant message content for a request body;
+    `fail_first` makes the first N requests answer with HTTP `fail_status`
+    (a 429 carries a short Retry-After).
+    """
+
+    def __init__(
+        self,
+        reply=None,
+        delay: float = 0.0,
+        fail_first: int = 0,
+        fail_status: int = 500,
+    ):
+        self.reply = reply or (
+            lambda body: json.dumps(
+                {"score": 80, "tier": "high", "rationale": "mock"}
+            )
+        )
+        self.delay = delay
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.requests: list[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: dict):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("retry-after-ms", "10")
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with mock._lock:
+                    mock.requests.append(body)
+                    failing = len(mock.requests) <= mock.fail_first
+                    mock.in_flight += 1
+                    mock.max_in_flight = max(
+                        mock.max_in_flight, mock.in_flight
+                    )
+                try:
+                    time.sleep(mock.delay)
+                    if failing:
+                        return self._send(
+                            mock.fail_status, {"error": {"message": "boom"}}
+                        )
+                    self._send(200, mock.completion(body))
+                finally:
+                    with mock._lock:
+                        mock.in_flight -= 1
+
+        return Handler
+
+    def completion(self, body: dict) -> dict:
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {
+                        "role": "assistant",
+                        "content": self.reply(body),
+                    },
+                }
+            ],
+            "usage": {
+                "prompt_tokens": 100,
+                "completion_tokens": 20,
+                "total_tokens": 120,
+            },
+        }
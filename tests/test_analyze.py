@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+
+import pandas as pd
+
+from probate_ops.controllers import analyze
+from probate_ops.controllers.analyze import ChartAccumulator
+from probate_ops.core.settings import settings
+
+
+def test_chart_accumulator_counts_records():
+    acc = ChartAccumulator()
+    for rec in [
+        {
+            "tier": "high",
+            "county": "Cook",
+            "petition_type": "Testate",
+            "petition_date": pd.Timestamp("2024-03-05"),
+            "absentee_flag": True,
+        },
+        {
+            "tier": "low",
+            "county": "",
+            "petition_type": float("nan"),
+            "petition_date": pd.NaT,
+            "absentee_flag": False,
+        },
+        {"tier": "high", "county": "Cook", "petition_date": None},
+    ]:
+        acc.add(rec)
+    charts = acc.snapshot()
+    assert charts["tiers"] == {"high": 2, "low": 1}
+    assert charts["top_counties"] == {"Cook": 2, "Unknown": 1}
+    assert charts["petition_types"] == {"Testate": 1}
+    assert charts["by_month"] == [{"month": "2024-03", "count": 1}]
+    assert charts["absentee_rate"] == 1 / 3
+    assert ChartAccumulator().snapshot()["absentee_rate"] == 0.0
+
+
+class _SlowScorer:
+    """Stub LLM scorer that records how many batches overlap."""
+
+    def __init__(self):
+        self.in_flight = self.peak = 0
+        self.seen = []
+
+    async def score_many(self, records):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        self.seen.extend(r["case_no"] for r in records)
+        return [{"score": 50, "tier": "medium", "rationale": "llm"}] * len(
+            records
+        )
+
+
+def _upload(tmp_path, n: int) -> str:
+    today = pd.Timestamp.today().normalize()
+    rows = [
+        {
+            "Case No": f"C{i}",
+            "Decedent": f"Owner {i}",
+            "Street Address": f"{i} Main St",
+            "City": "Springfield",
+            "Zip Code": "62701",
+            "County": "Sangamon",
+            "Party City": "Chicago" if i % 2 else "Springfield",
+            "Party Zip Code": "60601" if i % 2 else "62701",
+            "Petition Type": "Testate",
+            "Petition Date": (today - pd.Timedelta(days=30)).date(),
+        }
+        for i in range(n)
+    ]
+    # the same holder again, past max_records: still counted
+    rows.append({**rows[1], "Case No": "C-late"})
+    path = tmp_path / "upload.csv"
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+
+def _run(path: str, max_records: int) -> list[dict]:
+    async def go():
+        return [
+            json.loads(line)
+            async for line in analyze._stream(path, "upload.csv", max_records)
+        ]
+
+    return asyncio.run(go())
+
+
+def test_stream_scores_chunk_by_chunk(tmp_path, monkeypatch):
+    fake = _SlowScorer()
+    monkeypatch.setattr(analyze, "scorer", fake)
+    monkeypatch.setattr(settings, "ANALYZE_CHUNK_ROWS", 7)
+    monkeypatch.setattr(settings, "LLM_BATCH_MAX_SIZE", 3)
+    monkeypatch.setattr(settings, "LLM_CONCURRENCY", 2)
+    path = _upload(tmp_path, 60)
+
+    events = _run(path, max_records=50)
+
+    records = [e["data"] for e in events if e["event"] == "record"]
+    assert sorted(r["case_no"] for r in records) == sorted(
+        f"C{i}" for i in range(50)
+    )
+    by_case = {r["case_no"]: r for r in records}
+    # odd rows are absentee, land in the rule band and go to the LLM
+    assert sorted(fake.seen) == sorted(f"C{i}" for i in range(1, 50, 2))
+    assert by_case["C1"]["rationale"] == "llm"
+    assert by_case["C0"]["rationale"].startswith("Rules:")
+    assert by_case["C1"]["holdings_in_file"] == 2
+    assert by_case["C3"]["holdings_in_file"] == 1
+    assert 1 < fake.peak <= 2
+
+    summary = events[-1]
+    assert summary["event"] == "summary"
+    assert summary["data"]["sample_size"] == 50
+    assert summary["data"]["scoring"] == {
+        "records": 50,
+        "llm_records": 25,
+        "llm_avoided": 0.5,
+    }
+    assert summary["data"]["charts"]["tiers"]["medium"] == 25
+    assert not os.path.exists(path)
+
+
+def test_stream_of_empty_upload(tmp_path, monkeypatch):
+    monkeypatch.setattr(analyze, "scorer", _SlowScorer())
+    path = tmp_path / "empty.csv"
+    path.write_text("Case No,Decedent\n")
+
+    events = _run(str(path), max_records=10)
+
+    assert [e["event"] for e in events] == ["summary"]
+    assert events[0]["data"]["scoring"]["records"] == 0
@@ -0,0 +1,300 @@
+import ast
+import json
+import threading
+import time
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from openai import OpenAI
+from peewee import SqliteDatabase
+
+from probate_ops.jobs import batch_score
+from probate_ops.models.database import ProbateRecord, ScoringJob
+
+
+class StandInBatchAPI:
+    """Just enough of the Files + Batches API to run a job end to end.
+
+    A batch reports `in_progress` on its first retrieve and `completed`
+    (with an output file scoring every request) afterwards. With
+    `fail_all`, it completes with only an error file, as OpenAI does when
+    every request was rejected.
+    """
+
+    def __init__(self, fail_all: bool = False):
+        self.fail_all = fail_all
+        self.files: dict[str, bytes] = {}
+        self.batches: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        ).start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _add_file(self, data: bytes, purpose: str) -> dict:
+        file_id = f"file-{len(self.files) + 1}"
+        self.files[file_id] = data
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": f"{file_id}.jsonl",
+            "purpose": purpose,
+            "status": "processed",
+        }
+
+    def _fail(self, batch: dict):
+        out = [
+            json.dumps(
+                {
+                    "id": f"resp-{json.loads(line)['custom_id']}",
+                    "custom_id": json.loads(line)["custom_id"],
+                    "response": {
+                        "status_code": 400,
+                        "body": {"error": {"message": "model not found"}},
+                    },
+                    "error": None,
+                }
+            )
+            for line in self.files[batch["input_file_id"]].splitlines()
+        ]
+        errors = self._add_file("\n".join(out).encode(), "batch_output")
+        batch.update(
+            status="completed", output_file_id=None, error_file_id=errors["id"]
+        )
+
+    def _complete(self, batch: dict):
+        if self.fail_all:
+            return self._fail(batch)
+        out = []
+        for line in self.files[batch["input_file_id"]].splitlines():
+            req = json.loads(line)
+            record = req["body"]["messages"][1]["content"]
+            days = ast.literal_eval(record.removeprefix("Record: "))[
+                "days_since_petition"
+            ]
+            verdict = {
+                "score": 90 if days > 365 else 20,
+                "tier": "high" if days > 365 else "low",
+                "rationale": "stand-in",
+            }
+            out.append(
+                json.dumps(
+                    {
+                        "id": f"resp-{req['custom_id']}",
+                        "custom_id": req["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "body": {
+                                "choices": [
+                                    {
+                                        "message": {
+                                            "content": json.dumps(verdict)
+                                        }
+                                    }
+                                ]
+                            },
+                        },
+                        "error": None,
+                    }
+                )
+            )
+        output = self._add_file("\n".join(out).encode(), "batch_output")
+        batch.update(status="completed", output_file_id=output["id"])
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, payload, raw: bytes = None):
+                data = raw if raw is not None else json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                with api._lock:
+                    if self.path == "/v1/files":
+                        msg = BytesParser().parsebytes(
+                            b"Content-Type: "
+                            + self.headers["Content-Type"].encode()
+                            + b"\r\n\r\n"
+                            + body
+                        )
+                        parts = {
+                            p.get_param(
+                                "name", header="content-disposition"
+                            ): p
+                            for p in msg.get_payload()
+                        }
+                        return self._send(
+                            api._add_file(
+                                parts["file"].get_payload(decode=True),
+                                parts["purpose"].get_payload(),
+                            )
+                        )
+                    req = json.loads(body)
+                    batch_id = f"batch-{len(api.batches) + 1}"
+                    api.batches[batch_id] = {
+                        "id": batch_id,
+                        "object": "batch",
+                        "endpoint": req["endpoint"],
+                        "input_file_id": req["input_file_id"],
+                        "completion_window": req["completion_window"],
+                        "created_at": int(time.time()),
+                        "status": "validating",
+                    }
+                    self._send(api.batches[batch_id])
+
+            def do_GET(self):
+                with api._lock:
+                    if self.path.startswith("/v1/batches/"):
+                        batch = api.batches[self.path.rsplit("/", 1)[1]]
+                        if batch["status"] == "validating":
+                            batch["status"] = "in_progress"
+                        elif batch["status"] == "in_progress":
+                            api._complete(batch)
+                        return self._send(batch)
+                    file_id = self.path.split("/")[3]
+                    self._send(None, raw=api.files[file_id])
+
+        return Handler
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        batch_score.blobstore, "save", _saver(tmp_path), raising=False
+    )
+    test_db = SqliteDatabase(":memory:")
+    with test_db.bind_ctx([ProbateRecord, ScoringJob]):
+        test_db.create_tables([ProbateRecord, ScoringJob])
+        yield test_db
+
+
+def _saver(tmp_path):
+    counter = iter(range(10**6))
+
+    def save(bytes_: bytes, suffix: str) -> str:
+        path = tmp_path / f"blob-{next(counter)}{suffix}"
+        path.write_bytes(bytes_)
+        return str(path)
+
+    return save
+
+
+def _lead(i: int, petition_date: str) -> dict:
+    return {
+        "county": "Fulton",
+        "source_url": "",
+        "case_no": f"C-{i}",
+        "owner_name": f"Owner {i}",
+        "property_address": f"{i} Main St",
+        "city": "Atlanta",
+        "state": "GA",
+        "zip": "30303",
+        "party": "Heir",
+        "party_address": "1 Elm St",
+        "party_city": "Macon",
+        "party_zip": "31201",
+        "petition_date": petition_date,
+    }
+
+
+def test_batch_job_scores_table_end_to_end(db):
+    ProbateRecord.insert_many(
+        [
+            _lead(0, "2020-01-01"),
+            _lead(1, "2099-01-01"),
+            _lead(2, "2021-06-01"),
+        ]
+    ).execute()
+    api = StandInBatchAPI()
+    try:
+        client = OpenAI(api_key="test", base_url=api.base_url, max_retries=0)
+        job = batch_score.run(client=client, poll_interval=0)
+    finally:
+        api.close()
+
+    assert job.status == "applied"
+    assert job.record_count == job.applied_count == 3
+    tiers = dict(
+        ProbateRecord.select(
+            ProbateRecord.case_no, ProbateRecord.tier
+        ).tuples()
+    )
+    assert tiers == {"C-0": "high", "C-1": "low", "C-2": "high"}
+    assert (
+        ProbateRecord.select().where(ProbateRecord.scored_at.is_null()).count()
+        == 0
+    )
+    # Fresh scores are not stale, so the next run has nothing to do.
+    assert batch_score.prepare() is None
+
+
+def test_batch_job_resumes_a_submitted_batch(db):
+    ProbateRecord.insert_many([_lead(0, "2020-01-01")]).execute()
+    api = StandInBatchAPI()
+    try:
+        client = OpenAI(api_key="test", base_url=api.base_url, max_retries=0)
+        first = batch_score.run(client=client, once=True)
+        assert first.status == "submitted"
+        resumed = batch_score.run(client=client, poll_interval=0)
+    finally:
+        api.close()
+
+    assert resumed.id == first.id
+    assert resumed.status == "applied"
+    assert len(api.batches) == 1
+
+
+def test_batch_job_fails_when_every_request_failed(db):
+    ProbateRecord.insert_many(
+        [_lead(0, "2020-01-01"), _lead(1, "2021-06-01")]
+    ).execute()
+    api = StandInBatchAPI(fail_all=True)
+    try:
+        client = OpenAI(api_key="test", base_url=api.base_url, max_retries=0)
+        job = batch_score.run(client=client, poll_interval=0)
+    finally:
+        api.close()
+
+    assert job.status == "failed"
+    assert job.error == (
+        "batch completed with 2 requests failed, e.g. model not found"
+    )
+    assert (
+        ProbateRecord.select().where(ProbateRecord.score.is_null()).count()
+        == 2
+    )
+
+
+def test_build_requests_counts_holdings_over_the_table(db):
+    ProbateRecord.insert_many(
+        [
+            {**_lead(i, "2020-01-01"), "owner_name": "Jane Roe"}
+            for i in range(3)
+        ]
+    ).execute()
+    rows = list(ProbateRecord.select().limit(1).dicts())
+
+    (line,) = batch_score.build_requests(rows).decode().splitlines()
+    user = json.loads(line)["body"]["messages"][1]["content"]
+    record = ast.literal_eval(user.removeprefix("Record: "))
+    assert record["holdings_in_file"] == 3
@@ -0,0 +1,52 @@
+from probate_ops.core import cache
+from probate_ops.core.cache import TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    c = TTLCache(ttl=10)
+    c.set("a", 1)
+    clock.now += 9.9
+    assert c.get("a") == 1
+    clock.now += 0.1
+    assert c.get("a", "gone") == "gone"
+    assert len(c) == 0  # expired entries are dropped on read
+    c.set("a", 2)  # re-setting restarts the clock
+    clock.now += 5
+    assert c.get("a") == 2
+    assert c.stats() == {"size": 1, "hits": 2, "misses": 1, "hit_rate": 2 / 3}
+
+
+def test_no_ttl_never_expires(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    c = TTLCache()
+    c.set("a", 1)
+    clock.now += 10**9
+    assert c.get("a") == 1
+
+
+def test_least_recently_used_is_evicted():
+    c = TTLCache(maxsize=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # "b" is now the oldest
+    c.set("c", 3)
+    assert len(c) == 2
+    assert c.get("b") is None
+    assert (c.get("a"), c.get("c")) == (1, 3)
+    c.set("a", 10)  # overwriting refreshes, not grows
+    c.set("d", 4)
+    assert c.get("c") is None and c.get("a") == 10
+    assert c.pop("a") == 10 and c.pop("a", "none") == "none"
+    c.clear()
+    assert len(c) == 0
@@ -0,0 +1,126 @@
+import asyncio
+import io
+import json
+
+from langchain_openai import ChatOpenAI
+
+from probate_ops.core.query_cache import QueryCache
+from probate_ops.core.question_cache import QuestionCache
+from probate_ops.core.storage import blobstore
+from probate_ops.flows import checkpoint, dataviz
+from probate_ops.flows.dataviz import DataVizAgent, new_turn
+from tests.mock_openai import MockOpenAI
+
+
+def _reply(body: dict) -> str:
+    return json.dumps({"is_relevant": True, "relevant_fields": ["county"]})
+
+
+def test_follow_ups_reuse_checkpointed_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataviz, "question_cache", QuestionCache())
+
+    async def run(mock):
+        saver = await checkpoint.open_checkpointer(str(tmp_path / "c.sqlite"))
+        agent = DataVizAgent()
+        agent.llm = ChatOpenAI(
+            api_key="test", base_url=mock.base_url, model="gpt-4o-mini"
+        )
+        graph = agent.create_workflow(saver)
+        config = {"configurable": {"thread_id": "t1"}}
+        first = await graph.ainvoke(
+            {
+                "question": "Leads by county?",
+                "columns": ["county", "zip"],
+                "column_types": {"county": "text", "zip": "integer"},
+            },
+            config,
+        )
+        # follow-up on the same thread: no schema, same question reworded
+        again = await graph.ainvoke({"question": "leads  by COUNTY"}, config)
+        await checkpoint.touch(saver, "t1")
+        kept = await checkpoint.prune(saver, ttl=3600)
+        removed = await checkpoint.prune(saver, ttl=-1)
+        state = await graph.aget_state(config)
+        await saver.conn.close()
+        return first, again, kept, removed, state
+
+    with MockOpenAI(reply=_reply) as mock:
+        first, again, kept, removed, state = asyncio.run(run(mock))
+    assert first["file_schema"] == again["file_schema"] == ["county"]
+    assert len(mock.requests) == 1
+    assert "county (text)" in mock.requests[0]["messages"][1]["content"]
+    assert (kept, removed) == (0, 1)
+    assert state.values == {}
+
+
+def _sql_reply(body: dict) -> str:
+    system = body["messages"][0]["content"]
+    if system.startswith("You write DuckDB SQL"):
+        return json.dumps(
+            {
+                "sql": "SELECT county, COUNT(*) AS n FROM data GROUP BY 1 "
+                "ORDER BY n DESC"
+            }
+        )
+    if system.startswith("You are a data analyst. Answer"):
+        return json.dumps({"answer": "Fulton has the most leads (2)."})
+    return json.dumps({"is_relevant": True, "relevant_fields": ["county"]})
+
+
+def test_sql_answers_are_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataviz, "question_cache", QuestionCache())
+    monkeypatch.setattr(dataviz.settings, "BLOB_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        dataviz, "query_cache", QueryCache(str(tmp_path / "q.sqlite"))
+    )
+    csv_bytes = b"county,zip\nFulton,30303\nFulton,30305\nCobb,30060\n"
+    digest, _ = blobstore.save_stream(
+        io.BytesIO(csv_bytes), "datasets", ".csv"
+    )
+
+    async def run(mock):
+        saver = await checkpoint.open_checkpointer(str(tmp_path / "c.sqlite"))
+        agent = DataVizAgent()
+        agent.llm = ChatOpenAI(
+            api_key="test", base_url=mock.base_url, model="gpt-4o-mini"
+        )
+        graph = agent.create_workflow(saver)
+        config = {"configurable": {"thread_id": "t2"}}
+        question = "Which county has the most leads?"
+        first = await graph.ainvoke(
+            new_turn(question, columns=["county", "zip"], dataset_hash=digest),
+            config,
+        )
+        second = await graph.ainvoke(new_turn(question), config)
+        await saver.conn.close()
+        return first, second
+
+    with MockOpenAI(reply=_sql_reply) as mock:
+        first, second = asyncio.run(run(mock))
+        calls = len(mock.requests)
+    assert first["rows"][0] == {"county": "Fulton", "n": 2}
+    assert (
+        first["answer"] == second["answer"] == "Fulton has the most leads (2)."
+    )
+    assert not first["cached"] and second["cached"]
+    # parse, SQL and summary once; the repeat needs no LLM call at all
+    assert calls == 3
+
+
+def test_llm_calls_retry_429s_through_the_limiter(monkeypatch):
+    monkeypatch.setattr(dataviz, "question_cache", QuestionCache())
+    penalties = []
+    monkeypatch.setattr(
+        dataviz.limiter, "penalize", lambda h: penalties.append(h) or None
+    )
+    monkeypatch.setattr(dataviz.settings, "LLM_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(dataviz.settings, "LLM_MAX_RETRIES", 2)
+    with MockOpenAI(reply=_reply, fail_first=2, fail_status=429) as mock:
+        monkeypatch.setattr(dataviz.settings, "OPENAI_BASE_URL", mock.base_url)
+        agent = DataVizAgent()  # no SDK retries stacked on ours
+        out = agent.parse_question(
+            {"question": "Leads by county?", "columns": ["county"]}
+        )
+    assert out["file_schema"] == ["county"]
+    assert len(mock.requests) == 3
+    assert [h["retry-after-ms"] for h in penalties] == ["10", "10"]
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from probate_ops.tools.df_tool import run_df
+
+
+@pytest.fixture
+def leads():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "county": rng.choice(["Fulton", "Cobb", "DeKalb"], 400),
+            "kind": rng.choice(["estate", "guardian"], 400),
+            "value": rng.normal(250_000, 50_000, 400).round(2),
+            "petition_date": pd.date_range("2024-01-01", periods=400)
+            .astype(str)
+            .tolist(),
+        }
+    )
+
+
+def test_legacy_ops_still_work(leads):
+    rows = run_df(leads, "count_by", "county")["rows"]
+    assert sum(r["count"] for r in rows) == 400
+    assert rows == sorted(rows, key=lambda r: -r["count"])
+    assert set(run_df(leads, "sum_by", "county", "value")["rows"][0]) == {
+        "county",
+        "value",
+    }
+    with pytest.raises(ValueError):
+        run_df(leads, "sum_by", "county")
+
+
+def test_duckdb_engine_matches_pandas_reference(leads):
+    spec = {
+        "by": ["county", "kind", "petition_date"],
+        "bucket": {"petition_date": "month"},
+        "aggs": [
+            {"fn": "median", "col": "value"},
+            {"fn": "mean", "col": "value"},
+            {"fn": "quantile", "col": "value", "q": 0.9},
+            {"fn": "count"},
+        ],
+        "top_k": 3,
+        "per": ["county"],
+    }
+    fast = pd.DataFrame(run_df(leads, spec=spec, engine="duckdb")["rows"])
+    slow = pd.DataFrame(run_df(leads, spec=spec, engine="pandas")["rows"])
+    assert len(fast) == 9
+    pd.testing.assert_frame_equal(fast, slow, check_dtype=False)
+    with pytest.raises(ValueError):
+        run_df(leads, spec={"aggs": [{"fn": "sum", "col": "nope"}]})
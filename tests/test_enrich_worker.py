@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from peewee import SqliteDatabase
+
+from probate_ops.core.settings import settings
+from probate_ops.jobs import enrich_worker
+from probate_ops.jobs.enrich_worker import EnrichWorker
+from probate_ops.models.database import ProbateRecord
+from probate_ops.tools.llm_score_tool import FALLBACK
+from tests.test_batch_score import _lead
+
+
+class LockingSqlite(SqliteDatabase):
+    """SQLite has no row locks; take the claim's FOR UPDATE as a no-op."""
+
+    for_update = True
+
+    def execute_sql(self, sql, params=None, *args, **kwargs):
+        sql = sql.replace(" FOR UPDATE SKIP LOCKED", "")
+        return super().execute_sql(sql, params, *args, **kwargs)
+
+
+@pytest.fixture
+def db(tmp_path):
+    # a file, not :memory:, since run_once claims from worker threads
+    test_db = LockingSqlite(str(tmp_path / "leads.sqlite"))
+    with test_db.bind_ctx([ProbateRecord]):
+        test_db.create_tables([ProbateRecord])
+        yield test_db
+    test_db.close()
+
+
+def _claimed() -> dict:
+    return dict(
+        ProbateRecord.select(ProbateRecord.case_no, ProbateRecord.claimed_by)
+        .where(ProbateRecord.claimed_by.is_null(False))
+        .tuples()
+    )
+
+
+def test_workers_claim_disjoint_batches(db):
+    ProbateRecord.insert_many(
+        [_lead(i, "2020-01-01") for i in range(5)]
+    ).execute()
+    a, b = EnrichWorker(batch_size=2), EnrichWorker(batch_size=2)
+
+    assert [r["case_no"] for r in a.claim()] == ["C-0", "C-1"]
+    assert [r["case_no"] for r in b.claim()] == ["C-2", "C-3"]
+    assert [r["case_no"] for r in a.claim()] == ["C-4"]
+    assert b.claim() == []
+    assert _claimed() == {
+        "C-0": a.worker_id,
+        "C-1": a.worker_id,
+        "C-2": b.worker_id,
+        "C-3": b.worker_id,
+        "C-4": a.worker_id,
+    }
+
+
+def test_expired_lease_is_reclaimed(db):
+    ProbateRecord.insert_many(
+        [_lead(i, "2020-01-01") for i in range(2)]
+    ).execute()
+    dead = EnrichWorker(lease_seconds=600)
+    live = EnrichWorker(lease_seconds=600)
+    assert len(dead.claim()) == 2
+    assert live.claim() == []  # lease still held
+
+    ProbateRecord.update(
+        claimed_at=datetime.utcnow() - timedelta(seconds=601)
+    ).where(ProbateRecord.case_no == "C-0").execute()
+
+    assert [r["case_no"] for r in live.claim()] == ["C-0"]
+    assert _claimed() == {"C-0": live.worker_id, "C-1": dead.worker_id}
+
+
+class _HalfFailing:
+    """Stub scorer: the first record of every call falls back."""
+
+    async def score_many(self, records):
+        return [FALLBACK] + [
+            {"score": 50, "tier": "medium", "rationale": "llm"}
+        ] * (len(records) - 1)
+
+
+def test_run_once_scores_and_leaves_fallbacks_for_later(db, monkeypatch):
+    monkeypatch.setattr(enrich_worker, "scorer", _HalfFailing())
+    monkeypatch.setattr(settings, "RULE_BAND_LOW", 0)
+    monkeypatch.setattr(settings, "RULE_BAND_HIGH", 100)
+    ProbateRecord.insert_many(
+        [_lead(i, "2020-01-01") for i in range(3)]
+    ).execute()
+    worker = EnrichWorker(batch_size=10, lease_seconds=0)
+
+    assert asyncio.run(worker.run_once()) == 2
+    unscored = ProbateRecord.select().where(ProbateRecord.score.is_null())
+    assert [r.case_no for r in unscored] == ["C-0"]
+    assert worker.stats()["scored"] == 2
+    # the fallback row's lease has run out, so it is retried
+    assert [r["case_no"] for r in worker.claim()] == ["C-0"]
+
+
+def test_holdings_are_counted_over_the_table(db, monkeypatch):
+    monkeypatch.setattr(settings, "RULE_BAND_LOW", 100)  # rules decide all
+    monkeypatch.setattr(settings, "RULE_BAND_HIGH", 0)
+    same_owner = {"owner_name": "Jane Roe", "party_zip": "31201"}
+    ProbateRecord.insert_many(
+        [
+            {**_lead(0, "2020-01-01"), **same_owner},
+            _lead(1, "2020-01-01"),
+            {**_lead(2, "2020-01-01"), **same_owner, "party_zip": "31201-4"},
+            {**_lead(3, "2020-01-01"), "owner_name": " jane roe "},
+        ]
+    ).execute()
+    worker = EnrichWorker(batch_size=1)
+
+    assert asyncio.run(worker.run_once()) == 1  # C-0 alone in its batch
+    rationale = ProbateRecord.get(ProbateRecord.case_no == "C-0").rationale
+    assert "3 holdings" in rationale
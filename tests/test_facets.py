@@ -0,0 +1,114 @@
+import pytest
+from peewee import SqliteDatabase
+
+from probate_ops.controllers import facets
+from probate_ops.models.api import ChartFilters
+from probate_ops.models.database import ProbateRecord
+
+ROWS = [
+    ("Fulton", "Testate", "high", "R3"),
+    ("Fulton", "Intestate", "low", "R3"),
+    ("Fulton", "Testate", "medium", "C4"),
+    ("Cobb", "Testate", "high", "R3"),
+    ("Cobb", "Intestate", "high", None),
+    ("DeKalb", "Intestate", "low", ""),
+]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    test_db = SqliteDatabase(":memory:")
+    with test_db.bind_ctx([ProbateRecord]):
+        test_db.create_tables([ProbateRecord])
+        ProbateRecord.insert_many(
+            [
+                {
+                    "county": county,
+                    "source_url": "",
+                    "case_no": f"C-{i}",
+                    "owner_name": f"Owner {i}",
+                    "property_address": f"{i} Main St",
+                    "city": "Atlanta",
+                    "state": "GA",
+                    "zip": "30303",
+                    "party": "Heir",
+                    "party_address": "1 Elm St",
+                    "petition_type": petition_type,
+                    "tier": tier,
+                    "property_class": property_class,
+                }
+                for i, (county, petition_type, tier, property_class) in (
+                    enumerate(ROWS)
+                )
+            ]
+        ).execute()
+        yield test_db
+
+
+def _counts(f: ChartFilters) -> dict:
+    out = facets._compute_facets(f).facets
+    return {name: {v.value: v.count for v in vs} for name, vs in out.items()}
+
+
+def test_unfiltered_facets_skip_blank_values(db):
+    assert _counts(ChartFilters()) == {
+        "county": {"Fulton": 3, "Cobb": 2, "DeKalb": 1},
+        "petition_type": {"Testate": 3, "Intestate": 3},
+        "tier": {"high": 3, "low": 2, "medium": 1},
+        "property_class": {"R3": 3, "C4": 1},
+    }
+
+
+@pytest.mark.parametrize(
+    "update, own",
+    [
+        ({"counties": ["Cobb"]}, "county"),
+        ({"petition_types": ["Intestate"]}, "petition_type"),
+        ({"tiers": ["high"]}, "tier"),
+        ({"property_class": "C4"}, "property_class"),
+    ],
+)
+def test_each_facet_ignores_its_own_filter(db, update, own):
+    f = ChartFilters(**update)
+    got = _counts(f)
+    everything = _counts(ChartFilters())
+    # the facet's own dropdown still lists every option ...
+    assert got[own] == everything[own]
+    # ... while every other facet is narrowed by the filter
+    kept = [r for r, row in enumerate(ROWS) if _matches(row, update)]
+    for name in facets.FACETS:
+        if name == own:
+            continue
+        position = list(facets.FACETS).index(name)
+        expected: dict = {}
+        for r in kept:
+            value = ROWS[r][position]
+            if value:
+                expected[value] = expected.get(value, 0) + 1
+        assert got[name] == expected, name
+
+
+def _matches(row: tuple, update: dict) -> bool:
+    county, petition_type, tier, property_class = row
+    ((field, wanted),) = update.items()
+    value = {
+        "counties": county,
+        "petition_types": petition_type,
+        "tiers": tier,
+        "property_class": property_class,
+    }[field]
+    return value in wanted if isinstance(wanted, list) else value == wanted
+
+
+def test_facets_are_cached_per_data_version(db, monkeypatch):
+    version = [1]
+    monkeypatch.setattr(facets, "data_version", lambda: version[0])
+    monkeypatch.setattr(facets, "_cache", facets.TTLCache(ttl=60))
+    f = ChartFilters(counties=["Cobb"])
+
+    first = facets.get_facets(f)
+    ProbateRecord.update(tier="low").execute()
+    assert facets.get_facets(f) is first  # same version: served from cache
+    version[0] += 1
+    assert _counts(f)["tier"] == {"low": 2}
+    assert facets.get_facets(f) is not first
@@ -0,0 +1,60 @@
+import asyncio
+
+from probate_ops.core.registry import ToolRegistry
+from probate_ops.core.settings import settings
+from probate_ops.flows import full_enrich
+from probate_ops.tools.rule_score_tool import score_with_rules
+
+
+class _ReversedScorer:
+    """Stub LLM scorer: later chunks finish first, verdicts echo the input."""
+
+    def __init__(self):
+        self.batches = []
+
+    async def score_many(self, records):
+        self.batches.append([r["i"] for r in records])
+        await asyncio.sleep(0.05 / (1 + records[0]["i"]))
+        return [
+            {"score": r["i"], "tier": "low", "rationale": f"llm {r['i']}"}
+            for r in records
+        ]
+
+
+def test_fan_out_and_merge_keep_every_record_in_order(monkeypatch):
+    reg = ToolRegistry()
+    reg.register("score_records", score_with_rules)
+    scorer = _ReversedScorer()
+    monkeypatch.setattr(full_enrich, "registry", reg)
+    monkeypatch.setattr(full_enrich, "scorer", scorer)
+    monkeypatch.setattr(settings, "FLOW_CHUNK_SIZE", 3)
+    monkeypatch.setattr(settings, "RULE_BAND_LOW", 0)  # every record is
+    monkeypatch.setattr(settings, "RULE_BAND_HIGH", 100)  # sent to the LLM
+    records = [{"i": i, "property_address": f"{i} Main St"} for i in range(20)]
+
+    result = asyncio.run(
+        full_enrich.build_graph().ainvoke(
+            {"records": records}, config={"max_concurrency": 4}
+        )
+    )
+
+    assert [r["i"] for r in result["records"]] == list(range(20))
+    assert [r["score"] for r in result["records"]] == list(range(20))
+    assert all(r["property_address"] for r in result["records"])
+    assert len(scorer.batches) == 7  # ceil(20 / 3) branches
+    assert result["scoring"] == {
+        "records": 20,
+        "llm_records": 20,
+        "llm_avoided": 0.0,
+    }
+    assert reg.stats()["score_records"]["calls"] == 7
+
+
+def test_empty_input_skips_the_fan_out(monkeypatch):
+    reg = ToolRegistry()
+    monkeypatch.setattr(full_enrich, "registry", reg)
+
+    result = asyncio.run(full_enrich.build_graph().ainvoke({"records": []}))
+
+    assert result["records"] == []
+    assert result["scoring"]["records"] == 0
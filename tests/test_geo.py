@@ -0,0 +1,124 @@
+import math
+
+import pytest
+from fastapi import HTTPException
+from peewee import SqliteDatabase
+
+from probate_ops.models.database import ProbateRecord, backfill_coordinates
+from probate_ops.utils.database import _radius_expr, chart_filters_dep
+from probate_ops.utils.geo import bounding_box, haversine, zip_centroid
+
+ATLANTA = "30303"
+DECATUR = "30030"  # ~5.5 miles from ATLANTA
+MACON = "31201"  # ~79 miles from ATLANTA
+
+
+@pytest.fixture
+def db():
+    test_db = SqliteDatabase(":memory:")
+    # SQLite has the math functions but calls LEAST min()
+    test_db.register_function(min, "least", 2)
+    with test_db.bind_ctx([ProbateRecord]):
+        test_db.create_tables([ProbateRecord])
+        yield test_db
+
+
+def _lead(case_no: str, zip_code: str) -> dict:
+    return {
+        "county": "Fulton",
+        "source_url": "",
+        "case_no": case_no,
+        "owner_name": f"Owner {case_no}",
+        "property_address": "1 Main St",
+        "city": "Atlanta",
+        "state": "GA",
+        "zip": zip_code,
+        "party": "Heir",
+        "party_address": "1 Elm St",
+    }
+
+
+def test_zip_centroid():
+    lat, lon = zip_centroid(ATLANTA)
+    assert 33 < lat < 34 and -85 < lon < -84
+    assert zip_centroid("30303-1234") == (lat, lon)
+    assert zip_centroid(30303) == (lat, lon)
+    assert zip_centroid("00000") is None
+    assert zip_centroid("n/a") is None
+    assert zip_centroid(None) is None
+
+
+def test_haversine():
+    assert haversine(33.0, -84.0, 33.0, -84.0) == 0.0
+    # one degree of latitude is ~69 miles anywhere
+    assert haversine(10.0, 20.0, 11.0, 20.0) == pytest.approx(69.1, abs=0.1)
+    # a degree of longitude shrinks with cos(latitude)
+    assert haversine(60.0, 0.0, 60.0, 1.0) == pytest.approx(34.5, abs=0.1)
+    # antipodes: half the circumference, no domain error from asin
+    assert haversine(0.0, 0.0, 0.0, 180.0) == pytest.approx(math.pi * 3958.8)
+    a, b = zip_centroid(ATLANTA), zip_centroid(MACON)
+    assert haversine(*a, *b) == pytest.approx(79, abs=1)
+
+
+def test_bounding_box_encloses_the_circle():
+    lat, lon = zip_centroid(ATLANTA)
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, 10)
+    assert min_lat < lat < max_lat and min_lon < lon < max_lon
+    for corner_lat, corner_lon in [
+        (min_lat, lon),
+        (max_lat, lon),
+        (lat, min_lon),
+        (lat, max_lon),
+    ]:
+        assert haversine(lat, lon, corner_lat, corner_lon) >= 10 * 0.99
+
+
+def test_radius_filter_matches_haversine(db):
+    for case_no, zip_code in [("A", ATLANTA), ("D", DECATUR), ("M", MACON)]:
+        ProbateRecord.create(**_lead(case_no, zip_code))
+    assert backfill_coordinates() == 3
+
+    def near(zip_code, miles):
+        q = ProbateRecord.select(ProbateRecord.case_no).where(
+            _radius_expr(zip_code, miles)
+        )
+        return sorted(r.case_no for r in q)
+
+    assert near(ATLANTA, 1) == ["A"]
+    assert near(ATLANTA, 10) == ["A", "D"]
+    assert near(ATLANTA, 100) == ["A", "D", "M"]
+    assert near(MACON, 10) == ["M"]
+    assert near("00000", 100) == []
+
+
+def test_backfill_coordinates_fills_only_missing(db):
+    ProbateRecord.create(**_lead("A", ATLANTA))
+    ProbateRecord.create(**_lead("X", "no zip"))
+    ProbateRecord.create(**_lead("K", MACON), latitude=1.0, longitude=2.0)
+
+    assert backfill_coordinates(batch_size=1) == 1
+    coords = {
+        r.case_no: (r.latitude, r.longitude) for r in ProbateRecord.select()
+    }
+    assert coords == {
+        "A": zip_centroid(ATLANTA),
+        "X": (None, None),
+        "K": (1.0, 2.0),
+    }
+    assert backfill_coordinates() == 0
+
+
+@pytest.mark.parametrize(
+    "near_zip, radius_miles",
+    [(ATLANTA, None), (None, 5.0), ("00000", 5.0)],
+)
+def test_radius_filters_are_validated(near_zip, radius_miles):
+    with pytest.raises(HTTPException) as err:
+        chart_filters_dep(near_zip=near_zip, radius_miles=radius_miles)
+    assert err.value.status_code == 422
+
+
+def test_radius_filters_pass_through():
+    f = chart_filters_dep(near_zip=ATLANTA, radius_miles=5.0)
+    assert (f.near_zip, f.radius_miles) == (ATLANTA, 5.0)
+    assert chart_filters_dep().near_zip is None
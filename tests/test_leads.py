@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from peewee import SqliteDatabase
+
+from probate_ops.controllers import leads
+from probate_ops.models.database import ProbateRecord
+from probate_ops.utils.database import bulk_update_scores
+
+
+@pytest.fixture
+def db(tmp_path):
+    # a file, not :memory:, because the endpoint reads from worker threads
+    test_db = SqliteDatabase(str(tmp_path / "leads.sqlite"))
+    with test_db.bind_ctx([ProbateRecord]):
+        test_db.create_tables([ProbateRecord])
+        yield test_db
+    test_db.close()
+
+
+def _lead(**extra) -> int:
+    row = {
+        "county": "Fulton",
+        "source_url": "",
+        "case_no": "C-1",
+        "owner_name": "Owner",
+        "property_address": "1 Main St",
+        "city": "Atlanta",
+        "state": "GA",
+        "zip": "30303",
+        "party": "Heir",
+        "party_address": "1 Elm St",
+    }
+    return ProbateRecord.insert({**row, **extra}).execute()
+
+
+class SlowRationales:
+    def __init__(self):
+        self.calls = 0
+
+    async def score(self, record):
+        raise AssertionError("lead is already scored")
+
+    async def rationale(self, record, verdict):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return f"tier {verdict['tier']}"
+
+
+def test_rationale_is_generated_once_and_then_cached(db, monkeypatch):
+    lead_id = _lead(score=82, tier="high")
+    stub = SlowRationales()
+    monkeypatch.setattr(leads, "scorer", stub)
+
+    async def main():
+        first = await asyncio.gather(
+            *(leads.lead_rationale(lead_id) for _ in range(5))
+        )
+        return first, await leads.lead_rationale(lead_id)
+
+    first, again = asyncio.run(main())
+    assert stub.calls == 1 and not leads._inflight
+    assert all(r["rationale"] == "tier high" for r in first)
+    assert not first[0]["cached"] and again["cached"]
+    with pytest.raises(HTTPException) as missing:
+        asyncio.run(leads.lead_rationale(lead_id + 1))
+    assert missing.value.status_code == 404
+
+
+def test_rescore_keeps_rationale_only_for_the_same_verdict(db):
+    kept = _lead(score=50, tier="medium", rationale="on demand")
+    changed = _lead(
+        case_no="C-2", score=50, tier="medium", rationale="on demand"
+    )
+    bulk_update_scores(
+        {
+            kept: {"score": 50, "tier": "medium", "rationale": None},
+            changed: {"score": 90, "tier": "high", "rationale": None},
+        }
+    )
+    assert ProbateRecord.get_by_id(kept).rationale == "on demand"
+    row = ProbateRecord.get_by_id(changed)
+    assert (row.score, row.tier, row.rationale) == (90, "high", None)
+    bulk_update_scores(
+        {kept: {"score": 50, "tier": "medium", "rationale": "new"}}
+    )
+    assert ProbateRecord.get_by_id(kept).rationale == "new"
@@ -0,0 +1,68 @@
+import asyncio
+
+from openai import AsyncOpenAI
+
+from probate_ops.core.llm_metrics import LLMMetrics, collect, llm_metrics
+from probate_ops.tools.llm_score_tool import FALLBACK, AsyncScorer
+from tests.mock_openai import MockOpenAI
+from tests.test_llm_score_tool import _batch_reply, _record
+
+
+def test_scorer_calls_are_counted_per_request():
+    llm_metrics.reset()
+    with MockOpenAI(fail_first=1) as mock:
+        client = AsyncOpenAI(
+            api_key="test", base_url=mock.base_url, max_retries=0
+        )
+        scorer = AsyncScorer(client=client, cache=None, max_retries=2)
+        with collect() as summary:
+            asyncio.run(scorer.score_many([_record(0)], batched=False))
+    totals = summary.as_dict()
+    assert totals["calls"] == 2 and totals["errors"] == 1
+    assert totals["retries"] == 1
+    assert totals["prompt_tokens"] == 100
+    assert totals["completion_tokens"] == 20
+    assert totals["cost_usd"] > 0
+    (series,) = llm_metrics.snapshot()
+    assert series["site"] == "score" and series["calls"] == 2
+
+
+def test_prometheus_histogram_is_cumulative():
+    metrics = LLMMetrics()
+    metrics.call("m", "site", 0.2, 10, 5)
+    metrics.call("m", "site", 3.0, 10, 5)
+    text = metrics.prometheus()
+    assert 'llm_latency_seconds_bucket{model="m",site="site",le="0.25"} 1' in (
+        text
+    )
+    assert 'llm_latency_seconds_bucket{model="m",site="site",le="+Inf"} 2' in (
+        text
+    )
+    assert 'llm_calls_total{model="m",site="site"} 2' in text
+
+
+def _batched_fallbacks(single_reply: str) -> tuple[int, list]:
+    def reply(body):
+        if body["messages"][1]["content"].startswith("Records: "):
+            return _batch_reply(body)  # the first element is invalid
+        return single_reply
+
+    with MockOpenAI(reply=reply) as mock:
+        client = AsyncOpenAI(
+            api_key="test", base_url=mock.base_url, max_retries=0
+        )
+        scorer = AsyncScorer(client=client, cache=None)
+        with collect() as summary:
+            out = asyncio.run(
+                scorer.score_many([_record(i) for i in range(3)], batched=True)
+            )
+    return summary.as_dict()["fallbacks"], out
+
+
+def test_only_final_fallbacks_are_counted():
+    # record 0 is re-scored alone and succeeds: no fallback
+    fallbacks, out = _batched_fallbacks('{"score": 10, "tier": "low"}')
+    assert fallbacks == 0 and out[0]["score"] == 10
+    # ... or fails again and ends as FALLBACK: exactly one
+    fallbacks, out = _batched_fallbacks("not json")
+    assert fallbacks == 1 and out[0] == FALLBACK
@@ -0,0 +1,150 @@
+import asyncio
+import json
+
+from openai import AsyncOpenAI, OpenAI
+
+from probate_ops.core.score_cache import ScoreCache
+from probate_ops.tools import llm_score_tool
+from probate_ops.tools.llm_score_tool import FALLBACK, AsyncScorer
+from tests.mock_openai import MockOpenAI
+
+
+def _record(i: int) -> dict:
+    return {
+        "owner_name": f"Owner {i}",
+        "property_address": f"{i} Main St",
+        "city": "Atlanta",
+        "state": "GA",
+        "zip": "30303",
+        "petition_type": "Letters of Administration",
+        "absentee_flag": i % 2 == 0,
+        "days_since_death": 400,
+        "days_since_petition": 200,
+        "holdings_in_file": 1,
+        "county": "Fulton",
+    }
+
+
+def _scorer(mock: MockOpenAI, **kwargs) -> AsyncScorer:
+    client = AsyncOpenAI(api_key="test", base_url=mock.base_url, max_retries=0)
+    kwargs.setdefault("cache", None)
+    return AsyncScorer(client=client, **kwargs)
+
+
+def test_score_many_is_concurrent_and_bounded():
+    with MockOpenAI(delay=0.05) as mock:
+        scorer = _scorer(mock, concurrency=4)
+        out = asyncio.run(
+            scorer.score_many([_record(i) for i in range(20)], batched=False)
+        )
+    assert len(out) == 20
+    assert all(v["tier"] == "high" for v in out)
+    assert 1 < mock.max_in_flight <= 4
+
+
+def test_retries_server_errors():
+    with MockOpenAI(fail_first=2) as mock:
+        scorer = _scorer(mock, max_retries=3)
+        out = asyncio.run(scorer.score(_record(0)))
+    assert out["score"] == 80
+    assert len(mock.requests) == 3
+
+
+def test_sync_score_llm_retries_429_through_the_limiter(monkeypatch):
+    penalties = []
+    limiter = llm_score_tool.limiter
+    monkeypatch.setattr(
+        limiter, "penalize", lambda h: penalties.append(h) or None
+    )
+    monkeypatch.setattr(llm_score_tool.settings, "LLM_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(llm_score_tool.settings, "LLM_MAX_RETRIES", 2)
+    with MockOpenAI(fail_first=2, fail_status=429) as mock:
+        # SDK retries on the shared client must not stack on ours
+        client = OpenAI(api_key="test", base_url=mock.base_url, max_retries=5)
+        monkeypatch.setattr(llm_score_tool, "client", client)
+        out = llm_score_tool.score_llm(_record(0))
+    assert out["score"] == 80
+    assert len(mock.requests) == 3
+    assert [h["retry-after-ms"] for h in penalties] == ["10", "10"]
+
+
+def test_timeout_falls_back_after_retries():
+    with MockOpenAI(delay=0.5) as mock:
+        scorer = _scorer(mock, timeout=0.05, max_retries=1)
+        out = asyncio.run(scorer.score(_record(0)))
+    assert out == FALLBACK
+
+
+def _batch_reply(body: dict) -> str:
+    user = body["messages"][1]["content"]
+    if not user.startswith("Records: "):
+        return json.dumps({"score": 10, "tier": "low"})
+    records = json.loads(user[len("Records: ") :])
+    results = [{"id": r["id"], "score": 90, "tier": "high"} for r in records]
+    results[0]["tier"] = "urgent"  # invalid element -> re-scored alone
+    return json.dumps({"results": results})
+
+
+def test_batched_scoring_rescores_only_invalid(monkeypatch):
+    monkeypatch.setattr(llm_score_tool.settings, "LLM_BATCH_MAX_SIZE", 5)
+    with MockOpenAI(reply=_batch_reply) as mock:
+        scorer = _scorer(mock)
+        out = asyncio.run(
+            scorer.score_many([_record(i) for i in range(10)], batched=True)
+        )
+    assert len(mock.requests) == 2 + 2  # two batches, two single retries
+    assert [v["score"] for v in out].count(10) == 2
+    assert out[0]["tier"] == "low" and out[5]["tier"] == "low"
+    assert all(v["tier"] == "high" for i, v in enumerate(out) if i % 5)
+
+
+def test_rationale_is_generated_on_demand():
+    def reply(body):
+        if body["messages"][0]["content"] == llm_score_tool.RATIONALE_SYSTEM:
+            return "Absentee owner with an aging petition."
+        return json.dumps({"score": 72, "tier": "high"})
+
+    with MockOpenAI(reply=reply) as mock:
+        scorer = _scorer(mock)
+        verdict = asyncio.run(scorer.score(_record(0)))
+        assert verdict == {"score": 72, "tier": "high", "rationale": None}
+        text = asyncio.run(scorer.rationale(_record(0), verdict))
+    assert text == "Absentee owner with an aging petition."
+    assert mock.requests[0]["max_tokens"] == llm_score_tool.SCORE_MAX_TOKENS
+
+
+def test_pack_respects_token_budget(monkeypatch):
+    monkeypatch.setattr(llm_score_tool.settings, "LLM_BATCH_TOKEN_BUDGET", 800)
+    items = [(str(i), llm_score_tool._minimal(_record(i))) for i in range(30)]
+    batches = llm_score_tool._pack(items)
+    assert sum(len(b) for b in batches) == 30
+    assert 1 < len(batches) < 30
+
+
+def test_cache_serves_repeat_records(tmp_path):
+    cache = ScoreCache(str(tmp_path / "scores.sqlite"))
+    records = [_record(i) for i in range(3)]
+    with MockOpenAI() as mock:
+        scorer = _scorer(mock, cache=cache)
+        first = asyncio.run(scorer.score_many(records, batched=False))
+        second = asyncio.run(scorer.score_many(records, batched=False))
+    assert first == second
+    assert len(mock.requests) == 3
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_cache_keys_on_prompt_version(tmp_path):
+    cache = ScoreCache(str(tmp_path / "scores.sqlite"))
+    verdict = {"score": 1, "tier": "low", "rationale": ""}
+    cache.put_many({"a": verdict}, "m", "v1")
+    cache.put_many({"b": verdict}, "m", "v2")
+    assert cache.invalidate("v1") == 1
+    assert cache.get_many(["a", "b"]) == {"b": verdict}
+
+
+def test_cache_file_is_created_on_first_use(tmp_path):
+    path = tmp_path / "nested" / "scores.sqlite"
+    cache = ScoreCache(str(path))
+    assert not path.parent.exists()
+    assert cache.get_many(["a"]) == {}
+    assert path.exists()
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+from peewee import SqliteDatabase
+
+from probate_ops.core.settings import settings
+from probate_ops.models.database import ProbateRecord
+from probate_ops.tools import local_score_tool
+from probate_ops.tools.local_score_tool import (
+    LocalScoreModel,
+    _labelled_rows,
+    load_model,
+    score_local,
+    train,
+)
+
+
+def _labelled(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    absentee = rng.random(n) < 0.5
+    petition = rng.integers(0, 1500, n)
+    score = np.clip(30 + 40 * absentee + petition / 50, 0, 100).round()
+    tier = np.select([score >= 70, score >= 40], ["high", "medium"], "low")
+    return pd.DataFrame(
+        {
+            "absentee_flag": absentee,
+            "days_since_petition": petition,
+            "days_since_death": rng.integers(0, 2000, n),
+            "property_address": "1 Main St",
+            "holdings_in_file": 1,
+            "petition_type": rng.choice(["Probate", "Administration"], n),
+            "score": score,
+            "tier": tier,
+        }
+    )
+
+
+def test_fit_predicts_and_round_trips():
+    df = _labelled(400)
+    model = LocalScoreModel.fit(df)
+    pred = model.predict(df)
+    assert (pred["tier"] == df["tier"]).mean() > 0.85
+    assert (pred["score"] - df["score"]).abs().mean() < 5
+    again = LocalScoreModel.from_bytes(model.to_bytes())
+    pd.testing.assert_frame_equal(again.predict(df), pred)
+    assert again.meta["n_train"] == 400
+
+
+def test_fit_refuses_too_few_labels():
+    with pytest.raises(ValueError, match="labelled rows"):
+        LocalScoreModel.fit(_labelled(5))
+    with pytest.raises(ValueError):
+        LocalScoreModel.fit(_labelled(0))
+
+
+def test_train_publishes_a_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "BLOB_DIR", str(tmp_path))
+    monkeypatch.setattr(local_score_tool, "_models", {})
+    version = train(_labelled(200))
+    assert load_model().meta["version"] == version
+    assert load_model().meta["holdout"]["n"] == 40
+    assert len(score_local(_labelled(10, seed=1))) == 10
+
+
+def test_labelled_rows_keep_llm_rows_without_rationale():
+    db = SqliteDatabase(":memory:")
+    with db.bind_ctx([ProbateRecord]):
+        db.create_tables([ProbateRecord])
+        for i, rationale in enumerate([None, "Rules: absentee", "LLM said"]):
+            ProbateRecord.create(
+                county="Fulton",
+                source_url="",
+                case_no=f"C-{i}",
+                owner_name="Owner",
+                property_address=f"{i} Main St",
+                city="Atlanta",
+                state="GA",
+                zip="30303",
+                party="Heir",
+                party_address="1 Elm St",
+                score=50,
+                tier="medium",
+                rationale=rationale,
+            )
+        rows = _labelled_rows()
+    assert sorted(rows["property_address"]) == ["0 Main St", "2 Main St"]
@@ -0,0 +1,32 @@
+from probate_ops.core.question_cache import QuestionCache, normalize_question
+
+
+def test_normalize_question():
+    assert normalize_question("Show me the leads by county?") == "lead county"
+    assert normalize_question("leads per County") == "lead county"
+    assert normalize_question("Top 10 counties") == normalize_question(
+        "top 5 county"
+    )
+
+
+def test_near_duplicates_hit_within_schema():
+    cache = QuestionCache(threshold=0.75)
+    cache.put("Absentee share last quarter", "schema-a", {"fields": ["x"]})
+    assert cache.get("absentee share for the last quarter?", "schema-a")
+    assert cache.get("absentee share of last quarter leads", "schema-a")
+    assert cache.get("absentee rate last quarter", "schema-a") is None
+    assert cache.get("absentee share last quarter", "schema-b") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["near_hits"], stats["misses"]) == (1, 1, 2)
+
+
+def test_eviction_and_ttl():
+    cache = QuestionCache(max_entries=2)
+    for q in ("leads by county", "leads by zip", "leads by tier"):
+        cache.put(q, "s", q)
+    assert cache.get("leads by county", "s") is None
+    assert cache.stats()["entries"] == 2
+    expired = QuestionCache(ttl=-1)
+    expired.put("leads by county", "s", 1)
+    assert expired.get("leads by county", "s") is None
+    assert expired.stats()["entries"] == 0
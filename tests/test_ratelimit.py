@@ -0,0 +1,40 @@
+import asyncio
+
+from probate_ops.core.ratelimit import BULK, INTERACTIVE, RateLimiter
+
+
+def test_bulk_leaves_reserve_for_interactive():
+    limiter = RateLimiter(rpm=10, tpm=10_000, interactive_reserve=0.2)
+    admitted = sum(limiter._admit(100, BULK) == 0 for _ in range(10))
+    assert admitted == 8
+    assert limiter._admit(100, INTERACTIVE) == 0
+
+
+def test_headers_resize_buckets_and_pause_on_exhaustion():
+    limiter = RateLimiter(rpm=1000, tpm=1_000_000)
+    limiter.update_from_headers(
+        {
+            "x-ratelimit-limit-requests": "60",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "2s",
+            "x-ratelimit-limit-tokens": "5000",
+            "x-ratelimit-remaining-tokens": "4000",
+        }
+    )
+    assert limiter.requests.capacity == 60
+    assert limiter.tokens.capacity == 5000
+    assert limiter.tokens.level <= 4000
+    assert 1.5 < limiter._admit(10, INTERACTIVE) <= 2
+
+
+def test_acquire_waits_for_refill():
+    limiter = RateLimiter(rpm=600, tpm=1_000_000, interactive_reserve=0)
+    limiter.requests.level = 0  # refills at 10 requests per second
+
+    async def go():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await limiter.acquire(10, INTERACTIVE)
+        return loop.time() - start
+
+    assert 0.05 < asyncio.run(go()) < 0.5
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from probate_ops.core.registry import ToolRegistry
+
+
+def test_acall_offloads_sync_tools_and_enforces_limits():
+    reg = ToolRegistry(max_workers=8)
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def slow(x):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return x * 2
+
+    reg.register("slow", slow, concurrency=2)
+    reg.register("stuck", lambda: time.sleep(0.5), timeout=0.05)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():  # the loop keeps running while tools block
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        tick = asyncio.create_task(ticker())
+        out = await asyncio.gather(*(reg.acall("slow", x=i) for i in range(6)))
+        with pytest.raises(TimeoutError):
+            await reg.acall("stuck")
+        tick.cancel()
+        return out, ticks
+
+    out, ticks = asyncio.run(main())
+    assert out == [0, 2, 4, 6, 8, 10]
+    assert peak[0] == 2 and ticks > 10
+    stats = reg.stats()
+    assert stats["slow"]["calls"] == 6 and stats["stuck"]["timeouts"] == 1
+
+
+def test_async_tools_and_lru_memo():
+    reg = ToolRegistry()
+    calls = []
+
+    async def lookup(key):
+        calls.append(key)
+        return key.upper()
+
+    reg.register("lookup", lookup, memoize=2)
+
+    async def main():
+        return [await reg.acall("lookup", key=k) for k in "abacab"]
+
+    assert asyncio.run(main()) == list("ABACAB")
+    assert calls == ["a", "b", "c", "b"]  # "b" was evicted by "c"
+    assert reg.stats()["lookup"]["memo_hits"] == 2
+    with pytest.raises(TypeError):
+        reg.call("lookup", key="a")
+
+
+def test_async_limit_works_across_event_loops():
+    reg = ToolRegistry()
+
+    async def nap():
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    reg.register("nap", nap, concurrency=1)
+
+    async def main():
+        return await asyncio.gather(*(reg.acall("nap") for _ in range(3)))
+
+    assert asyncio.run(main()) == ["ok"] * 3
+    assert asyncio.run(main()) == ["ok"] * 3  # a second, fresh loop
@@ -0,0 +1,58 @@
+import asyncio
+
+import pandas as pd
+
+from probate_ops.tools.rule_score_tool import (
+    agreement,
+    score_rules,
+    score_with_rules,
+)
+
+
+def _frame() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "absentee_flag": [True, False, True],
+            "days_since_petition": [800, 9999, 100],
+            "days_since_death": [1200, 9999, 300],
+            "holdings_in_file": [3, 1, 1],
+            "property_address": ["1 Main St", None, "2 Oak Ave"],
+        }
+    )
+
+
+def test_score_rules_follows_prompt_rules():
+    out = score_rules(_frame())
+    assert list(out["tier"]) == ["high", "low", "medium"]
+    assert out["score"].between(0, 100).all()
+    assert "missing address" in out.loc[1, "rationale"]
+
+
+class _FakeScorer:
+    def __init__(self):
+        self.seen = []
+
+    async def score_many(self, records):
+        self.seen.extend(records)
+        return [{"score": 55, "tier": "medium", "rationale": "llm"}] * len(
+            records
+        )
+
+
+def test_only_ambiguous_records_reach_the_llm():
+    records = _frame().to_dict(orient="records")
+    fake = _FakeScorer()
+    verdicts, stats = asyncio.run(score_with_rules(records, fake))
+    assert len(fake.seen) == stats["llm_records"] == 1
+    assert verdicts[2]["rationale"] == "llm"
+    assert abs(stats["llm_avoided"] - 2 / 3) < 1e-9
+
+
+def test_agreement_against_labels():
+    df = _frame()
+    labels = pd.DataFrame(
+        {"score": [90, 5, 50], "tier": ["high", "low", "low"]}
+    )
+    report = agreement(score_rules(df), labels)
+    assert report["n"] == 3
+    assert report["tier_accuracy"] == 2 / 3
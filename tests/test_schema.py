@@ -0,0 +1,27 @@
+import io
+
+from probate_ops.utils import schema
+from probate_ops.utils.schema import sniff_csv
+
+
+def test_sniff_reads_only_the_head():
+    rows = "".join(
+        f"{i},Owner {i},{i * 1.5},2024-01-{i % 28 + 1:02d}\n"
+        for i in range(200_000)
+    )
+    stream = io.BytesIO(("id,owner,amount,filed\n" + rows).encode())
+    out = sniff_csv(stream, sample_rows=20)
+    assert out["columns"] == ["id", "owner", "amount", "filed"]
+    assert out["types"] == {
+        "id": "integer",
+        "owner": "text",
+        "amount": "number",
+        "filed": "date",
+    }
+    assert out["sample_rows"] == 20
+    assert stream.tell() <= schema.CHUNK_SIZE
+
+
+def test_sniff_handles_header_only_and_empty():
+    assert sniff_csv(io.BytesIO(b"\xef\xbb\xbfa,b\n"))["columns"] == ["a", "b"]
+    assert sniff_csv(io.BytesIO(b""))["columns"] == []
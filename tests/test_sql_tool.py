@@ -0,0 +1,112 @@
+import duckdb
+import pytest
+
+from probate_ops.core.settings import settings
+from probate_ops.core.storage import QueryRejected, SQLStore
+from probate_ops.tools import sql_tool
+from probate_ops.tools.sql_tool import (
+    _safe,
+    normalize_sql,
+    run_sql,
+    run_sql_file,
+)
+
+
+def test_safe_rejects_writes_and_stacked_statements():
+    assert _safe("SELECT 1;") == "SELECT 1;"
+    for sql in ("DROP TABLE x", "SELECT 1; DROP TABLE x"):
+        with pytest.raises(ValueError):
+            _safe(sql)
+
+
+def test_normalize_sql_keeps_literals():
+    assert normalize_sql("SELECT  *\n FROM data WHERE c = 'Fulton';") == (
+        "select * from data where c = 'Fulton'"
+    )
+
+
+def test_run_sql_file_cannot_read_other_files(tmp_path):
+    path = tmp_path / "d.csv"
+    path.write_text("a\n1\n2\n")
+    assert run_sql_file("SELECT SUM(a) AS s FROM data", str(path))["rows"] == [
+        {"s": 3}
+    ]
+    with pytest.raises(Exception):
+        run_sql_file("SELECT * FROM read_csv_auto('/etc/passwd')", str(path))
+    # another thread's upload in the same directory is off limits too
+    sibling = tmp_path / "other.csv"
+    sibling.write_text("secret\nx\n")
+    with pytest.raises(duckdb.PermissionException):
+        run_sql_file(f"SELECT * FROM read_csv_auto('{sibling}')", str(path))
+
+
+def test_run_sql_file_is_limited_and_logged(
+    tmp_path, monkeypatch, _private_sqlstore
+):
+    path = tmp_path / "d.csv"
+    path.write_text(
+        "a,d\n" + "".join(f"{i},2024-01-0{i % 9 + 1}\n" for i in range(500))
+    )
+    out = run_sql_file("SELECT * FROM data ORDER BY a", str(path), limit=3)
+    assert out["row_count"] == 500
+    assert out["rows"] == [
+        {"a": 0, "d": "2024-01-01"},
+        {"a": 1, "d": "2024-01-02"},
+        {"a": 2, "d": "2024-01-03"},
+    ]
+    monkeypatch.setattr(settings, "SQL_TIMEOUT", 0.2)
+    with pytest.raises(TimeoutError):
+        run_sql_file(
+            "SELECT COUNT(*) FROM data x, data y, data z "
+            "WHERE x.a + y.a + z.a < 0",
+            str(path),
+        )
+    log = (
+        _private_sqlstore.cursor()
+        .execute("SELECT status, row_count FROM query_log")
+        .fetchall()
+    )
+    assert log == [("ok", 500), ("TimeoutError", None)]
+
+
+def test_run_sql_previews_counts_and_streams(tmp_path, monkeypatch):
+    store = SQLStore(str(tmp_path / "t.duckdb"))
+    store.cursor().execute(
+        "CREATE TABLE leads AS SELECT i AS id FROM range(1000) t(i)"
+    )
+    monkeypatch.setattr(sql_tool, "sqlstore", store)
+    out = run_sql("SELECT id FROM leads WHERE id % 2 = 0 ORDER BY id DESC;")
+    assert out["row_count"] == 500
+    assert len(out["rows"]) == 50 and out["rows"][0] == {"id": 998}
+    monkeypatch.setattr(sql_tool, "STREAM_BATCH_ROWS", 300)
+    batches = list(run_sql("SELECT id FROM leads", stream=True)["rows"])
+    assert sum(len(b) for b in batches) == 1000 and len(batches) > 1
+    store.close()
+
+
+def test_run_sql_guards_cost_and_time(tmp_path, monkeypatch):
+    store = SQLStore(str(tmp_path / "t.duckdb"))
+    store.cursor().execute(
+        "CREATE TABLE leads AS SELECT i AS id FROM range(100000) t(i)"
+    )
+    monkeypatch.setattr(sql_tool, "sqlstore", store)
+    with pytest.raises(QueryRejected):  # 10^10 estimated rows
+        run_sql("SELECT COUNT(*) FROM leads a, leads b")
+    with pytest.raises(TimeoutError):  # estimate is low, runtime is not
+        store.preview(
+            "SELECT COUNT(*) FROM leads a, leads b WHERE a.id + b.id < 0",
+            10,
+            timeout=0.2,
+        )
+    run_sql("SELECT id FROM leads WHERE id < 5")
+    log = (
+        store.cursor()
+        .execute("SELECT status, rows_scanned, row_count FROM query_log")
+        .fetchall()
+    )
+    assert log[:2] == [
+        ("QueryRejected", 200000, None),
+        ("TimeoutError", 200000, None),
+    ]
+    assert log[2][0] == "ok" and log[2][2] == 5
+    store.close()
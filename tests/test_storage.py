@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from probate_ops.core.settings import settings
+from probate_ops.core.storage import SQLStore
+
+
+def test_shared_store_reads_concurrently_and_writes(tmp_path):
+    store = SQLStore(str(tmp_path / "t.duckdb"))
+    store.write_df(pd.DataFrame({"county": ["Fulton", "Cobb"]}), "leads")
+    store.write_df(pd.DataFrame({"county": ["Fulton"]}), "leads")
+    with ThreadPoolExecutor(8) as pool:
+        counts = list(
+            pool.map(
+                lambda _: int(
+                    store.query("SELECT COUNT(*) AS n FROM leads")["n"][0]
+                ),
+                range(32),
+            )
+        )
+    assert counts == [3] * 32
+    with pytest.raises(duckdb.Error):
+        store.query("INSERT INTO leads VALUES ('DeKalb')")
+    store.close()
+
+
+def test_write_df_streams_arrow_widens_and_partitions(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "BLOB_DIR", str(tmp_path / "blobs"))
+    store = SQLStore(str(tmp_path / "t.duckdb"))
+    first = pa.table(
+        {
+            "id": [1, 2],
+            "county": ["Fulton", "Cobb"],
+            "petition_date": ["2024-01-05", "2024-02-01"],
+        }
+    )
+    assert store.write_df(first, "leads", parquet=True) == 2
+    drift = pa.table({"id": [3.5, 4.0], "score": [70, 80]})
+    assert store.write_df(drift.to_reader(max_chunksize=1), "leads") == 2
+    types = {
+        r[0]: r[1] for r in store.cursor().execute("DESCRIBE leads").fetchall()
+    }
+    assert types["id"] == "DOUBLE" and types["score"] == "BIGINT"
+    assert store.query("SELECT SUM(id) AS s FROM leads")["s"][0] == 10.5
+    parts = sorted(
+        p.parent.relative_to(tmp_path / "blobs" / "parquet" / "leads")
+        for p in (tmp_path / "blobs").rglob("*.parquet")
+    )
+    assert [str(p) for p in parts] == [
+        "county=Cobb/month=2024-02",
+        "county=Fulton/month=2024-01",
+    ]
+    store.close()
@@ -0,0 +1,218 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI, WebSocketDisconnect
+from fastapi.testclient import TestClient
+from langchain_openai import ChatOpenAI
+
+from probate_ops.controllers import ask
+from probate_ops.core.query_cache import QueryCache
+from probate_ops.core.question_cache import QuestionCache
+from probate_ops.core.sessions import DONE, TRY_AGAIN_LATER, SessionManager
+from probate_ops.flows import checkpoint, dataviz
+from probate_ops.flows.dataviz import DataVizAgent
+from tests.mock_openai import MockOpenAI
+
+
+class FakeSocket:
+    """In-memory stand-in for a Starlette WebSocket."""
+
+    def __init__(self, messages, hang_up_after=None):
+        self.inbox = asyncio.Queue()
+        for m in messages:
+            self.inbox.put_nowait(m)
+        self.hang_up_after = hang_up_after
+        self.frames = []
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def receive_text(self):
+        if self.inbox.empty() and self.hang_up_after is not None:
+            await asyncio.sleep(self.hang_up_after)
+            raise WebSocketDisconnect()
+        return await self.inbox.get()
+
+    async def send_text(self, text):
+        self.frames.append(text)
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+def mock_llm(tokens=40, delay=0.002, started=None):
+    """Token stream of a fake model answer."""
+
+    async def stream(question):
+        if started is not None:
+            started.append(question)
+        for i in range(tokens):
+            await asyncio.sleep(delay)
+            yield f"{i} "
+
+    return stream
+
+
+def test_hundreds_of_clients_are_served_and_coalesced():
+    async def main():
+        manager = SessionManager(
+            max_sessions=300, flush_ms=20, idle_timeout=0.3
+        )
+        clients = [FakeSocket(["q"]) for _ in range(300)]
+        await asyncio.gather(*(manager.serve(c, mock_llm()) for c in clients))
+        return manager, clients
+
+    manager, clients = asyncio.run(main())
+    expected = "".join(f"{i} " for i in range(40))
+    for c in clients:
+        frames = [json.loads(f) for f in c.frames]
+        assert "".join(f["text"] for f in frames[:-1]) == expected
+        assert frames[-1] == DONE
+    assert all(c.closed == 1000 for c in clients)  # idle timeout
+    assert manager.chunks == 300 * 40
+    assert manager.frames < manager.chunks / 3  # token frames only
+    assert manager.active == 0
+
+
+def test_session_limit_and_disconnect_cancel_runs():
+    async def main():
+        manager = SessionManager(max_sessions=200, idle_timeout=5)
+        started = []
+        clients = [FakeSocket(["q"], hang_up_after=0.05) for _ in range(250)]
+        await asyncio.gather(
+            *(
+                manager.serve(c, mock_llm(tokens=1000, started=started))
+                for c in clients
+            )
+        )
+        return manager, clients, started
+
+    manager, clients, started = asyncio.run(main())
+    refused = [c for c in clients if c.closed == TRY_AGAIN_LATER]
+    assert len(refused) == 50 and len(started) == 200
+    assert manager.cancelled == 200  # every run stopped on hang-up
+    assert manager.active == 0
+
+
+def test_slow_client_applies_backpressure():
+    produced = []
+
+    async def stream(question):
+        for i in range(100):
+            produced.append(i)
+            yield "x"
+
+    class SlowSocket(FakeSocket):
+        async def send_text(self, text):
+            await asyncio.sleep(1)
+
+    async def main():
+        manager = SessionManager(queue_size=8, flush_ms=0, idle_timeout=5)
+        client = SlowSocket(["q"], hang_up_after=0.1)
+        await manager.serve(client, stream)
+
+    asyncio.run(main())
+    assert len(produced) < 20  # the run waited on the full queue
+
+
+def test_failed_run_ends_with_an_error_frame():
+    async def stream(question):
+        yield "partial "
+        yield {"type": "step", "node": "parse"}
+        raise RuntimeError("boom")
+
+    async def main():
+        manager = SessionManager(flush_ms=0, idle_timeout=0.1)
+        client = FakeSocket(["q"])
+        await manager.serve(client, stream)
+        return client
+
+    frames = [json.loads(f) for f in asyncio.run(main()).frames]
+    assert frames == [
+        {"type": "token", "text": "partial "},
+        {"type": "step", "node": "parse"},
+        {"type": "error", "message": "answer failed"},
+    ]
+
+
+def _ask_reply(body: dict) -> str:
+    system = body["messages"][0]["content"]
+    question = body["messages"][1]["content"]
+    if "broken" in question:
+        return "not json"
+    if "weather" in question:
+        return json.dumps({"is_relevant": False})
+    if system.startswith("You write DuckDB SQL"):
+        return json.dumps(
+            {"sql": "SELECT county, COUNT(*) AS n FROM data GROUP BY 1"}
+        )
+    if system.startswith("You are a data analyst. Answer"):
+        return json.dumps({"answer": "Fulton has 2 leads."})
+    return json.dumps({"is_relevant": True, "relevant_fields": ["county"]})
+
+
+def _receive_answer(ws) -> list:
+    frames = []
+    while not frames or frames[-1]["type"] not in ("done", "error"):
+        frames.append(json.loads(ws.receive_text()))
+    return frames
+
+
+def test_ws_route_sends_steps_result_and_done(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataviz, "question_cache", QuestionCache())
+    monkeypatch.setattr(dataviz.settings, "BLOB_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        dataviz, "query_cache", QueryCache(str(tmp_path / "q.sqlite"))
+    )
+    monkeypatch.setattr(
+        ask, "sessions", SessionManager(flush_ms=0, idle_timeout=0.5)
+    )
+
+    @asynccontextmanager
+    async def lifespan(app):
+        saver = await checkpoint.open_checkpointer(str(tmp_path / "c.sqlite"))
+        ask.graph.checkpointer = saver
+        yield
+        await saver.conn.close()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(ask.router)
+    with MockOpenAI(reply=_ask_reply) as mock:
+        agent = DataVizAgent()
+        agent.llm = ChatOpenAI(
+            api_key="test", base_url=mock.base_url, model="gpt-4o-mini"
+        )
+        monkeypatch.setattr(ask, "graph", agent.create_workflow())
+        with TestClient(app) as client:
+            client.post(
+                "/ask",
+                data={"question": "Any weather data?", "thread_id": "t1"},
+                files={"file": ("leads.csv", b"county\nFulton\nFulton\n")},
+            ).raise_for_status()
+            with client.websocket_connect("/ws/t1") as ws:
+                ws.send_text("Leads per county?")
+                answered = _receive_answer(ws)
+                ws.send_text("A broken question")
+                failed = _receive_answer(ws)
+                with pytest.raises(WebSocketDisconnect):
+                    ws.receive_text()  # closed once idle
+
+    steps = [f["node"] for f in answered if f["type"] == "step"]
+    assert steps == [
+        "parse_question",
+        "generate_sql",
+        "run_query",
+        "summarize",
+    ]
+    result = answered[-2]
+    assert result["type"] == "result"
+    assert result["answer"] == "Fulton has 2 leads."
+    assert result["rows"] == [{"county": "Fulton", "n": 2}]
+    assert result["error"] is None
+    assert answered[-1] == DONE
+    # no raw structured-output JSON leaks to the client
+    assert not [f for f in answered if f["type"] == "token"]
+    assert failed[-1] == {"type": "error", "message": "answer failed"}